@@ -0,0 +1,1140 @@
+import os
+import sys
+from array import array
+
+from lazy_import import lazyImport
+from parse_cache import ParseCache
+from histogram import GradeHistograms
+from line_classifier import parseGrade, STOP
+from bulk_reader import MarkedFileReader
+from instrumentation import timings
+from comment_index import CommentIndex
+import rubric
+from rubric import Rubric, ST_NUM
+from marking_rules import MISSING
+
+# Only imported once statistics or graphs are first needed
+np = lazyImport('numpy')
+gridspec = lazyImport('matplotlib.gridspec')
+plot = lazyImport('matplotlib.pyplot')
+
+directory = "C:/Users/Joe/Dropbox/CSSE2002_2016/assignment3/a3-actualMarking/marked"
+# Overall testing, usability and quality grades, each with the line giving it
+# and the testing and quality parts adding up to it. Every part is marked out
+# of 1, quality part vi. being the scale applied to i. to v. Comments are
+# filed under the grade line they follow.
+RUBRIC = Rubric({
+	'name': 'a3',
+	'stop': 'Code Quality Mark',
+	'components': [
+		{'name': 'testing', 'line': 'Testing:', 'max': 6, 'section': 'Testing'},
+		{'name': 'usability', 'line': 'Usability:', 'max': 3, 'section': 'Usability'},
+		{'name': 'quality', 'line': 'Quality:', 'max': 6, 'section': 'Quality'}],
+	'parts': [
+		{'column': 'testingParts', 'names': ['Scenario {0}'.format(i) for i in range(1, 7)],
+			'lines': ['Scenario {0} [0,1]'.format(i) for i in range(1, 7)], 'caps': [1] * 6,
+			'aggregate': {'formula': 'sum', 'into': 'testing', 'rule': 'testing sum'}},
+		{'column': 'qualityParts', 'names': ['i.', 'ii.', 'iii.', 'iv.', 'v.', 'vi.'],
+			'lines': ['i. ', 'ii. ', 'iii. ', 'iv. ', 'v. ', 'vi. '], 'caps': [1] * 6,
+			'aggregate': {'formula': 'roundedProduct', 'into': 'quality', 'rule': 'quality rounding'}}]})
+maxMarks = tuple(RUBRIC.components.values())
+LINE_CLASSIFIER = RUBRIC.getClassifier()
+TESTING_PART_NAMES, TESTING_PART_CAPS = RUBRIC.parts['testingParts']
+QUALITY_PART_NAMES, QUALITY_PART_CAPS = RUBRIC.parts['qualityParts']
+# Slots of the parsed grades holding the overall grades and each group of parts
+OVERALL_SLOTS = [RUBRIC.componentSlots[name] for name in ('testing', 'usability', 'quality')]
+TESTING_PART_SLOTS = RUBRIC.partSlots['testingParts']
+QUALITY_PART_SLOTS = RUBRIC.partSlots['qualityParts']
+COMMENT_SECTIONS = RUBRIC.sections
+MARKING_RULES = RUBRIC.markingRules()
+CACHE_NAME = 'a3'
+# Layout of the cached records, folded with the rubric so that files parsed
+# under another rubric are parsed again
+CACHE_VERSION = (2 << 32) | RUBRIC.cacheVersion()
+
+def dispHeadingUnderline(line: str):
+	return '=' * len(line)
+
+def roundValue(value: int, precision: int):
+	return round(value * (1.0/precision)) / (1.0/precision)
+
+class ModificationCount:
+	# Incremented whenever an assignment or marker it is attached to changes,
+	# so that analysis cached from them can tell when it is out of date. Each
+	# parser has its own, and assignments built elsewhere have none until an
+	# analyser attaches one.
+	__slots__ = ('count',)
+
+	def __init__(self):
+		self.count = 0
+
+	def markModified(self):
+		self.count += 1
+
+class Marker:
+	__slots__ = ('name', 'markedAssignments', 'modifications')
+
+	def __init__(self, name: str, modifications: ModificationCount = None):
+		self.name = name
+		self.markedAssignments = []
+		self.modifications = modifications
+
+	def markModified(self):
+		if self.modifications is not None:
+			self.modifications.markModified()
+
+	def getName(self):
+		return self.name
+
+	def addAssignment(self, assignment):
+		self.markedAssignments.append(assignment)
+		self.markModified()
+
+	def removeAssignment(self, assignment):
+		self.markedAssignments.remove(assignment)
+		self.markModified()
+
+	def __str__(self):
+		return self.getName()
+
+	def __repr__(self):
+		return "<Marker {0}>".format(self.name)
+
+
+class Assignment:
+	# Part grades are kept in compact arrays of doubles, and there is no
+	# per-instance __dict__, as archives can hold a great many assignments.
+	# Comments are (section, comment) pairs, with the section an index into
+	# COMMENT_SECTIONS and the comment an interned string.
+	__slots__ = ('studentNumber', 'marker', 'testingGrade', 'usabilityGrade', 'qualityGrade',
+		'testingParts', 'qualityParts', 'comments', 'modifications', '_calcTesting', '_calcQuality', '_valid')
+	maxMarks = maxMarks
+
+	def __init__(self, studentNumber: str, marker: Marker = None):
+		self.studentNumber = studentNumber
+		self.marker = marker
+		self.modifications = None
+		self.testingParts = array('d', [MISSING] * len(TESTING_PART_NAMES))
+		self.qualityParts = array('d', [MISSING] * len(QUALITY_PART_NAMES))
+		self.comments = ()
+		self.setOverallGrade(0.0, 0.0, 0.0)
+
+	def invalidate(self):
+		# Cached totals and validity are recomputed on next use
+		self._calcTesting = None
+		self._calcQuality = None
+		self._valid = None
+		self.markModified()
+
+	def markModified(self):
+		if self.modifications is not None:
+			self.modifications.markModified()
+
+	def setMarker(self, marker: Marker):
+		self.marker = marker
+		self.markModified()
+
+	def getMarker(self):
+		return self.marker
+
+	def setOverallGrade(self, testingGrade: float, usabilityGrade: float, qualityGrade: float):
+		self.testingGrade = testingGrade
+		self.usabilityGrade = usabilityGrade
+		self.qualityGrade = qualityGrade
+		self.invalidate()
+
+	def getStudentNumber(self):
+		return self.studentNumber
+
+	def getOverallTesting(self):
+		return self.testingGrade
+
+	def getOverallUsability(self):
+		return self.usabilityGrade
+
+	def getOverallQuality(self):
+		return self.qualityGrade
+
+	def calcTotalGrade(self):
+		return self.getOverallTesting() + self.getOverallUsability() + self.getOverallQuality()
+
+	def setTestingPart(self, part: int, value: float):
+		self.testingParts[part] = value
+		self.invalidate()
+
+	def setQualityPart(self, part: int, value: float):
+		self.qualityParts[part] = value
+		self.invalidate()
+
+	def setParts(self, testingParts: list, qualityParts: list):
+		self.testingParts = array('d', testingParts)
+		self.qualityParts = array('d', qualityParts)
+		self.invalidate()
+
+	def setComments(self, comments):
+		self.comments = tuple((section, sys.intern(comment)) for section, comment in comments)
+		self.markModified()
+
+	def getComments(self):
+		# (section name, comment) pairs
+		return [(COMMENT_SECTIONS[section], comment) for section, comment in self.comments]
+
+	def calcOverallTesting(self):
+		if self._calcTesting is None:
+			self._calcTesting = RUBRIC.overallGrade('testingParts', self.testingParts)
+		return self._calcTesting
+
+	def calcOverallQuality(self):
+		if self._calcQuality is None:
+			self._calcQuality = RUBRIC.overallGrade('qualityParts', self.qualityParts)
+		return self._calcQuality
+
+	def getGrades(self):
+		# Components and parts columns of RUBRIC
+		return {'testing': self.testingGrade, 'usability': self.usabilityGrade, 'quality': self.qualityGrade,
+			'testingParts': self.testingParts, 'qualityParts': self.qualityParts}
+
+	def isAssignmentValid(self):
+		# Same rules as MARKING_RULES, for one assignment at a time
+		if self._valid is None:
+			self._valid = RUBRIC.isValid(self.getGrades())
+		return self._valid
+
+	def getRecord(self):
+		return (self.studentNumber, self.testingGrade, self.usabilityGrade, self.qualityGrade,
+			tuple(self.testingParts), tuple(self.qualityParts), self.comments)
+
+	@classmethod
+	def fromRecord(cls, record):
+		studentNumber, testingGrade, usabilityGrade, qualityGrade, testingParts, qualityParts, comments = record
+		assignment = cls(studentNumber)
+		assignment.setOverallGrade(testingGrade, usabilityGrade, qualityGrade)
+		assignment.setParts(testingParts, qualityParts)
+		assignment.setComments(comments)
+		return assignment
+
+	def __str__(self):
+		fmtStr = 'Student Number: {0}\nMarker: {1}\nTesting: {2} ({3})\nUsability: {4}\nQuality: {5} ({6})'
+		return fmtStr.format(self.studentNumber, self.marker.getName(),
+			self.getOverallTesting(), str(list(self.testingParts)),
+			self.getOverallUsability(), self.getOverallQuality(), str(list(self.qualityParts)))
+
+	def __repr__(self):
+		return "<Assignment for {0}>".format(self.studentNumber)
+
+
+class AssignmentParser:
+
+	def __init__(self, bulkRead: bool = True):
+		self.reader = MarkedFileReader(RUBRIC.schema['stop']) if bulkRead else None
+		self.assignments = []
+		self.markers = []
+		self.markerIndex = dict()
+		self.studentIndex = dict()
+		self.duplicates = []
+		self.fileIndex = dict()
+		# Shared by every assignment and marker the parser adds
+		self.modifications = ModificationCount()
+
+	def getAssignments(self):
+		return self.assignments
+
+	def getMarkers(self):
+		return self.markers
+
+	def getMarkerIndex(self):
+		return self.markerIndex
+
+	def getStudentIndex(self):
+		return self.studentIndex
+
+	def getDuplicates(self):
+		return self.duplicates
+
+	def getFileIndex(self):
+		return self.fileIndex
+
+	def getStudentNumberForFile(self, filename: str):
+		return rubric.studentNumberForFile(filename)
+
+	def getMarkerForFile(self, filename: str):
+		return rubric.markerForFile(filename)
+
+	def getGradeFromLine(self, line: str):
+		return parseGrade(line)
+
+	def parseAssignment(self, filename: str):
+		if self.reader is None:
+			with open(filename, 'r', encoding="utf8") as file:
+				return self.parseAssignmentLines(filename, file)
+		if timings.enabled:
+			with timings.stage('read'):
+				lines = self.reader.readHeader(filename).splitlines()
+			timings.count('bytes read', self.reader.lastSize)
+			with timings.stage('parse'):
+				return self.parseAssignmentLines(filename, lines)
+		return self.parseAssignmentLines(filename, self.reader.readHeader(filename).splitlines())
+
+	def parseAssignmentLines(self, filename: str, lines):
+		assignment = Assignment(self.getStudentNumberForFile(filename))
+		grades, comments, read = RUBRIC.parseLines(lines)
+
+		if timings.enabled:
+			timings.count('lines read', read)
+		assignment.setOverallGrade(*[grades[slot] for slot in OVERALL_SLOTS])
+		assignment.setParts(grades[TESTING_PART_SLOTS], grades[QUALITY_PART_SLOTS])
+		assignment.setComments(comments)
+
+		return assignment
+
+	def iterAssignmentFiles(self, dir: str):
+		return rubric.iterAssignmentFiles(dir)
+
+	def findAssignmentFiles(self, dir: str):
+		with timings.stage('scan'):
+			files = list(self.iterAssignmentFiles(dir))
+		if timings.enabled:
+			timings.count('files scanned', len(files))
+		return files
+
+	def iterAssignments(self, dir: str):
+		# Yields each assignment as soon as its file is found, without keeping
+		# it in the parser. Markers only hold their name, not their assignments.
+		markers = dict()
+		for file in self.iterAssignmentFiles(dir):
+			assignment = self.parseAssignment(file)
+			markerName = self.getMarkerForFile(file)
+			if markerName not in markers:
+				markers[markerName] = Marker(markerName)
+			assignment.setMarker(markers[markerName])
+			yield assignment
+
+	def addAssignment(self, assignment: Assignment, filename: str):
+		curMarkerName = self.getMarkerForFile(filename)
+		assignment.modifications = self.modifications
+		self.assignments.append(assignment)
+		self.fileIndex[filename] = assignment
+
+		if assignment.getStudentNumber() in self.studentIndex:
+			# Student marked more than once, keep the first in the index
+			self.duplicates.append(assignment)
+		else:
+			self.studentIndex[assignment.getStudentNumber()] = assignment
+
+		if curMarkerName in self.markerIndex:
+			# Marker already found by parser
+			existingMarker = self.markerIndex[curMarkerName]
+			assignment.setMarker(existingMarker)
+			existingMarker.addAssignment(assignment)
+		else:
+			# New marker
+			newMarker = Marker(curMarkerName, self.modifications)
+			assignment.setMarker(newMarker)
+			newMarker.addAssignment(assignment)
+			self.markers.append(newMarker)
+			self.markerIndex[curMarkerName] = newMarker
+
+	def updateAssignment(self, filename: str, parsed: Assignment):
+		# Copies the grades of a file parsed again into its existing assignment
+		assignment = self.fileIndex[filename]
+		assignment.setOverallGrade(parsed.getOverallTesting(), parsed.getOverallUsability(),
+			parsed.getOverallQuality())
+		assignment.setParts(parsed.testingParts, parsed.qualityParts)
+		assignment.setComments(parsed.comments)
+		return assignment
+
+	def removeAssignment(self, filename: str):
+		assignment = self.fileIndex.pop(filename)
+		self.assignments.remove(assignment)
+		assignment.getMarker().removeAssignment(assignment)
+
+		studentNumber = assignment.getStudentNumber()
+		if self.studentIndex.get(studentNumber) is assignment:
+			# The next assignment for the same student, if any, takes its place
+			del self.studentIndex[studentNumber]
+			for i, duplicate in enumerate(self.duplicates):
+				if duplicate.getStudentNumber() == studentNumber:
+					self.studentIndex[studentNumber] = self.duplicates.pop(i)
+					break
+		else:
+			self.duplicates.remove(assignment)
+		return assignment
+
+	def parseFiles(self, files: list, workers: int = 1):
+		if workers > 1 and len(files) > 1:
+			# Assignments come back from the pool in file order, so markers are
+			# attached in exactly the same order as a serial parse. Each chunk
+			# brings back the timings of its worker, summed over the workers.
+			import concurrent.futures
+			chunkSize = max(1, len(files) // (workers * 4))
+			chunks = [files[start:start + chunkSize] for start in range(0, len(files), chunkSize)]
+			assignments = []
+			with timings.stage('read and parse (worker processes)'):
+				with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+					for parsed, workerTimings in pool.map(parseAssignmentFiles, chunks,
+							[timings.enabled] * len(chunks)):
+						assignments += parsed
+						timings.merge(workerTimings)
+			return assignments
+		else:
+			return [self.parseAssignment(file) for file in files]
+
+	def parseDirectoryStructure(self, dir: str, workers: int = 1, cache: ParseCache = None):
+		files = self.findAssignmentFiles(dir)
+
+		if cache is None:
+			parsed = self.parseFiles(files, workers)
+		else:
+			parsed = [None] * len(files)
+			with timings.stage('cache lookup'):
+				stats = [os.stat(file) for file in files]
+				for i, file in enumerate(files):
+					record = cache.get(file, stats[i])
+					if record is not None:
+						parsed[i] = Assignment.fromRecord(record)
+
+			# Only new or changed files are parsed again
+			missing = [i for i in range(len(files)) if parsed[i] is None]
+			if timings.enabled:
+				timings.count('cache hits', len(files) - len(missing))
+			for i, assignment in zip(missing, self.parseFiles([files[i] for i in missing], workers)):
+				parsed[i] = assignment
+				cache.put(files[i], stats[i], assignment.getRecord())
+
+			with timings.stage('cache save'):
+				cache.prune(files)
+				cache.save()
+
+		with timings.stage('attach markers'):
+			for file, curAssignment in zip(files, parsed):
+				self.addAssignment(curAssignment, file)
+
+
+# Parser reused by all files parsed in a worker process
+workerParser = None
+
+# Module level so that it can be sent to worker processes
+def parseAssignmentFiles(filenames: list, profile: bool = False):
+	# Assignments of the files, with the timings of parsing them
+	global workerParser
+	if workerParser is None:
+		workerParser = AssignmentParser()
+	timings.reset()
+	timings.enable(profile)
+	return [workerParser.parseAssignment(filename) for filename in filenames], timings.state()
+
+
+class GradeStore:
+	# Columnar copy of the grades of a set of assignments, one row per assignment.
+	# Pools of rows are given as a list of assignments, a marker name, or None
+	# for every row.
+
+	def __init__(self, studentNumbers, markerNames: list, markerCodes, testing, usability, quality,
+			testingParts, qualityParts, assignments: list = None):
+		n = len(testing)
+		self.studentNumbers = np.asarray(studentNumbers, dtype=str).reshape(n)
+		self.markerNames = list(markerNames)
+		self.markerCodeIndex = {name: i for i, name in enumerate(self.markerNames)}
+		self.markerCodes = np.asarray(markerCodes, np.int32)
+		self.testing = np.asarray(testing, np.float64)
+		self.usability = np.asarray(usability, np.float64)
+		self.quality = np.asarray(quality, np.float64)
+		self.testingParts = np.asarray(testingParts, np.float64).reshape(n, len(TESTING_PART_NAMES))
+		self.qualityParts = np.asarray(qualityParts, np.float64).reshape(n, len(QUALITY_PART_NAMES))
+		self.attachAssignments(assignments)
+		self.refresh()
+
+	def refresh(self):
+		# Recomputes everything derived from the grade columns
+		n = len(self.testing)
+		self.total = self.testing + self.usability + self.quality
+		self.markerRowCache = dict()
+		self.studentRowIndex = None
+		self.errors = MARKING_RULES.evaluate(self.getColumns(), self.markerCodes)
+		self.valid = ~self.errors.invalid
+
+		# Rows whose student number was already seen in an earlier row
+		if n:
+			_, firstRows, inverse = np.unique(self.studentNumbers, return_index=True, return_inverse=True)
+			self.firstRows = firstRows[inverse.reshape(n)]
+		else:
+			self.firstRows = np.zeros(0, np.intp)
+		self.duplicateRows = np.flatnonzero(self.firstRows != np.arange(n))
+
+	@staticmethod
+	def assignmentColumns(assignments: list, markerCode):
+		# Student numbers, marker codes, overall grades and parts of assignments
+		n = len(assignments)
+		return ([a.getStudentNumber() for a in assignments],
+			np.fromiter((markerCode(a.getMarker()) for a in assignments), np.int32, n),
+			np.fromiter((a.getOverallTesting() for a in assignments), np.float64, n),
+			np.fromiter((a.getOverallUsability() for a in assignments), np.float64, n),
+			np.fromiter((a.getOverallQuality() for a in assignments), np.float64, n),
+			np.array([a.testingParts for a in assignments], np.float64).reshape(n, len(TESTING_PART_NAMES)),
+			np.array([a.qualityParts for a in assignments], np.float64).reshape(n, len(QUALITY_PART_NAMES)))
+
+	@classmethod
+	def fromAssignments(cls, assignments: list, markers: list):
+		markerCodes = {id(m): i for i, m in enumerate(markers)}
+		studentNumbers, *columns = cls.assignmentColumns(assignments,
+			lambda marker: markerCodes.get(id(marker), -1))
+		return cls(studentNumbers, [m.getName() for m in markers], *columns, assignments)
+
+	def markerCodeFor(self, marker: Marker):
+		# Code of a marker by name, adding markers not seen before
+		code = self.markerCodeIndex.get(marker.getName())
+		if code is None:
+			code = len(self.markerNames)
+			self.markerNames.append(marker.getName())
+			self.markerCodeIndex[marker.getName()] = code
+		return code
+
+	def applyChanges(self, assignments: list, added: list = (), changed: list = (), removed: list = ()):
+		# Brings the rows up to date with assignments whose grades changed, and
+		# assignments removed from or appended to the end of the list the store
+		# was built from, which is now `assignments`. Cheaper than building
+		# the store again, as only the changed assignments are read.
+		gradeColumns = ('testing', 'usability', 'quality', 'testingParts', 'qualityParts')
+		if changed:
+			rows = np.fromiter((self.rowIndex[id(a)] for a in changed), np.intp, len(changed))
+			_, _, *columns = self.assignmentColumns(changed, self.markerCodeFor)
+			for name, column in zip(gradeColumns, columns):
+				getattr(self, name)[rows] = column
+
+		columnNames = ('studentNumbers', 'markerCodes') + gradeColumns
+		if removed:
+			rows = np.fromiter((self.rowIndex[id(a)] for a in removed), np.intp, len(removed))
+			for name in columnNames:
+				setattr(self, name, np.delete(getattr(self, name), rows, axis=0))
+
+		if added:
+			studentNumbers, *columns = self.assignmentColumns(added, self.markerCodeFor)
+			columns.insert(0, np.asarray(studentNumbers, dtype=str))
+			for name, column in zip(columnNames, columns):
+				setattr(self, name, np.concatenate((getattr(self, name), column)))
+
+		self.attachAssignments(assignments)
+		self.refresh()
+
+	def getColumns(self):
+		return {'testing': self.testing, 'usability': self.usability, 'quality': self.quality,
+			'testingParts': self.testingParts, 'qualityParts': self.qualityParts}
+
+	def attachAssignments(self, assignments: list):
+		self.assignments = assignments
+		self.rowIndex = None if assignments is None else {id(a): i for i, a in enumerate(assignments)}
+
+	def __len__(self):
+		return len(self.testing)
+
+	def hasMarker(self, markerName: str):
+		return markerName in self.markerCodeIndex
+
+	def markerRows(self, markerName: str):
+		rows = self.markerRowCache.get(markerName)
+		if rows is None:
+			rows = np.flatnonzero(self.markerCodes == self.markerCodeIndex[markerName])
+			self.markerRowCache[markerName] = rows
+		return rows
+
+	def studentRows(self, studentNumber: str):
+		# Rows of a student, usually one, from an index built on first use
+		if self.studentRowIndex is None:
+			self.studentRowIndex = dict()
+			for row, number in enumerate(self.studentNumbers.tolist()):
+				self.studentRowIndex.setdefault(number, []).append(row)
+		return np.array(self.studentRowIndex.get(studentNumber, ()), np.intp)
+
+	def rowsFor(self, assignmentPool):
+		if assignmentPool is None or assignmentPool is self.assignments:
+			return np.arange(len(self))
+		if isinstance(assignmentPool, str):
+			return self.markerRows(assignmentPool)
+		return np.fromiter((self.rowIndex[id(a)] for a in assignmentPool), np.intp, len(assignmentPool))
+
+	def validRowsFor(self, assignmentPool):
+		rows = self.rowsFor(assignmentPool)
+		return rows[self.valid[rows]]
+
+	def markerStatistics(self):
+		# Statistics of every marker in one pass over the valid rows sorted by
+		# marker, then total, so that each marker is a contiguous run. Gives
+		# marker name -> (marked, errors, min, mean, max, variance, median,
+		# mean testing, mean usability, mean quality), with None for the
+		# statistics of a marker without valid assignments.
+		markers = len(self.markerNames)
+		known = self.markerCodes >= 0
+		marked = np.bincount(self.markerCodes[known], minlength=markers)
+		errors = np.bincount(self.markerCodes[known & ~self.valid], minlength=markers)
+
+		rows = np.flatnonzero(known & self.valid)
+		rows = rows[np.lexsort((self.total[rows], self.markerCodes[rows]))]
+		codes = self.markerCodes[rows]
+		counts = np.bincount(codes, minlength=markers)
+		present = np.flatnonzero(counts)
+		counts = counts[present]
+		starts = np.cumsum(counts) - counts
+
+		total = self.total[rows]
+		means = np.add.reduceat(total, starts) / counts
+		deviation = total - np.repeat(means, counts)
+		variances = np.add.reduceat(deviation * deviation, starts) / counts
+		medians = (total[starts + (counts - 1) // 2] + total[starts + counts // 2]) / 2.0
+		minimums = total[starts]
+		maximums = total[starts + counts - 1]
+		componentMeans = [np.add.reduceat(column[rows], starts) / counts
+			for column in (self.testing, self.usability, self.quality)]
+
+		statistics = {name: (int(marked[code]), int(errors[code])) + (None,) * 8
+			for code, name in enumerate(self.markerNames)}
+		for i, code in enumerate(present):
+			statistics[self.markerNames[code]] = (int(marked[code]), int(errors[code]),
+				float(minimums[i]), float(means[i]), float(maximums[i]), float(variances[i]),
+				float(medians[i])) + tuple(float(column[i]) for column in componentMeans)
+		return statistics
+
+
+class AssignmentAnalyser:
+
+	def __init__(self, assignments=[], markers=[], studentIndex=None, markerIndex=None, duplicates=None):
+		self.assignments = assignments
+		self.markers = markers
+
+		if studentIndex is None:
+			studentIndex = dict()
+			duplicates = []
+			for a in assignments:
+				if a.getStudentNumber() in studentIndex:
+					duplicates.append(a)
+				else:
+					studentIndex[a.getStudentNumber()] = a
+		if markerIndex is None:
+			markerIndex = {m.getName(): m for m in markers}
+
+		self.studentIndex = studentIndex
+		self.markerIndex = markerIndex
+		self.duplicates = duplicates if duplicates is not None else []
+		self.modificationCounts = dict()
+		self.ownModifications = None
+		self.watchModifications(assignments)
+		self.watchModifications(markers)
+		self.store = None
+		self.storeModifications = None
+		self.statisticsCache = dict()
+		self.commentIndex = None
+		self.commentIndexModifications = None
+
+	@classmethod
+	def fromParser(cls, parser: AssignmentParser):
+		# Analyser over everything a parser has added, sharing its indexes
+		return cls(parser.getAssignments(), parser.getMarkers(), parser.getStudentIndex(),
+			parser.getMarkerIndex(), parser.getDuplicates())
+
+	@classmethod
+	def fromStore(cls, store: GradeStore, commentTable: tuple = None):
+		# Analyser over grades loaded without assignment objects, for instance
+		# from a snapshot, with comments in the form given by
+		# comment_index.commentTable. The objects are only built when first needed.
+		analyser = cls.__new__(cls)
+		analyser.store = store
+		analyser.modificationCounts = dict()
+		analyser.ownModifications = None
+		analyser.storeModifications = ()
+		analyser.statisticsCache = dict()
+		analyser.commentTable = commentTable
+		return analyser
+
+	def __getattr__(self, name: str):
+		# Only called for missing attributes, i.e. before materialize()
+		if name in ('assignments', 'markers', 'studentIndex', 'markerIndex', 'duplicates', 'commentIndex',
+				'commentIndexModifications') and self.__dict__.get('store') is not None:
+			self.materialize()
+			return self.__dict__[name]
+		raise AttributeError(name)
+
+	def materialize(self):
+		store = self.store
+		markers = [Marker(name) for name in store.markerNames]
+		commentTable = self.__dict__.get('commentTable')
+		if commentTable is not None:
+			import comment_index
+			rowComments = comment_index.commentsFromTable(len(store), *commentTable)
+		assignments = []
+		for i in range(len(store)):
+			assignment = Assignment(str(store.studentNumbers[i]), markers[store.markerCodes[i]])
+			assignment.setOverallGrade(float(store.testing[i]), float(store.usability[i]),
+				float(store.quality[i]))
+			assignment.setParts(store.testingParts[i], store.qualityParts[i])
+			if commentTable is not None:
+				assignment.setComments(rowComments[i])
+			assignment.marker.addAssignment(assignment)
+			assignments.append(assignment)
+
+		self.__init__(assignments, markers)
+		self.commentTable = None
+		# The grades have not changed, so the existing store stays valid
+		store.attachAssignments(assignments)
+		self.store = store
+		self.storeModifications = self.modifications()
+
+	def __getstate__(self):
+		# A store indexed by assignment object ids is rebuilt after unpickling
+		state = self.__dict__.copy()
+		if self.store is not None and self.store.assignments is not None:
+			state['store'] = None
+		state['statisticsCache'] = dict()
+		state['commentIndex'] = None
+		return state
+
+	def watchModifications(self, items):
+		# Follows the modification counts of the given assignments or markers,
+		# attaching one of the analyser's own to any that have none
+		for item in items:
+			if item.modifications is None:
+				if self.ownModifications is None:
+					self.ownModifications = ModificationCount()
+				item.modifications = self.ownModifications
+			if id(item.modifications) not in self.modificationCounts:
+				self.modificationCounts[id(item.modifications)] = item.modifications
+
+	def modifications(self):
+		return tuple(modifications.count for modifications in self.modificationCounts.values())
+
+	def getStore(self, assignmentPool=None):
+		# Rebuilt, and cached statistics dropped, only when one of the
+		# analyser's assignments or markers has changed. Rows of a pool of
+		# assignments are found by object, so a store loaded without them,
+		# from a snapshot, has them built when given one.
+		if (self.store is not None and self.store.assignments is None and assignmentPool is not None
+				and not isinstance(assignmentPool, str)):
+			self.materialize()
+		if self.store is None or self.storeModifications != self.modifications():
+			with timings.stage('build grade store and validate'):
+				self.store = GradeStore.fromAssignments(self.assignments, self.markers)
+			self.storeModifications = self.modifications()
+			self.statisticsCache = dict()
+		return self.store
+
+	def applyChanges(self, added: list = (), changed: list = (), removed: list = ()):
+		# Updates the store and comment index in place after the parser has
+		# added, parsed again or removed assignments, instead of rebuilding them
+		self.watchModifications(added)
+		self.watchModifications(assignment.getMarker() for assignment in added)
+		if self.commentIndex is not None:
+			for assignment in removed:
+				self.commentIndex.remove(assignment)
+			for assignment in list(changed) + list(added):
+				self.addToCommentIndex(assignment)
+			self.commentIndexModifications = self.modifications()
+
+		if self.store is None or self.store.assignments is None:
+			return self.getStore()
+		with timings.stage('update grade store'):
+			self.store.applyChanges(self.assignments, added, changed, removed)
+		self.storeModifications = self.modifications()
+		self.statisticsCache = dict()
+		return self.store
+
+	def addToCommentIndex(self, assignment: Assignment):
+		self.commentIndex.add(assignment, assignment.getStudentNumber(), assignment.getMarker().getName(),
+			assignment.getComments())
+
+	def getCommentIndex(self):
+		# Built on first use, and rebuilt if assignments changed other than
+		# through applyChanges
+		if self.commentIndex is None or self.commentIndexModifications != self.modifications():
+			with timings.stage('build comment index'):
+				self.commentIndex = CommentIndex()
+				for assignment in self.assignments:
+					self.addToCommentIndex(assignment)
+			self.commentIndexModifications = self.modifications()
+		return self.commentIndex
+
+	def getCommentTable(self):
+		# Comments of every row, in the form of comment_index.commentTable
+		commentTable = self.__dict__.get('commentTable')
+		if commentTable is None:
+			import comment_index
+			return comment_index.commentTable([assignment.comments for assignment in self.assignments])
+		return commentTable
+
+	def commentSearchDisplay(self, query: str):
+		with timings.stage('search comments'):
+			return self.getCommentIndex().searchDisplay(query)
+
+	def select(self, queryText: str):
+		# Rows of the store matching a query such as
+		# 'select where quality < 2 and marker = alice', see query.py
+		import query
+		with timings.stage('select'):
+			return query.compileQuery(queryText).rows(self.getStore())
+
+	def selectDisplay(self, queryText: str, limit: int = 20):
+		store = self.getStore()
+		rows = self.select(queryText)
+		validRows = rows[store.valid[rows]]
+
+		result = 'SELECTED ASSIGNMENTS\n{0}\n'.format(dispHeadingUnderline('SELECTED ASSIGNMENTS'))
+		result += 'Matching Assignments: {0}\n'.format(len(rows))
+		result += 'Matching Assignments With Marking Errors: {0}\n'.format(len(rows) - len(validRows))
+		if len(validRows):
+			minTotal, meanTotal, maxTotal, varTotal, medianTotal = self.gradeStatistics(store.total[validRows])
+			result += 'Min/Mean/Max Grade: {0}/{1}/{2}\n'.format(minTotal, roundValue(meanTotal, 0.01), maxTotal)
+
+		if len(rows):
+			result += '\nStudent   Marker  Testing/Usability/Quality  Total\n'
+		for i in rows[:limit]:
+			result += '{0}  {1}  {2}/{3}/{4}  {5}{6}\n'.format(store.studentNumbers[i],
+				store.markerNames[store.markerCodes[i]], store.testing[i], store.usability[i],
+				store.quality[i], store.total[i], '' if store.valid[i] else '  (marking error)')
+		if len(rows) > limit:
+			result += '... {0} more\n'.format(len(rows) - limit)
+
+		return result
+
+	def getAssignment(self, studentNumber: str):
+		return self.studentIndex.get(studentNumber)
+
+	def getMarker(self, markerName: str):
+		return self.markerIndex.get(markerName)
+
+	def hasMarker(self, markerName: str):
+		return self.getStore().hasMarker(markerName)
+
+	def getMarkerNames(self):
+		return list(self.getStore().markerNames)
+
+	def totalGrades(self, assignmentPool):
+		store = self.getStore(assignmentPool)
+		return store.total[store.validRowsFor(assignmentPool)]
+
+	def testingGrades(self, assignmentPool):
+		store = self.getStore(assignmentPool)
+		return store.testing[store.validRowsFor(assignmentPool)]
+
+	def usabilityGrades(self, assignmentPool):
+		store = self.getStore(assignmentPool)
+		return store.usability[store.validRowsFor(assignmentPool)]
+
+	def qualityGrades(self, assignmentPool):
+		store = self.getStore(assignmentPool)
+		return store.quality[store.validRowsFor(assignmentPool)]
+
+	def gradeStatistics(self, grades):
+		# (min, mean, max, variance, median) of an array of grades
+		return (grades.min(), grades.mean(), grades.max(), grades.var(), np.median(grades))
+
+	def cachedForPool(self, assignmentPool, name: str, compute):
+		store = self.getStore(assignmentPool)
+		if assignmentPool is None or isinstance(assignmentPool, str):
+			# Marker names are compared by value, as each command gives a new string
+			key = (assignmentPool, name)
+			cached = self.statisticsCache.get(key)
+			if cached is not None:
+				return cached[1]
+		else:
+			key = (id(assignmentPool), name)
+			cached = self.statisticsCache.get(key)
+			if cached is not None and cached[0] is assignmentPool:
+				return cached[1]
+
+		result = compute(store)
+		# A list pool is kept alongside so that a recycled id() cannot match
+		self.statisticsCache[key] = (assignmentPool, result)
+		return result
+
+	def poolStatistics(self, assignmentPool, component: str = 'total'):
+		return self.cachedForPool(assignmentPool, component, lambda store:
+			self.gradeStatistics(getattr(store, component)[store.validRowsFor(assignmentPool)]))
+
+	def allMarkerStatistics(self):
+		return self.cachedForPool(None, 'markers', lambda store: store.markerStatistics())
+
+	def gradeHistograms(self, assignmentPool):
+		def compute(store):
+			rows = store.rowsFor(assignmentPool)
+			return GradeHistograms(
+				{'testing': store.testing[rows], 'usability': store.usability[rows],
+					'quality': store.quality[rows], 'total': store.total[rows]},
+				{'testing': maxMarks[0], 'usability': maxMarks[1],
+					'quality': maxMarks[2], 'total': sum(maxMarks)})
+		return self.cachedForPool(assignmentPool, 'histograms', compute)
+
+	def grade3DCountDict(self, assignmentPool):
+		grades = dict()
+
+		for a in assignmentPool:
+			key = (a.getOverallTesting(), a.getOverallUsability(), a.getOverallQuality())
+			grades[key] = grades.get(key, 0) + 1
+
+		return grades
+
+	def gradeTestQualityDict(self, assignmentPool):
+		store = self.getStore(assignmentPool)
+		rows = store.rowsFor(assignmentPool)
+		pairs, counts = np.unique(np.column_stack((store.testing[rows], store.quality[rows])),
+			axis=0, return_counts=True)
+
+		return {(float(t), float(q)): int(count) for (t, q), count in zip(pairs, counts)}
+
+	def getErroneousAssignments(self, assignmentPool):
+		# Assignment objects are wanted even for every row
+		store = self.getStore(self.assignments if assignmentPool is None else assignmentPool)
+		rows = store.rowsFor(assignmentPool)
+		return [store.assignments[i] for i in rows[~store.valid[rows]]]
+
+	def getOverallMin(self):
+		return self.poolStatistics(None)[0]
+
+	def getOverallMax(self):
+		return self.poolStatistics(None)[2]
+
+	def getOverallMean(self):
+		return roundValue(self.poolStatistics(None)[1], 0.01)
+
+	def getOverallVariance(self):
+		return roundValue(self.poolStatistics(None)[3], 0.01)
+
+	def getOverallMedian(self):
+		return roundValue(self.poolStatistics(None)[4], 0.01)
+
+	def overallStatDisplay(self):
+		store = self.getStore()
+		if not store.valid.any():
+			result = 'OVERALL ASSIGNMENT STATISTICS\n{0}\n'.format(
+				dispHeadingUnderline('OVERALL ASSIGNMENT STATISTICS'))
+			result += 'Total Assignments Marked: {0}\n'.format(len(store))
+			result += 'Total Assignments With Marking Errors: {0}\n'.format(len(store))
+			return result + 'No assignments without marking errors\n'
+		minTotal, meanTotal, maxTotal, varTotal, medianTotal = self.poolStatistics(None)
+		minTesting, meanTesting, maxTesting, varTesting, _ = self.poolStatistics(None, 'testing')
+		minUsability, meanUsability, maxUsability, varUsability, _ = self.poolStatistics(
+			None, 'usability')
+		minQuality, meanQuality, maxQuality, varQuality, _ = self.poolStatistics(None, 'quality')
+		meanTesting, varTesting = roundValue(meanTesting, 0.01), roundValue(varTesting, 0.01)
+		meanUsability, varUsability = roundValue(meanUsability, 0.01), roundValue(varUsability, 0.01)
+		meanQuality, varQuality = roundValue(meanQuality, 0.01), roundValue(varQuality, 0.01)
+
+		result = 'OVERALL ASSIGNMENT STATISTICS\n{0}\n'.format(
+			dispHeadingUnderline('OVERALL ASSIGNMENT STATISTICS'))
+		result += 'Total Assignments Marked: {0}\n'.format(len(store))
+		result += 'Total Assignments With Marking Errors: {0}\n'.format(int(np.count_nonzero(~store.valid)))
+		result += 'Min/Mean/Max Grade: {0}/{1}/{2}\n'.format(minTotal,
+			roundValue(meanTotal, 0.01), maxTotal)
+		result += 'Variance: {0}\n'.format(roundValue(varTotal, 0.01))
+		result += 'Median: {0}\n'.format(roundValue(medianTotal, 0.01))
+		result += '\nTesting Min/Mean/Max: {0}/{1}/{2}\tVariance: {3}\n'.format(minTesting, meanTesting, maxTesting, varTesting)
+		result += 'Usability Min/Mean/Max: {0}/{1}/{2}\tVariance: {3}\n'.format(minUsability, meanUsability, maxUsability, varUsability)
+		result += 'Quality Min/Mean/Max: {0}/{1}/{2}\tVariance: {3}\n'.format(minQuality, meanQuality, maxQuality, varQuality)
+
+		return result
+
+	def markerStatDisplay(self, markerName):
+		store = self.getStore()
+		if not store.hasMarker(markerName):
+			raise KeyError(markerName)
+
+		result = 'MARKER STATISTICS FOR {0}\n{1}\n'.format(markerName.upper(), 
+			dispHeadingUnderline('MARKER STATISTICS FOR ' + markerName))
+
+		rows = store.markerRows(markerName)
+		result += 'Assignments Marked: {0}\n'.format(len(rows))
+		if not store.valid[rows].any():
+			result += 'Assignments With Marking Errors: {0}\n'.format(len(rows))
+			return result + 'No assignments without marking errors\n'
+
+		minMark, meanMark, maxMark, varMark, medianMark = self.poolStatistics(markerName)
+		result += 'Min/Mean/Max Grade: {0}/{1}/{2}\n'.format(minMark, meanMark, maxMark)
+		result += 'Variance: {0}\n'.format(varMark)
+		result += 'Median: {0}\n'.format(medianMark)
+
+		return result
+
+	def allMarkerStatDisplay(self):
+		statistics = self.allMarkerStatistics()
+		width = max([len('Marker')] + [len(name) for name in statistics])
+
+		result = 'ALL MARKER STATISTICS\n{0}\n'.format(dispHeadingUnderline('ALL MARKER STATISTICS'))
+		result += '{0:<{1}}  Marked  Errors    Min   Mean    Max    Var  Median  Testing  Usability  Quality\n'.format(
+			'Marker', width)
+		for name, (marked, errors, *grades) in statistics.items():
+			result += '{0:<{1}}  {2:>6}  {3:>6}'.format(name, width, marked, errors)
+			if grades[0] is None:
+				result += '  (no valid assignments)\n'
+				continue
+			minMark, meanMark, maxMark, varMark, medianMark, meanTesting, meanUsability, meanQuality = grades
+			result += '  {0:>5}  {1:>5}  {2:>5}  {3:>5}  {4:>6}  {5:>7}  {6:>9}  {7:>7}\n'.format(
+				minMark, roundValue(meanMark, 0.01), maxMark, roundValue(varMark, 0.01),
+				roundValue(medianMark, 0.01), roundValue(meanTesting, 0.01),
+				roundValue(meanUsability, 0.01), roundValue(meanQuality, 0.01))
+
+		return result
+
+	def groupedGrades(self):
+		import moderation
+		return self.cachedForPool(None, 'grouped', moderation.GroupedGrades)
+
+	def markerBias(self, resamples: int = None, seed=None, workers: int = 1):
+		# Each marker's deviation from the cohort on every component, tested
+		# for bias by permutation and bounded by bootstrap, see moderation.markerBias
+		import moderation
+		resamples = resamples or moderation.DEFAULT_RESAMPLES
+		return self.cachedForPool(None, ('bias', resamples), lambda store:
+			moderation.markerBias(self.groupedGrades(), resamples, seed=seed, workers=workers))
+
+	def partOutliers(self):
+		import moderation
+		return self.cachedForPool(None, 'outliers', lambda store: moderation.partOutliers(self.groupedGrades()))
+
+	def markerBiasDisplay(self, resamples: int = None, workers: int = 1):
+		import moderation
+		resamples = resamples or moderation.DEFAULT_RESAMPLES
+		bias = self.markerBias(resamples, workers=workers)
+		width = max([len('Marker')] + [len(name) for name in bias])
+
+		result = 'MARKER BIAS\n{0}\n'.format(dispHeadingUnderline('MARKER BIAS'))
+		result += 'Mean grade against the cohort, from {0} permutations and bootstrap resamples\n'.format(resamples)
+		result += '* bias at the 5% level, adjusted for every marker and component tested\n\n'
+		result += '{0:<{1}}  Valid  Component  Deviation  Effect    95% Interval       p\n'.format('Marker', width)
+		for name, components in bias.items():
+			for i, (component, (count, deviation, effect, p, adjusted, lower, upper)) in enumerate(components.items()):
+				result += '{0:<{1}}  {2:>5}  {3:<9}  {4:>+9.2f}  {5:>+6.2f}  [{6:+.2f}, {7:+.2f}]  {8:.3f}{9}\n'.format(
+					name if i == 0 else '', width, count if i == 0 else '', component.capitalize(), deviation,
+					effect, lower, upper, p, ' *' if adjusted < 0.05 else '')
+		if not bias:
+			result += '(no valid assignments)\n'
+
+		return result
+
+	def partOutlierDisplay(self, limit: int = 20):
+		store = self.getStore()
+		outliers, markerCounts = self.partOutliers()
+		partNames = TESTING_PART_NAMES + QUALITY_PART_NAMES
+		parts = np.hstack((store.testingParts, store.qualityParts))
+
+		result = 'PART GRADE OUTLIERS\n{0}\n'.format(dispHeadingUnderline('PART GRADE OUTLIERS'))
+		result += '{0} of {1} valid assignments have part grades unlike the cohort\n'.format(len(outliers),
+			len(self.groupedGrades()))
+		for row, distance, threshold, part in outliers[:limit]:
+			result += '  {0} ({1})  distance {2:.1f} over {3:.1f}, furthest on {4} ({5})\n'.format(
+				store.studentNumbers[row], store.markerNames[store.markerCodes[row]], distance, threshold,
+				partNames[part], parts[row, part])
+		if len(outliers) > limit:
+			result += '  ... {0} more\n'.format(len(outliers) - limit)
+
+		result += '\nOutliers per marker\n'
+		for name, count in markerCounts.items():
+			result += '  {0}: {1} ({2:.1f}%)\n'.format(name, count,
+				100 * count / len(store.validRowsFor(name)))
+
+		return result
+
+	def markingErrorDisplay(self):
+		store = self.getStore()
+		markerNames = store.markerNames
+
+		result = 'ASSIGNMENTS WITH MARKING ERRORS\n{0}\n'.format(
+			dispHeadingUnderline('ASSIGNMENTS WITH MARKING ERRORS'))
+
+		# One line per broken rule, grouped by marker
+		result += store.errors.display(store.studentNumbers, markerNames)
+		if len(store.duplicateRows):
+			result += '\n'
+
+		for i in store.duplicateRows:
+			result += '{0} - marked by {1} (duplicate of assignment marked by {2})\n'.format(
+				store.studentNumbers[i], markerNames[store.markerCodes[i]],
+				markerNames[store.markerCodes[store.firstRows[i]]])
+
+		return result
+
+	def dataGraph(self, assignmentPool):
+		with timings.stage('render graph'):
+			return self.renderDataGraph(assignmentPool)
+
+	def renderDataGraph(self, assignmentPool):
+		histograms = self.gradeHistograms(assignmentPool)
+		fig = plot.figure()
+		gs = gridspec.GridSpec(3, 2)
+
+		# Testing-Quality dot graph
+		graph = fig.add_subplot(gs[0, 0])
+		grades = self.gradeTestQualityDict(assignmentPool)
+		for grade in grades:
+			graph.plot(grade[0], grade[1], 'bo', ms=(1+ grades[grade]))
+
+		graph.set_xlim([-0.2, maxMarks[0]+0.2])
+		graph.set_ylim([-0.2, maxMarks[2]+0.2])
+		graph.grid(True)
+		graph.set_xlabel('Testing Grade')
+		graph.set_ylabel('Quality Grade')
+		graph.set_title('Testing-Quality Graph')
+
+		# Testing grades
+
+		graph = fig.add_subplot(gs[0, 1])
+
+		x, y = histograms.getHistogram('testing')
+
+		graph.set_xlim([0, maxMarks[0]])
+		graph.set_ylim([0, max(y)*1.2])
+		graph.grid(True)
+		graph.set_xlabel('Testing Grade')
+		graph.set_ylabel('Occurrences')
+		graph.set_title('Testing Grades Distribution')
+
+		graph.plot(x, y, 'r-')
+
+		# Usability grades
+		graph = fig.add_subplot(gs[1, 0])
+
+		x, y = histograms.getHistogram('usability')
+
+		graph.plot(x, y, 'r-')
+
+		graph.set_xlim([0, maxMarks[1]])
+		graph.set_ylim([0, max(y)*1.2])
+		graph.grid(True)
+		graph.set_xlabel('Usability Grade')
+		graph.set_ylabel('Occurrences')
+		graph.set_title('Usability Grades Distribution')
+
+		# Quality grades
+		graph = fig.add_subplot(gs[1, 1])
+
+		x, y = histograms.getHistogram('quality')
+
+		graph.plot(x, y, 'r-')
+
+		graph.set_xlim([0, maxMarks[2]])
+		graph.set_ylim([0, max(y)*1.2])
+		graph.grid(True)
+		graph.set_xlabel('Quality Grade')
+		graph.set_ylabel('Occurrences')
+		graph.set_title('Quality Grades Distribution')
+
+		# Overall grades
+		graph = fig.add_subplot(gs[2, :])
+
+		x, y = histograms.getHistogram('total')
+
+		graph.plot(x, y, 'r-')
+
+		graph.set_xlim([0, sum(maxMarks)])
+		graph.set_xticks(range(0, sum(maxMarks)+1, 1))
+		graph.set_ylim([0, max(y)*1.2])
+		graph.grid(True)
+		graph.set_xlabel('Overall Grade')
+		graph.set_ylabel('Occurrences')
+		graph.set_title('Overall Grades Distribution')
+
+		fig.tight_layout()
+		return fig
+
+	def overallDataGraph(self):
+		return self.dataGraph(None)
+
+	def markerDataGraph(self, markerName):
+		if not self.hasMarker(markerName):
+			raise KeyError(markerName)
+		return self.dataGraph(markerName)
@@ -0,0 +1,378 @@
+import os
+import json
+import argparse
+
+import numpy as np
+
+from a3_analysis import dispHeadingUnderline, roundValue
+from parse_cache import ParseCache
+from comment_index import commentTable, matchingTextCodes
+from rubric import Rubric
+
+INDEX_NAME = 'index.json'
+PARTITION_NAME = 'grades.npz'
+ARCHIVE_VERSION = 2
+# Version 1 archives, from before comments were kept, are still read, but
+# their partitions have no comment columns until they are ingested again
+READABLE_VERSIONS = (1, 2)
+# Width of the bins, as a fraction of the maximum mark, used to compare distributions
+SHIFT_BIN_WIDTH = 0.05
+
+
+def a3Rubric():
+	import a3_analysis
+	return a3_analysis.RUBRIC
+
+
+def scriptRubric():
+	import assignment_script
+	return assignment_script.RUBRIC
+
+
+def parseA3(dir: str, useCache: bool = True):
+	import a3_analysis
+	parser = a3_analysis.AssignmentParser()
+	cache = ParseCache.forDirectory(dir, a3_analysis.CACHE_NAME,
+		a3_analysis.CACHE_VERSION) if useCache else None
+	parser.parseDirectoryStructure(dir, cache=cache)
+	store = a3_analysis.GradeStore.fromAssignments(parser.getAssignments(), parser.getMarkers())
+	comments = [assignment.comments for assignment in parser.getAssignments()]
+	return store.studentNumbers, store.markerNames, store.markerCodes, store.valid, store.getColumns(), comments
+
+
+def parseScript(dir: str, useCache: bool = True):
+	import assignment_script
+	cache = ParseCache.forDirectory(dir, assignment_script.CACHE_NAME,
+		assignment_script.CACHE_VERSION) if useCache else None
+
+	studentNumbers = []
+	markerCodes = dict()
+	markerColumn = []
+	grades = []
+	comments = []
+	for assignment in assignment_script.iterAssignments(dir, cache):
+		studentNumbers.append(assignment.studentNumber)
+		markerColumn.append(markerCodes.setdefault(assignment.marker, len(markerCodes)))
+		grades.append(assignment.getGrades())
+		comments.append([(part, comment) for part, partComments in enumerate(assignment.partComments)
+			for comment in partComments])
+	if cache is not None:
+		cache.prune()
+		cache.save()
+
+	markerColumn = np.array(markerColumn, np.int32)
+	columns = assignment_script.RUBRIC.columns(np.array(grades, np.float64).reshape(len(grades),
+		len(assignment_script.RUBRIC.lines)))
+	valid = ~assignment_script.MARKING_RULES.evaluate(columns, markerColumn).invalid
+	return np.array(studentNumbers, dtype=str), list(markerCodes), markerColumn, valid, columns, comments
+
+
+def parseRubric(rubric: Rubric, dir: str, useCache: bool = True):
+	# Any marked folder whose rubric is given as a schema
+	cache = ParseCache.forDirectory(dir, 'rubric-' + rubric.name, rubric.cacheVersion()) if useCache else None
+	studentNumbers, markerNames, markerCodes, grades, comments = rubric.parseDirectory(dir, cache)
+	if cache is not None:
+		cache.prune()
+		cache.save()
+	columns = rubric.columns(grades)
+	valid = ~rubric.markingRules().evaluate(columns, markerCodes).invalid
+	return studentNumbers, markerNames, markerCodes, valid, columns, comments
+
+
+# Marked folder formats which can be ingested: rubric and parser for each.
+# Parsers give student numbers, marker names and codes, validity, grade
+# columns and the (section code, comment) pairs of each row.
+FORMATS = {'a3': (a3Rubric, parseA3), 'script': (scriptRubric, parseScript)}
+
+
+class Partition:
+	# Grades of one assignment in one offering, stored as one array per
+	# column. Columns are only read from disk when asked for.
+
+	def __init__(self, archive, entry: dict):
+		self.archive = archive
+		self.offering = entry['offering']
+		self.assignment = entry['assignment']
+		self.rows = entry['rows']
+		self.markerNames = entry['markers']
+		self.rubric = Rubric.fromJson(entry['rubric'])
+		self.path = os.path.join(archive.root, entry['path'])
+
+	def read(self, columns: list):
+		with np.load(self.path, allow_pickle=False) as data:
+			return {column: data[column] for column in columns}
+
+	def hasColumns(self, columns: list):
+		with np.load(self.path, allow_pickle=False) as data:
+			return all(column in data.files for column in columns)
+
+	def grades(self, component: str):
+		# Component, or total, of each row, with the marker codes and validity
+		components = list(self.rubric.components) if component == 'total' else [component]
+		data = self.read(components + ['markerCodes', 'valid'])
+		grades = data[components[0]].copy()
+		for name in components[1:]:
+			grades += data[name]
+		return grades, data['markerCodes'], data['valid']
+
+	def __repr__(self):
+		return '<Partition {0}/{1}>'.format(self.offering, self.assignment)
+
+
+class Archive:
+	# Grades of many offerings and assignments, partitioned on disk by
+	# offering then assignment. An index of the partitions, with each one's
+	# rubric, row count and markers, lets queries open only the partitions
+	# they need.
+
+	def __init__(self, root: str):
+		self.root = root
+		self.indexPath = os.path.join(root, INDEX_NAME)
+		self.entries = []
+		self.load()
+
+	def load(self):
+		try:
+			with open(self.indexPath) as file:
+				index = json.load(file)
+		except FileNotFoundError:
+			return
+
+		if index.get('version') not in READABLE_VERSIONS:
+			raise ValueError('Archive {0} has version {1}, expected {2}'.format(
+				self.root, index.get('version'), ARCHIVE_VERSION))
+		self.entries = index['partitions']
+
+	def save(self):
+		os.makedirs(self.root, exist_ok=True)
+		tmpPath = self.indexPath + '.tmp'
+		with open(tmpPath, 'w') as file:
+			json.dump({'version': ARCHIVE_VERSION, 'partitions': self.entries}, file, indent=1)
+		os.replace(tmpPath, self.indexPath)
+
+	def components(self):
+		# Components of the rubrics of every partition, then total
+		components = dict()
+		for entry in self.entries:
+			components.update(dict.fromkeys(Rubric.fromJson(entry['rubric']).components))
+		return list(components) + ['total']
+
+	def partitions(self, offerings: list = None, assignments: list = None, component: str = None):
+		# Partitions in offering then assignment order, optionally only some,
+		# or only those whose rubric has the given component
+		if component is not None and self.entries and component not in self.components():
+			raise ValueError('Unknown component {0!r}, expected one of: {1}'.format(component,
+				', '.join(self.components())))
+		partitions = [Partition(self, entry) for entry in sorted(self.entries,
+				key=lambda entry: (entry['offering'], entry['assignment']))
+			if (offerings is None or entry['offering'] in offerings)
+				and (assignments is None or entry['assignment'] in assignments)]
+		if component is not None:
+			partitions = [partition for partition in partitions if partition.rubric.hasComponent(component)]
+		return partitions
+
+	def ingest(self, offering: str, assignment: str, dir: str, format: str = 'a3', useCache: bool = True,
+			rubric: Rubric = None):
+		# Parses a marked folder into the partition for offering/assignment,
+		# replacing any earlier ingest of the same partition. A rubric, if
+		# given, is used in place of the format.
+		for name in (offering, assignment):
+			if not name or name.startswith('.') or os.sep in name or '/' in name:
+				raise ValueError('Invalid offering or assignment name: {0!r}'.format(name))
+		if rubric is None:
+			makeRubric, parse = FORMATS[format]
+			rubric = makeRubric()
+			studentNumbers, markerNames, markerCodes, valid, columns, comments = parse(dir, useCache)
+		else:
+			studentNumbers, markerNames, markerCodes, valid, columns, comments = parseRubric(rubric, dir, useCache)
+		commentRows, commentSections, commentCodes, commentTexts = commentTable(comments)
+
+		path = os.path.join(offering, assignment, PARTITION_NAME)
+		fullPath = os.path.join(self.root, path)
+		os.makedirs(os.path.dirname(fullPath), exist_ok=True)
+		with open(fullPath + '.tmp', 'wb') as file:
+			np.savez(file, studentNumbers=studentNumbers, markerCodes=markerCodes, valid=valid,
+				commentRows=commentRows, commentSections=commentSections, commentCodes=commentCodes,
+				commentTexts=commentTexts, **columns)
+		os.replace(fullPath + '.tmp', fullPath)
+
+		self.entries = [entry for entry in self.entries
+			if (entry['offering'], entry['assignment']) != (offering, assignment)]
+		self.entries.append({'offering': offering, 'assignment': assignment, 'path': path,
+			'rows': len(markerCodes), 'markers': list(markerNames), 'rubric': rubric.toJson()})
+		self.save()
+		return self.partitions([offering], [assignment])[0]
+
+	def markerDrift(self, component: str = 'total', offerings: list = None, assignments: list = None):
+		# Each marker's mean grade against the mean of the whole partition, as
+		# fractions of the maximum mark so that rubrics can be compared. Gives
+		# (marker, offering, assignment, count, marker mean, partition mean).
+		result = []
+		for partition in self.partitions(offerings, assignments, component):
+			grades, markerCodes, valid = partition.grades(component)
+			if not valid.any():
+				continue
+			grades = grades[valid] / partition.rubric.maxMark(component)
+			markerCodes = markerCodes[valid]
+			counts = np.bincount(markerCodes, minlength=len(partition.markerNames))
+			sums = np.bincount(markerCodes, weights=grades, minlength=len(partition.markerNames))
+			mean = grades.mean()
+			for code in np.flatnonzero(counts):
+				result.append((partition.markerNames[code], partition.offering, partition.assignment,
+					int(counts[code]), float(sums[code] / counts[code]), float(mean)))
+		return sorted(result, key=lambda row: row[0])
+
+	def searchComments(self, query: str, offerings: list = None, assignments: list = None, limit: int = 20):
+		# Comments using every term of the query, straight from the comment
+		# tables: texts are matched once each, then rows found with np.isin.
+		# Gives the number of matching comments, the first limit of them as
+		# (partition, student number, marker, section, comment), per marker
+		# the assignments with a match and the assignments marked, and the
+		# partitions not searched as they were ingested without comments.
+		count = 0
+		matches = []
+		markerCounts = dict()
+		unsearched = []
+		for partition in self.partitions(offerings, assignments):
+			columns = ['commentRows', 'commentSections', 'commentCodes', 'commentTexts']
+			if not partition.hasColumns(columns):
+				unsearched.append(partition)
+				continue
+			data = partition.read(columns + ['studentNumbers', 'markerCodes'])
+			texts = data['commentTexts']
+			found = np.flatnonzero(np.isin(data['commentCodes'], matchingTextCodes(texts, query)))
+			rows = data['commentRows'][found]
+			markerCodes = data['markerCodes']
+			count += len(found)
+			shown = found[:max(0, limit - len(matches))]
+			for row, section, code in zip(data['commentRows'][shown], data['commentSections'][shown],
+					data['commentCodes'][shown]):
+				matches.append((partition, str(data['studentNumbers'][row]),
+					partition.markerNames[markerCodes[row]], partition.rubric.sections[section], str(texts[code])))
+
+			marked = np.bincount(markerCodes, minlength=len(partition.markerNames))
+			using = np.bincount(markerCodes[np.unique(rows)], minlength=len(partition.markerNames))
+			for code, markerName in enumerate(partition.markerNames):
+				counts = markerCounts.get(markerName, (0, 0))
+				markerCounts[markerName] = (counts[0] + int(using[code]), counts[1] + int(marked[code]))
+		return count, matches, markerCounts, unsearched
+
+	def distributionShift(self, component: str = 'total', offerings: list = None, assignments: list = None):
+		# Each partition's distribution of grades, as fractions of the maximum
+		# mark, against the first partition of the same assignment. Gives
+		# (offering, assignment, count, mean, mean shift, largest difference
+		# between the cumulative distributions).
+		bins = int(round(1 / SHIFT_BIN_WIDTH)) + 1
+		baselines = dict()
+		result = []
+		for partition in self.partitions(offerings, assignments, component):
+			grades, _, valid = partition.grades(component)
+			grades = grades[valid] / partition.rubric.maxMark(component)
+			if not len(grades):
+				continue
+			bin = np.clip(np.floor(grades / SHIFT_BIN_WIDTH + 1e-9), 0, bins - 1).astype(np.intp)
+			cumulative = np.cumsum(np.bincount(bin, minlength=bins)) / len(grades)
+			mean = float(grades.mean())
+
+			baseline = baselines.setdefault(partition.assignment, (cumulative, mean))
+			result.append((partition.offering, partition.assignment, len(grades), mean,
+				mean - baseline[1], float(np.abs(cumulative - baseline[0]).max())))
+		return result
+
+
+def driftDisplay(rows: list, component: str):
+	heading = 'MARKER DRIFT ({0}, % of maximum mark)'.format(component.upper())
+	result = '{0}\n{1}\n'.format(heading, dispHeadingUnderline(heading))
+	lastMarker = None
+	for marker, offering, assignment, count, markerMean, mean in rows:
+		if marker != lastMarker:
+			result += marker + '\n'
+			lastMarker = marker
+		result += '  {0}/{1}: {2} assignments, mean {3} vs {4} ({5:+})\n'.format(offering, assignment, count,
+			roundValue(100 * markerMean, 0.1), roundValue(100 * mean, 0.1),
+			roundValue(100 * (markerMean - mean), 0.1))
+	return result
+
+
+def searchDisplay(query: str, count: int, matches: list, markerCounts: dict, unsearched: list = ()):
+	heading = 'COMMENTS MATCHING \'{0}\''.format(query)
+	result = '{0}\n{1}\n{2} comments\n'.format(heading, dispHeadingUnderline(heading), count)
+	for partition, studentNumber, markerName, section, comment in matches:
+		result += '  {0}/{1} {2} ({3}) {4}: {5}\n'.format(partition.offering, partition.assignment,
+			studentNumber, markerName, section, comment)
+	if count > len(matches):
+		result += '  ... {0} more\n'.format(count - len(matches))
+
+	result += '\nUse per marker (assignments with a match, % of assignments marked)\n'
+	for markerName in sorted(markerCounts):
+		using, marked = markerCounts[markerName]
+		if using:
+			result += '  {0} {1} ({2:.1f}%)\n'.format(markerName, using, 100 * using / marked)
+
+	if unsearched:
+		result += '\nNot searched, ingested before comments were kept (ingest them again to search them)\n'
+		for partition in unsearched:
+			result += '  {0}/{1}\n'.format(partition.offering, partition.assignment)
+	return result
+
+
+def shiftDisplay(rows: list, component: str):
+	heading = 'DISTRIBUTION SHIFT ({0}, % of maximum mark)'.format(component.upper())
+	result = '{0}\n{1}\n'.format(heading, dispHeadingUnderline(heading))
+	for offering, assignment, count, mean, meanShift, distance in rows:
+		result += '{0}/{1}: {2} assignments, mean {3} ({4:+}), largest CDF difference {5}\n'.format(
+			offering, assignment, count, roundValue(100 * mean, 0.1), roundValue(100 * meanShift, 0.1),
+			roundValue(distance, 0.001))
+	return result
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Archive marked folders of many offerings and query them.')
+	argParser.add_argument('root', help='archive directory')
+	commands = argParser.add_subparsers(dest='command', required=True)
+
+	ingest = commands.add_parser('ingest', help='parse a marked folder into the archive')
+	ingest.add_argument('offering', help='offering, e.g. 2016S2')
+	ingest.add_argument('assignment', help='assignment, e.g. a3')
+	ingest.add_argument('dir', help='marked folder')
+	ingest.add_argument('--format', choices=sorted(FORMATS), default='a3', help='format of the marked files')
+	ingest.add_argument('--rubric', help='JSON or TOML rubric schema of the marked files, in place of --format')
+	ingest.add_argument('--no-cache', action='store_true', help='ignore the parse cache next to the folder')
+
+	commands.add_parser('list', help='list the partitions in the archive')
+
+	search = commands.add_parser('search', help='search marker comments')
+	search.add_argument('terms', nargs='+', help='terms every matching comment uses')
+	search.add_argument('--offerings', nargs='+', help='only these offerings')
+	search.add_argument('--assignments', nargs='+', help='only these assignments')
+
+	for name, description in (('drift', 'marker means against the cohort, per offering'),
+			('shift', 'grade distributions against the first offering of each assignment')):
+		query = commands.add_parser(name, help=description)
+		query.add_argument('--component', default='total',
+			help='testing, quality, ... or total, any component of the archived rubrics')
+		query.add_argument('--offerings', nargs='+', help='only these offerings')
+		query.add_argument('--assignments', nargs='+', help='only these assignments')
+	args = argParser.parse_args()
+
+	archive = Archive(args.root)
+	if args.command == 'ingest':
+		partition = archive.ingest(args.offering, args.assignment, args.dir, args.format, not args.no_cache,
+			Rubric.load(args.rubric) if args.rubric else None)
+		print('{0}/{1}: {2} assignments'.format(partition.offering, partition.assignment, partition.rows))
+	elif args.command == 'list':
+		for partition in archive.partitions():
+			print('{0}/{1}: {2} assignments, {3} markers, rubric {4}'.format(partition.offering,
+				partition.assignment, partition.rows, len(partition.markerNames), partition.rubric.name))
+	elif args.command == 'search':
+		query = ' '.join(args.terms)
+		print(searchDisplay(query, *archive.searchComments(query, args.offerings, args.assignments)))
+	else:
+		try:
+			if args.command == 'drift':
+				rows = archive.markerDrift(args.component, args.offerings, args.assignments)
+			else:
+				rows = archive.distributionShift(args.component, args.offerings, args.assignments)
+		except ValueError as e:
+			argParser.error(str(e))
+		print((driftDisplay if args.command == 'drift' else shiftDisplay)(rows, args.component))
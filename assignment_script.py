@@ -1,30 +1,96 @@
 import os
-import re
-import math
-
-import matplotlib.pyplot as plt
-import numpy as np
+import sys
+from array import array
 
 import directory
-
-ST_NUM = re.compile('s[0-9]{7}')
+from lazy_import import lazyImport
+from parse_cache import ParseCache
+from histogram import StreamingHistogram
+from line_classifier import parseGrade, STOP
+from bulk_reader import MarkedFileReader
+from marking_rules import ErrorLog
+import rubric
+from rubric import Rubric, ST_NUM
+
+# Only imported once the script checks and plots grades, not when imported
+# by archive.py to ingest a folder
+np = lazyImport('numpy')
+plt = lazyImport('matplotlib.pyplot')
+
+SECTIONS = ['i', 'ii', 'iii', 'iv', 'v', 'vi', 'vii']
+GRADE_CAPS = [1, 1, 1, 1, 0.5, 0.5, 1]
+# Testing and quality grades, then parts i. to vii., section vii. scaling
+# the sum of the others to give the quality grade. Comments go under the
+# part before them, or part i.
+RUBRIC = Rubric({
+    'name': 'script',
+    'stop': 'Code Quality Mark',
+    'components': [
+        {'name': 'testing', 'line': 'Testing:', 'max': 5},
+        {'name': 'quality', 'line': 'Quality:', 'max': 5}],
+    'parts': [
+        {'column': 'partGrades', 'names': SECTIONS, 'lines': [section + '. ' for section in SECTIONS],
+         'caps': GRADE_CAPS,
+         'aggregate': {'formula': 'roundedProduct', 'into': 'quality', 'rule': 'grade summation'}}],
+    'firstSection': 'i',
+    'checkMaxMarks': False})
+READER = MarkedFileReader(RUBRIC.schema['stop'])
+LINE_CLASSIFIER = RUBRIC.getClassifier()
+MARKING_RULES = RUBRIC.markingRules()
+CACHE_NAME = 'assignment'
+# Layout of the cached records, folded with the rubric so that files parsed
+# under another rubric are parsed again
+CACHE_VERSION = (1 << 32) | RUBRIC.cacheVersion()
+# Assignments checked against MARKING_RULES at a time
+RULE_CHUNK_SIZE = 10000
 
 
 class Assignment:
+    # Compact layout: no per-instance __dict__, part grades in an array of
+    # doubles and comments as tuples of interned strings, which are shared
+    # between the many assignments given the same feedback
+    __slots__ = ('studentNumber', 'marker', 'testingGrade', 'qualityGrade', 'totalGrade',
+                 'partGrades', 'partComments')
+
     def __init__(self, studentNumber, marker):
         self.studentNumber = studentNumber
-        self.marker = marker
+        self.marker = sys.intern(marker)
         self.testingGrade = 0.0
         self.qualityGrade = 0.0
         self.totalGrade = 0.0
 
-        self.partGrades = [-1.0] * 7
-        self.partComments = [[], [], [], [], [], [], []]
+        self.partGrades = array('d', [-1.0] * 7)
+        self.partComments = ((),) * 7
+
+    def setPartComments(self, partComments):
+        self.partComments = tuple(tuple(sys.intern(comment) for comment in comments)
+                                  for comments in partComments)
+
+    def getComments(self):
+        # (section, comment) pairs
+        return [(SECTIONS[part], comment) for part, comments in enumerate(self.partComments)
+                for comment in comments]
 
     def calculateQualityGrade(self):
-        grade = sum(self.partGrades[0 : -1]) * self.partGrades[-1]
-        grade = math.ceil(grade * 2) / 2.0
-        return grade
+        return RUBRIC.overallGrade('partGrades', self.partGrades)
+
+    def getGrades(self):
+        # Grades in the slots of RUBRIC
+        return [self.testingGrade, self.qualityGrade] + list(self.partGrades)
+
+    def getRecord(self):
+        return (self.studentNumber, self.marker, self.testingGrade, self.qualityGrade,
+                tuple(self.partGrades), self.partComments)
+
+    @classmethod
+    def fromRecord(cls, record):
+        studentNumber, marker, testingGrade, qualityGrade, partGrades, partComments = record
+        assignment = cls(studentNumber, marker)
+        assignment.testingGrade = testingGrade
+        assignment.qualityGrade = qualityGrade
+        assignment.partGrades = array('d', partGrades)
+        assignment.setPartComments(partComments)
+        return assignment
 
     def __str__(self):
         sections = ['i.', 'ii.', 'iii.', 'iv.', 'v.', 'vi.', 'vii.']
@@ -33,7 +99,7 @@ class Assignment:
         string += 'Quality: ' + str(self.qualityGrade) + '\n'
         for i in range(len(self.partGrades)):
             string += '  ' + sections[i] + ' ' * (6 - len(sections[i])) + str(self.partGrades[i]) + '\n'
-            string += '        ' + str(self.partComments[i]) + '\n'
+            string += '        ' + str(list(self.partComments[i])) + '\n'
         return string
         
 
@@ -41,113 +107,104 @@ class Assignment:
 
 
 def getStudentNumber(filename):
-    return filename[-12:-4]
+    return rubric.studentNumberForFile(filename)
 
 def getMarker(filename):
-    filename = filename.split('/')
-    
-    return filename[-3]
+    return rubric.markerForFile(filename)
 
 def getGradeFromLine(line):
-    try:
-        return float(line.split(':')[-1])
-    except:
-        return -1.0
+    return parseGrade(line)
 
 
 
-def parseFile(filename):
-    file = open(filename, 'r', encoding="utf8")
+def parseFile(filename, reader=READER):
     assignment = Assignment(getStudentNumber(filename), getMarker(filename))
-    partCounter = 0;
+    partComments = [[] for section in SECTIONS]
 
     try:
-        for line in file:
-            line = line.rstrip().lstrip()
-            
-            if (line.startswith('Testing:')):
-                assignment.testingGrade = getGradeFromLine(line)
-                
-            elif (line.startswith('Quality:')):
-                assignment.qualityGrade = getGradeFromLine(line)
-
-            elif (line.startswith('i. ')):
-                assignment.partGrades[0] = getGradeFromLine(line)
-                partCounter = 0
-
-            elif (line.startswith('ii. ')):
-                assignment.partGrades[1] = getGradeFromLine(line)
-                partCounter = 1
-
-            elif (line.startswith('iii. ')):
-                assignment.partGrades[2] = getGradeFromLine(line)
-                partCounter = 2
-
-            elif (line.startswith('iv. ')):
-                assignment.partGrades[3] = getGradeFromLine(line)
-                partCounter = 3
-
-            elif (line.startswith('v. ')):
-                assignment.partGrades[4] = getGradeFromLine(line)
-                partCounter = 4
-
-            elif (line.startswith('vi. ')):
-                assignment.partGrades[5] = getGradeFromLine(line)
-                partCounter = 5
-
-            elif (line.startswith('vii. ')):
-                assignment.partGrades[6] = getGradeFromLine(line)
-                partCounter = 6
-
-            elif (line == ''):
-                continue
-
-            elif (line.startswith('Code Quality Mark')):
-                break
-
-            else:
-                assignment.partComments[partCounter].append(line)
+        if reader is None:
+            with open(filename, 'r', encoding="utf8") as file:
+                lines = file.readlines()
+        else:
+            lines = reader.readHeader(filename).splitlines()
+
+        grades, comments, read = RUBRIC.parseLines(lines)
+        assignment.testingGrade, assignment.qualityGrade = grades[:2]
+        assignment.partGrades = array('d', grades[2:])
+        for section, comment in comments:
+            partComments[section].append(comment)
     except:
         print("Error occured in parsing:", assignment.studentNumber, assignment.marker)
+    assignment.setPartComments(partComments)
     return assignment
 
 
 
 
-if __name__ == '__main__':
-    files = []
-    assignments = []
-    
-    for root, directories, filenames in os.walk(directory.DIR):
-        for filename in filenames:
-            if(ST_NUM.match(getStudentNumber(filename))): 
-                files.append(os.path.join(root,filename).replace('\\', '/'))
+def iterAssignmentFiles(dir):
+    return rubric.iterAssignmentFiles(dir)
 
-    for file in files:
-        assignments.append(parseFile(file))
+def iterAssignments(dir, cache=None):
+    # Yields assignments as their files are found. With a cache, only files
+    # which are new or changed since the last run are parsed again.
+    for file in iterAssignmentFiles(dir):
+        if cache is None:
+            yield parseFile(file)
+            continue
 
-    grades = dict()
-    testing = []
-    quality = []
+        stat = os.stat(file)
+        record = cache.get(file, stat)
+        if record is None:
+            assignment = parseFile(file)
+            cache.put(file, stat, assignment.getRecord())
+        else:
+            assignment = Assignment.fromRecord(record)
+        yield assignment
 
-    gradeCaps = [1, 1, 1, 1, 0.5, 0.5, 1]
-    sections = ['i', 'ii', 'iii', 'iv', 'v', 'vi', 'vii']
-    
+
+
+
+if __name__ == '__main__':
+    grades = dict()
+    testing = StreamingHistogram(5)
+    quality = StreamingHistogram(5)
+    totalGrades = StreamingHistogram(10)
+
+    # Columns checked against MARKING_RULES a chunk at a time, keeping only
+    # the errors found so that memory does not grow with the folder
+    errors = ErrorLog()
+    markerCodes = dict()
+    studentNumbers = []
+    markerColumn = array('i')
+    gradeRows = array('d')
+
+    def checkChunk():
+        errors.add(MARKING_RULES.evaluate(RUBRIC.columns(np.frombuffer(gradeRows).reshape(-1, len(RUBRIC.lines))),
+                                          np.frombuffer(markerColumn, np.int32)), studentNumbers)
+        del studentNumbers[:], markerColumn[:], gradeRows[:]
+
+    cache = ParseCache.forDirectory(directory.DIR, CACHE_NAME, CACHE_VERSION)
     
-    for assignment in assignments:
-        for i in range(0, 7):
-            if assignment.partGrades[i] < 0 or assignment.partGrades[i] > gradeCaps[i]:
-                print('Grade error: student =', assignment.studentNumber,
-                      'marker =', assignment.marker, 'section =', sections[i],
-                      'grade = ', assignment.partGrades[i])
-        if assignment.qualityGrade != assignment.calculateQualityGrade():
-            print('Grade error: student =', assignment.studentNumber,
-                  'marker =', assignment.marker, 'grade summation incorrect')
-        testing.append(assignment.testingGrade)
-        quality.append(assignment.qualityGrade)
+    for assignment in iterAssignments(directory.DIR, cache):
+        studentNumbers.append(assignment.studentNumber)
+        markerColumn.append(markerCodes.setdefault(assignment.marker, len(markerCodes)))
+        gradeRows.extend(assignment.getGrades())
+        if len(studentNumbers) == RULE_CHUNK_SIZE:
+            checkChunk()
+        testing.add(assignment.testingGrade)
+        quality.add(assignment.qualityGrade)
+        totalGrades.add(assignment.testingGrade + assignment.qualityGrade)
         
         grades[(assignment.testingGrade, assignment.qualityGrade)] = grades.get((assignment.testingGrade, assignment.qualityGrade), 0) + 1
 
+    cache.prune()
+    cache.save()
+
+    checkChunk()
+    if len(errors):
+        print('Grade errors:')
+        print(errors.display(list(markerCodes)), end='')
+
     plt.figure(1)
 
     #Plot 1: Testing-Quality Occurances
@@ -174,8 +231,7 @@ if __name__ == '__main__':
     #Plot 2: Testing Grade
     plt.subplot(2, 2, 2)
 
-    x = list(np.linspace(0, 5, 11))
-    y = [testing.count(v) for v in x]
+    x, y = testing.getHistogram()
 
     plt.plot(x, y, 'r-')
 
@@ -191,8 +247,7 @@ if __name__ == '__main__':
     #Plot 3
     plt.subplot(2, 2, 3)
 
-    x = list(np.linspace(0, 5, 11))
-    y = [quality.count(v) for v in x]
+    x, y = quality.getHistogram()
 
     plt.plot(x, y, 'r-')
 
@@ -207,12 +262,7 @@ if __name__ == '__main__':
     #Plot 4
     plt.subplot(2, 2, 4)
 
-    totalGrades = []
-    for assignment in assignments:
-        totalGrades.append(assignment.testingGrade + assignment.qualityGrade)
-
-    x = list(np.linspace(0, 10, 21))
-    y = [totalGrades.count(v) for v in x]
+    x, y = totalGrades.getHistogram()
 
     plt.plot(x, y, 'r-')
 
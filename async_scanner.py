@@ -0,0 +1,135 @@
+import os
+import time
+import asyncio
+import concurrent.futures
+
+from a3_analysis import ST_NUM, RUBRIC, AssignmentParser, Assignment
+from bulk_reader import MarkedFileReader
+from parse_cache import ParseCache
+
+
+def readFileBytes(filename: str):
+	with open(filename, 'rb') as file:
+		return file.read()
+
+
+def latencyOpener(delay: float, opener=readFileBytes):
+	# Opener which waits before every read, to stand in for a slow network share
+	def open(filename: str):
+		time.sleep(delay)
+		return opener(filename)
+	return open
+
+
+def listDirectory(dir: str):
+	# Symbolic links to directories are neither listed nor followed, as by os.walk
+	directories = []
+	filenames = []
+	with os.scandir(dir) as entries:
+		for entry in entries:
+			if entry.is_dir(follow_symlinks=False):
+				directories.append(entry.path)
+			elif not entry.is_dir():
+				filenames.append(entry.path)
+	return directories, filenames
+
+
+class AsyncDirectoryScanner:
+	# Walks a marked folder with os.scandir and reads files concurrently on a
+	# thread pool. `concurrency` worker coroutines take directory listings and
+	# file reads from one queue, so no more than that many are in flight or
+	# pending at once. Files are parsed on the event loop as their contents
+	# arrive, and attached in the order os.walk would find them.
+
+	def __init__(self, parser: AssignmentParser, concurrency: int = 32, opener=readFileBytes,
+			cache: ParseCache = None):
+		self.parser = parser
+		self.concurrency = concurrency
+		self.opener = opener
+		self.cache = cache
+		self.reader = MarkedFileReader(RUBRIC.schema['stop'])
+
+	def loadFile(self, filename: str):
+		if self.cache is not None:
+			stat = os.stat(filename)
+			record = self.cache.get(filename, stat)
+			if record is not None:
+				return stat, record, None
+			return stat, None, self.opener(filename)
+		return None, None, self.opener(filename)
+
+	async def blocking(self, function, *args):
+		return await self.loop.run_in_executor(self.executor, function, *args)
+
+	async def scanFile(self, filename: str):
+		stat, record, data = await self.blocking(self.loadFile, filename)
+		if record is not None:
+			assignment = Assignment.fromRecord(record)
+		else:
+			lines = self.reader.decodeHeader(data).splitlines()
+			assignment = self.parser.parseAssignmentLines(filename, lines)
+			if self.cache is not None:
+				self.cache.put(filename, stat, assignment.getRecord())
+		self.parsed[filename] = assignment
+
+	async def scanDirectory(self, dir: str):
+		directories, filenames = await self.blocking(listDirectory, dir)
+		files = []
+		for filename in filenames:
+			filename = filename.replace('\\', '/')
+			if ST_NUM.match(self.parser.getStudentNumberForFile(filename)):
+				files.append(filename)
+				self.queue.put_nowait((self.scanFile, filename))
+		for directory in directories:
+			self.queue.put_nowait((self.scanDirectory, directory))
+		self.listings[dir] = (directories, files)
+
+	async def work(self):
+		while True:
+			scan, path = await self.queue.get()
+			try:
+				await scan(path)
+			except Exception as e:
+				self.errors.append(e)
+			finally:
+				self.queue.task_done()
+
+	def walkOrder(self, dir: str):
+		# Files of a directory, then of each directory below it in turn
+		order = []
+		pending = [dir]
+		while pending:
+			directories, files = self.listings[pending.pop()]
+			order += files
+			pending += reversed(directories)
+		return order
+
+	async def scan(self, dir: str):
+		self.loop = asyncio.get_running_loop()
+		self.queue = asyncio.Queue()
+		self.listings = dict()
+		self.parsed = dict()
+		self.errors = []
+		with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as self.executor:
+			self.queue.put_nowait((self.scanDirectory, dir))
+			workers = [asyncio.create_task(self.work()) for i in range(self.concurrency)]
+			await self.queue.join()
+			for worker in workers:
+				worker.cancel()
+			await asyncio.gather(*workers, return_exceptions=True)
+		if self.errors:
+			raise self.errors[0]
+
+		files = self.walkOrder(dir)
+		for filename in files:
+			self.parser.addAssignment(self.parsed[filename], filename)
+
+		if self.cache is not None:
+			self.cache.prune(files)
+			self.cache.save()
+		return files
+
+
+def scanDirectory(parser: AssignmentParser, dir: str, concurrency: int = 32, opener=readFileBytes,
+		cache: ParseCache = None):
+	return asyncio.run(AsyncDirectoryScanner(parser, concurrency, opener, cache).scan(dir))
@@ -0,0 +1,116 @@
+import random
+import argparse
+import timeit
+
+import a3_analysis
+import assignment_script
+from benchmarks.synthetic import a3FileText, scriptFileText
+
+
+def legacyA3Line(line: str, grades: list):
+	# Per-line work of AssignmentParser.parseAssignment before the classifier
+	testingPartIndicators = ['Scenario 1 [0,1]', 'Scenario 2 [0,1]', 'Scenario 3 [0,1]',
+		'Scenario 4 [0,1]', 'Scenario 5 [0,1]', 'Scenario 6 [0,1]']
+	qualityPartIndicators = ['i. ', 'ii. ', 'iii. ', 'iv. ', 'v. ', 'vi. ']
+
+	if (line.startswith('Testing:')):
+		grades[0] = legacyGrade(line)
+	elif (line.startswith('Usability:')):
+		grades[1] = legacyGrade(line)
+	elif (line.startswith('Quality:')):
+		grades[2] = legacyGrade(line)
+	else:
+		for indicator in testingPartIndicators:
+			if line.startswith(indicator):
+				grades[3 + testingPartIndicators.index(indicator)] = legacyGrade(line)
+				break
+
+		for indicator in qualityPartIndicators:
+			if line.startswith(indicator):
+				grades[9 + qualityPartIndicators.index(indicator)] = legacyGrade(line)
+				break
+
+	return line.startswith('Code Quality Mark')
+
+
+def legacyGrade(line: str):
+	try:
+		return float(line.split(':')[-1])
+	except:
+		return -1.0
+
+
+def classifiedA3Line(line: str, grades: list):
+	slot = a3_analysis.LINE_CLASSIFIER.classify(line)
+	if slot is None:
+		return False
+	elif slot == a3_analysis.STOP:
+		return True
+	grades[slot] = a3_analysis.parseGrade(line)
+	return False
+
+
+def legacyScriptLine(line: str, grades: list):
+	# Per-line work of assignment_script.parseFile before the classifier
+	if (line.startswith('Testing:')):
+		grades[0] = legacyGrade(line)
+	elif (line.startswith('Quality:')):
+		grades[1] = legacyGrade(line)
+	else:
+		for i, prefix in enumerate(('i. ', 'ii. ', 'iii. ', 'iv. ', 'v. ', 'vi. ', 'vii. ')):
+			if line.startswith(prefix):
+				grades[2 + i] = legacyGrade(line)
+				return False
+		return line.startswith('Code Quality Mark')
+	return False
+
+
+def classifiedScriptLine(line: str, grades: list):
+	slot = assignment_script.LINE_CLASSIFIER.classify(line)
+	if slot is None:
+		return False
+	elif slot == assignment_script.STOP:
+		return True
+	grades[slot] = assignment_script.parseGrade(line)
+	return False
+
+
+def linesOf(texts):
+	return [line.strip() for text in texts for line in text.split('\n')]
+
+
+def perLineSeconds(handler, lines: list, repeat: int):
+	grades = [0.0] * 15
+
+	def run():
+		for line in lines:
+			handler(line, grades)
+
+	return min(timeit.repeat(run, number=1, repeat=repeat)) / len(lines)
+
+
+def run(files: int, repeat: int):
+	rng = random.Random(2002)
+	a3Lines = linesOf(a3FileText('s{0:07d}'.format(i), rng) for i in range(files))
+	scriptLines = linesOf(scriptFileText('s{0:07d}'.format(i), rng) for i in range(files))
+
+	return {
+		'grade_analysis_a3': {
+			'before': perLineSeconds(legacyA3Line, a3Lines, repeat),
+			'after': perLineSeconds(classifiedA3Line, a3Lines, repeat),
+		},
+		'assignment_script': {
+			'before': perLineSeconds(legacyScriptLine, scriptLines, repeat),
+			'after': perLineSeconds(classifiedScriptLine, scriptLines, repeat),
+		},
+	}
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Time the classification of marked file lines.')
+	argParser.add_argument('--files', type=int, default=2000, help='number of synthetic files')
+	argParser.add_argument('--repeat', type=int, default=5, help='timing repetitions, the best is kept')
+	args = argParser.parse_args()
+
+	for name, times in run(args.files, args.repeat).items():
+		print('{0}: {1:.0f} -> {2:.0f} ns per line'.format(name, times['before'] * 1e9, times['after'] * 1e9))
@@ -0,0 +1,41 @@
+import os
+import random
+import argparse
+
+from benchmarks.synthetic import a3FileText, scriptFileText
+
+FORMATS = {'a3': a3FileText, 'script': scriptFileText}
+FILES_PER_FOLDER = 1000
+
+
+def generateTree(root: str, count: int, markers: int = 10, format: str = 'a3', seed: int = 2002,
+		errorRate: float = 0.05):
+	# Writes marked/<marker>/<group>/sNNNNNNN.txt files in the layout the
+	# parsers expect, with at most FILES_PER_FOLDER files per folder
+	if count > 10 ** 7:
+		raise ValueError('Student numbers only have room for 10,000,000 files')
+
+	textFor = FORMATS[format]
+	rng = random.Random(seed)
+	for i in range(count):
+		studentNumber = 's{0:07d}'.format(i)
+		marker = 'marker{0:02d}'.format(i % markers)
+		folder = os.path.join(root, marker, 'group{0:04d}'.format(i // (markers * FILES_PER_FOLDER)))
+		if i < markers or i % (markers * FILES_PER_FOLDER) < markers:
+			os.makedirs(folder, exist_ok=True)
+		with open(os.path.join(folder, studentNumber + '.txt'), 'w', encoding='utf8') as file:
+			file.write(textFor(studentNumber, rng, errorRate))
+	return root
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Generate a synthetic marked folder.')
+	argParser.add_argument('root', help='folder to create the marked files in')
+	argParser.add_argument('--files', type=int, default=1000, help='number of marked files')
+	argParser.add_argument('--markers', type=int, default=10, help='number of markers')
+	argParser.add_argument('--format', choices=sorted(FORMATS), default='a3',
+		help='a3 for grade_analysis_a3.py, script for assignment_script.py')
+	argParser.add_argument('--seed', type=int, default=2002, help='random seed')
+	args = argParser.parse_args()
+
+	generateTree(args.root, args.files, args.markers, args.format, args.seed)
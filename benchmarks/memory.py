@@ -0,0 +1,102 @@
+import gc
+import argparse
+import tracemalloc
+
+import a3_analysis
+import assignment_script
+
+COMMENTS = ['Good use of encapsulation', 'Missing JavaDoc on public methods',
+	'Magic numbers in view code', 'Consistent naming']
+
+
+class LegacyAssignment:
+	# Layout of a3_analysis.Assignment before it used __slots__ and arrays
+
+	def __init__(self, studentNumber: str, marker=None):
+		self.maxMarks = a3_analysis.maxMarks
+		self.studentNumber = studentNumber
+		self.testingGrade = 0.0
+		self.usabilityGrade = 0.0
+		self.qualityGrade = 0.0
+		self.marker = marker
+		self.testingParts = [-1.0] * 6
+		self.qualityParts = [-1.0] * 6
+
+
+class LegacyScriptAssignment:
+	# Layout of assignment_script.Assignment before it used __slots__ and arrays
+
+	def __init__(self, studentNumber, marker):
+		self.studentNumber = studentNumber
+		self.marker = marker
+		self.testingGrade = 0.0
+		self.qualityGrade = 0.0
+		self.totalGrade = 0.0
+		self.partGrades = [-1.0] * 7
+		self.partComments = [[], [], [], [], [], [], []]
+
+
+def makeA3(cls, i: int):
+	assignment = cls('s{0:07d}'.format(i))
+	# Distinct float objects, as produced by parsing each file
+	assignment.testingGrade = float(str(i % 7))
+	assignment.usabilityGrade = float(str(i % 4))
+	assignment.qualityGrade = float(str(i % 13 / 2))
+	parts = [float(str((i >> bit) & 1)) for bit in range(6)]
+	if cls is LegacyAssignment:
+		assignment.testingParts = parts
+		assignment.qualityParts = list(parts)
+	else:
+		assignment.setParts(parts, parts)
+	return assignment
+
+
+def makeScript(cls, i: int):
+	assignment = cls('s{0:07d}'.format(i), 'marker{0}'.format(i % 10))
+	parts = [float(str((i >> bit) & 1)) for bit in range(7)]
+	# Comments are read from each file, so identical text is a separate string
+	comments = [[COMMENTS[(i + part) % len(COMMENTS)].encode().decode()] for part in range(7)]
+	if cls is LegacyScriptAssignment:
+		assignment.partGrades = parts
+		assignment.partComments = comments
+	else:
+		assignment.partGrades = assignment_script.array('d', parts)
+		assignment.setPartComments(comments)
+	return assignment
+
+
+def bytesPerAssignment(factory, cls, count: int):
+	gc.collect()
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	assignments = [factory(cls, i) for i in range(count)]
+	gc.collect()
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+
+	# The list holding the assignments is not part of their footprint
+	listSize = assignments.__sizeof__()
+	del assignments
+	return (after - before - listSize) / count
+
+
+def run(count: int):
+	return {
+		'grade_analysis_a3': {
+			'before': bytesPerAssignment(makeA3, LegacyAssignment, count),
+			'after': bytesPerAssignment(makeA3, a3_analysis.Assignment, count),
+		},
+		'assignment_script': {
+			'before': bytesPerAssignment(makeScript, LegacyScriptAssignment, count),
+			'after': bytesPerAssignment(makeScript, assignment_script.Assignment, count),
+		},
+	}
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Measure the memory used per parsed assignment.')
+	argParser.add_argument('--count', type=int, default=100000, help='number of assignments to create')
+	args = argParser.parse_args()
+
+	for name, sizes in run(args.count).items():
+		print('{0}: {1:.0f} -> {2:.0f} bytes per assignment'.format(name, sizes['before'], sizes['after']))
@@ -0,0 +1,63 @@
+import os
+import random
+import argparse
+import tempfile
+import time
+
+import a3_analysis
+import assignment_script
+from benchmarks.synthetic import a3FileText, scriptFileText
+
+
+def writeFiles(dir: str, count: int, textFor):
+	rng = random.Random(2002)
+	files = []
+	for i in range(count):
+		studentNumber = 's{0:07d}'.format(4000000 + i)
+		filename = os.path.join(dir, studentNumber + '.txt').replace('\\', '/')
+		with open(filename, 'w', encoding='utf8') as file:
+			file.write(textFor(studentNumber, rng))
+		files.append(filename)
+	return files
+
+
+def filesPerSecond(parse, files: list, repeat: int):
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		for filename in files:
+			parse(filename)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return len(files) / best
+
+
+def run(count: int, repeat: int):
+	with tempfile.TemporaryDirectory() as dir:
+		os.mkdir(os.path.join(dir, 'a3'))
+		a3Files = writeFiles(os.path.join(dir, 'a3'), count, a3FileText)
+		os.mkdir(os.path.join(dir, 'script'))
+		scriptFiles = writeFiles(os.path.join(dir, 'script'), count, scriptFileText)
+
+		textParser = a3_analysis.AssignmentParser(bulkRead=False)
+		bulkParser = a3_analysis.AssignmentParser(bulkRead=True)
+		return {
+			'grade_analysis_a3': {
+				'before': filesPerSecond(textParser.parseAssignment, a3Files, repeat),
+				'after': filesPerSecond(bulkParser.parseAssignment, a3Files, repeat),
+			},
+			'assignment_script': {
+				'before': filesPerSecond(lambda f: assignment_script.parseFile(f, None), scriptFiles, repeat),
+				'after': filesPerSecond(assignment_script.parseFile, scriptFiles, repeat),
+			},
+		}
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Compare file parsing throughput with and without bulk reads.')
+	argParser.add_argument('--files', type=int, default=5000, help='number of synthetic files')
+	argParser.add_argument('--repeat', type=int, default=3, help='timing repetitions, the best is kept')
+	args = argParser.parse_args()
+
+	for name, rates in run(args.files, args.repeat).items():
+		print('{0}: {1:.0f} -> {2:.0f} files/sec'.format(name, rates['before'], rates['after']))
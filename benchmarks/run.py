@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plot
+
+import a3_analysis
+from benchmarks.generate import generateTree
+from benchmarks import startup
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+
+def timed(function, *args):
+	start = time.perf_counter()
+	result = function(*args)
+	return time.perf_counter() - start, result
+
+
+def benchmarkTree(dir: str, workers: int = 1):
+	timings = dict()
+
+	parser = a3_analysis.AssignmentParser()
+	timings['parse'], _ = timed(parser.parseDirectoryStructure, dir, workers)
+
+	analyser = a3_analysis.AssignmentAnalyser.fromParser(parser)
+	timings['buildStore'], _ = timed(analyser.getStore)
+	timings['overallStatDisplay'], _ = timed(analyser.overallStatDisplay)
+	timings['overallStatDisplayCached'], _ = timed(analyser.overallStatDisplay)
+	timings['markingErrorDisplay'], _ = timed(analyser.markingErrorDisplay)
+	timings['allMarkerStatDisplay'], _ = timed(analyser.allMarkerStatDisplay)
+	timings['markerBiasDisplay'], _ = timed(analyser.markerBiasDisplay)
+	timings['partOutlierDisplay'], _ = timed(analyser.partOutlierDisplay)
+	timings['dataGraph'], fig = timed(analyser.dataGraph, analyser.assignments)
+	plot.close(fig)
+
+	return timings
+
+
+def run(sizes, markers: int = 10, workers: int = 1, dataDir: str = None):
+	results = []
+	for size in sizes:
+		with tempfile.TemporaryDirectory(dir=dataDir) as root:
+			dir = os.path.join(root, 'marked')
+			generateTime, _ = timed(generateTree, dir, size, markers)
+			result = {'files': size, 'markers': markers, 'workers': workers, 'generate': generateTime}
+			result.update(benchmarkTree(dir, workers))
+			result.update(startup.run(dir))
+			del result['heavyImports']
+			results.append(result)
+			print(json.dumps(result), file=sys.stderr)
+	return results
+
+
+def environment():
+	return {'heavyImports': startup.heavyImports(), 'python': platform.python_version(), 'platform': platform.platform(),
+		'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results: list, previous: dict):
+	# Ratio of each stage's time to the previous run, for matching sizes
+	previousBySize = {result['files']: result for result in previous['results']}
+	for result in results:
+		before = previousBySize.get(result['files'])
+		if before is None:
+			continue
+		stages = ['{0} {1:.2f}x'.format(stage, result[stage] / before[stage])
+			for stage in result if stage in before and isinstance(result[stage], float) and before[stage] > 0]
+		print('{0} files: {1}'.format(result['files'], ', '.join(stages)))
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Time parsing and analysis of synthetic marked folders.')
+	argParser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+		help='numbers of files to benchmark, from 100 up to 1000000')
+	argParser.add_argument('--markers', type=int, default=10, help='number of markers')
+	argParser.add_argument('--workers', type=int, default=1, help='processes used for parsing')
+	argParser.add_argument('--data-dir', default=None, help='where synthetic trees are generated')
+	argParser.add_argument('--output', default='benchmark_results.json', help='JSON file to write')
+	argParser.add_argument('--compare', default=None, help='earlier JSON results to compare against')
+	args = argParser.parse_args()
+
+	results = run(args.sizes, args.markers, args.workers, args.data_dir)
+	with open(args.output, 'w') as file:
+		json.dump({'environment': environment(), 'results': results}, file, indent=2)
+
+	if args.compare is not None:
+		with open(args.compare) as file:
+			compare(results, json.load(file))
@@ -0,0 +1,53 @@
+import argparse
+import tempfile
+import time
+
+import a3_analysis
+import async_scanner
+from benchmarks.generate import generateTree
+
+
+def serialScan(dir: str, opener):
+	# parseDirectoryStructure with every read going through the same opener
+	parser = a3_analysis.AssignmentParser()
+	reader = parser.reader
+	for filename in parser.findAssignmentFiles(dir):
+		lines = reader.decodeHeader(opener(filename)).splitlines()
+		parser.addAssignment(parser.parseAssignmentLines(filename, lines), filename)
+	return parser
+
+
+def asyncScan(dir: str, opener, concurrency: int):
+	parser = a3_analysis.AssignmentParser()
+	async_scanner.scanDirectory(parser, dir, concurrency, opener)
+	return parser
+
+
+def timed(function, *args):
+	start = time.perf_counter()
+	result = function(*args)
+	return time.perf_counter() - start, result
+
+
+def run(count: int, latency: float, concurrency: int):
+	opener = async_scanner.latencyOpener(latency)
+	with tempfile.TemporaryDirectory() as dir:
+		generateTree(dir, count, markers=5)
+		serialTime, serialParser = timed(serialScan, dir, opener)
+		asyncTime, asyncParser = timed(asyncScan, dir, opener, concurrency)
+
+	assert len(serialParser.getAssignments()) == len(asyncParser.getAssignments())
+	return {'files': count, 'latency': latency, 'concurrency': concurrency,
+		'serial': serialTime, 'async': asyncTime}
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Compare serial and asyncio scanning with artificial read latency.')
+	argParser.add_argument('--files', type=int, default=500, help='number of synthetic files')
+	argParser.add_argument('--latency', type=float, default=0.005, help='seconds added to every read')
+	argParser.add_argument('--concurrency', type=int, default=32, help='concurrent reads for the scanner')
+	args = argParser.parse_args()
+
+	result = run(args.files, args.latency, args.concurrency)
+	print('{0} files, {1} s latency: serial {2:.2f} s, asyncio ({3} concurrent) {4:.2f} s'.format(
+		result['files'], result['latency'], result['serial'], result['concurrency'], result['async']))
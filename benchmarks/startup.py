@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+import grade_analysis_a3
+
+SCRIPT = os.path.abspath(grade_analysis_a3.__file__)
+HEAVY_MODULES = ('numpy', 'matplotlib')
+
+
+def importTime(module: str = 'grade_analysis_a3'):
+	# Cumulative import time in seconds reported by -X importtime
+	result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+		cwd=os.path.dirname(SCRIPT), capture_output=True, text=True, check=True)
+	for line in reversed(result.stderr.splitlines()):
+		fields = line.split('|')
+		if len(fields) == 3 and fields[2].strip() == module:
+			return int(fields[1]) / 1e6
+	raise ValueError('No import time reported for ' + module)
+
+
+def heavyImports(module: str = 'grade_analysis_a3'):
+	# Heavy modules loaded as a side effect of importing module
+	check = 'import sys, {0}; print(" ".join(m for m in {1!r} if m in sys.modules))'.format(
+		module, HEAVY_MODULES)
+	result = subprocess.run([sys.executable, '-c', check], cwd=os.path.dirname(SCRIPT),
+		capture_output=True, text=True, check=True)
+	return result.stdout.split()
+
+
+def timeToPrompt(*args: str):
+	# Wall clock seconds to start the REPL, reach the prompt and exit
+	start = time.perf_counter()
+	subprocess.run([sys.executable, SCRIPT] + list(args), input='exit\n',
+		stdout=subprocess.DEVNULL, text=True, check=True)
+	return time.perf_counter() - start
+
+
+def run(dir: str = None, snapshotPath: str = None):
+	result = {'importTime': importTime(), 'heavyImports': heavyImports()}
+	if dir is not None:
+		# The first run fills the parse cache for the second
+		timeToPrompt(dir)
+		result['timeToPromptFromCache'] = timeToPrompt(dir)
+	if snapshotPath is not None:
+		result['timeToPromptFromSnapshot'] = timeToPrompt('--from-snapshot', snapshotPath)
+	return result
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Measure REPL start up time.')
+	argParser.add_argument('dir', nargs='?', help='marked folder to start the REPL on')
+	argParser.add_argument('--snapshot', help='snapshot to start the REPL from')
+	args = argParser.parse_args()
+
+	for name, value in run(args.dir, args.snapshot).items():
+		print('{0}: {1}'.format(name, value))
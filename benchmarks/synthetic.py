@@ -0,0 +1,50 @@
+import math
+import random
+
+QUALITY_SECTIONS = ['i. ', 'ii. ', 'iii. ', 'iv. ', 'v. ', 'vi. ']
+SCRIPT_SECTIONS = ['i. ', 'ii. ', 'iii. ', 'iv. ', 'v. ', 'vi. ', 'vii. ']
+SCRIPT_CAPS = [1, 1, 1, 1, 0.5, 0.5, 1]
+COMMENTS = ['Good use of encapsulation.', 'Missing JavaDoc on several public methods.',
+	'Magic numbers in the view code.', 'Consistent naming throughout.',
+	'Exceptions are swallowed without handling.', 'Tests cover the edge cases well.']
+
+
+def a3FileText(studentNumber: str, rng: random.Random, errorRate: float = 0.05):
+	# Marked file in the format read by a3_analysis.AssignmentParser
+	testingParts = [rng.choice((0, 1)) for _ in range(6)]
+	qualityParts = [rng.choice((0, 0.5, 1)) for _ in range(5)] + [rng.choice((0.5, 1.0))]
+	testing = float(sum(testingParts))
+	quality = math.ceil(2 * (sum(qualityParts[:5]) * qualityParts[5])) / 2.0
+	if rng.random() < errorRate:
+		testing = max(0.0, testing - 1)
+
+	lines = ['Student: {0}'.format(studentNumber), '', 'Testing: {0}'.format(testing)]
+	for i, part in enumerate(testingParts):
+		lines.append('Scenario {0} [0,1]: {1}'.format(i + 1, part))
+		lines.append('    ' + rng.choice(COMMENTS))
+	lines.append('Usability: {0}'.format(rng.choice((0, 0.5, 1, 1.5, 2, 2.5, 3))))
+	lines.append('    ' + rng.choice(COMMENTS))
+	lines.append('Quality: {0}'.format(quality))
+	for section, part in zip(QUALITY_SECTIONS, qualityParts):
+		lines.append('{0}Part [0,1]: {1}'.format(section, part))
+		lines.append('    ' + rng.choice(COMMENTS))
+	lines += ['', 'Code Quality Mark', 'Automated checks: 3', '']
+	return '\n'.join(lines)
+
+
+def scriptFileText(studentNumber: str, rng: random.Random, errorRate: float = 0.05):
+	# Marked file in the format read by assignment_script.parseFile
+	parts = [rng.choice([v / 2 for v in range(int(cap * 2) + 1)]) for cap in SCRIPT_CAPS[:6]]
+	parts.append(rng.choice((0.5, 1.0)))
+	quality = math.ceil(sum(parts[:-1]) * parts[-1] * 2) / 2.0
+	if rng.random() < errorRate:
+		quality += 0.5
+
+	lines = ['Student: {0}'.format(studentNumber), '',
+		'Testing: {0}'.format(rng.choice([v / 2 for v in range(11)])),
+		'Quality: {0}'.format(quality)]
+	for section, part in zip(SCRIPT_SECTIONS, parts):
+		lines.append('{0}Section [0,{1}]: {2}'.format(section, 1, part))
+		lines.append('    ' + rng.choice(COMMENTS))
+	lines += ['', 'Code Quality Mark', 'Automated checks: 3', '']
+	return '\n'.join(lines)
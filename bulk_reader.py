@@ -0,0 +1,58 @@
+import os
+import mmap
+
+
+class MarkedFileReader:
+	# Reads the header of marked files, everything before the first line
+	# starting with the stop prefix, in a single read per file into a buffer
+	# which is reused across files. Only the header bytes are decoded. Large
+	# files are memory mapped instead of read.
+
+	def __init__(self, stopPrefix: str = 'Code Quality Mark', encoding: str = 'utf8',
+			bufferSize: int = 64 * 1024, mmapThreshold: int = 4 * 1024 * 1024):
+		self.stopPrefix = stopPrefix.encode(encoding)
+		self.encoding = encoding
+		self.buffer = bytearray(bufferSize)
+		self.mmapThreshold = mmapThreshold
+		self.lastSize = 0
+
+	def findHeaderEnd(self, data, length: int):
+		# Start of the stop line, which may only be preceded by whitespace
+		position = data.find(self.stopPrefix, 0, length)
+		while position != -1:
+			lineStart = data.rfind(b'\n', 0, position) + 1
+			if not data[lineStart:position].strip():
+				return lineStart
+			position = data.find(self.stopPrefix, position + 1, length)
+		return length
+
+	def decodeHeader(self, data: bytes):
+		return str(data[:self.findHeaderEnd(data, len(data))], self.encoding)
+
+	def readHeader(self, filename: str):
+		with open(filename, 'rb', buffering=0) as file:
+			size = os.fstat(file.fileno()).st_size
+			self.lastSize = size
+			if size >= self.mmapThreshold:
+				with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+					return str(data[:self.findHeaderEnd(data, size)], self.encoding)
+
+			# One byte spare so that a file which grew since fstat is noticed
+			if size + 1 > len(self.buffer):
+				self.buffer = bytearray(size + 1)
+			view = memoryview(self.buffer)
+			length = 0
+			while True:
+				read = file.readinto(view[length:])
+				if not read:
+					break
+				length += read
+				if length == len(self.buffer):
+					view.release()
+					self.buffer.extend(bytes(len(self.buffer)))
+					view = memoryview(self.buffer)
+
+			try:
+				return str(view[:self.findHeaderEnd(self.buffer, length)], self.encoding)
+			finally:
+				view.release()
@@ -0,0 +1,169 @@
+import re
+import heapq
+from collections import Counter
+
+from lazy_import import lazyImport
+
+np = lazyImport('numpy')
+
+TERM = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+class CommentIndex:
+	# Inverted index of marker comments in two levels, as the same feedback
+	# is given to many students: each term maps to the distinct comment texts
+	# using it, and each text to postings of the (document, section) pairs it
+	# was given in, with a count. Documents, usually assignments, are added
+	# and removed one at a time, so parsing one file again only touches its
+	# own postings.
+
+	def __init__(self):
+		self.termTexts = dict()
+		self.textPostings = dict()
+		self.textTerms = dict()
+		self.documents = dict()
+		self.markerDocuments = Counter()
+
+	def __len__(self):
+		return len(self.documents)
+
+	def add(self, document, studentNumber: str, markerName: str, comments):
+		# comments are (section, comment) pairs
+		if document in self.documents:
+			self.remove(document)
+		comments = tuple(comments)
+		self.documents[document] = (studentNumber, markerName, comments)
+		self.markerDocuments[markerName] += 1
+		for section, comment in comments:
+			postings = self.textPostings.get(comment)
+			if postings is None:
+				postings = self.textPostings[comment] = dict()
+				terms = self.textTerms[comment] = Counter(TERM.findall(comment.lower()))
+				for term in terms:
+					self.termTexts.setdefault(term, set()).add(comment)
+			key = (document, section)
+			postings[key] = postings.get(key, 0) + 1
+
+	def remove(self, document):
+		studentNumber, markerName, comments = self.documents.pop(document)
+		self.markerDocuments[markerName] -= 1
+		for section, comment in comments:
+			postings = self.textPostings[comment]
+			postings.pop((document, section), None)
+			if not postings:
+				# Text no longer used anywhere
+				del self.textPostings[comment]
+				for term in self.textTerms.pop(comment):
+					texts = self.termTexts[term]
+					texts.discard(comment)
+					if not texts:
+						del self.termTexts[term]
+
+	def matchingTexts(self, terms: list):
+		# Distinct comment texts using every term
+		textSets = sorted((self.termTexts.get(term, set()) for term in terms), key=len)
+		return set(textSets[0]).intersection(*textSets[1:]) if textSets else set()
+
+	def matchingSections(self, query: str):
+		# (document, section) -> comments in it using every term of the query
+		texts = self.matchingTexts(TERM.findall(query.lower()))
+		if len(texts) == 1:
+			# Usual for a phrase, no merging needed
+			text = texts.pop()
+			return dict.fromkeys(self.textPostings[text], (text,))
+		matches = dict()
+		for text in texts:
+			for key in self.textPostings[text]:
+				matches[key] = matches.get(key, ()) + (text,)
+		return matches
+
+	def resultKey(self, key: tuple):
+		studentNumber, markerName, _ = self.documents[key[0]]
+		return markerName, studentNumber, key[1]
+
+	def results(self, matches: dict, keys):
+		for key in keys:
+			studentNumber, markerName, _ = self.documents[key[0]]
+			yield studentNumber, markerName, key[1], list(matches[key])
+
+	def search(self, query: str, limit: int = None):
+		# (student number, marker, section, comments) of each section with a
+		# comment using every term of the query, by marker then student, or
+		# only the first limit of them
+		matches = self.matchingSections(query)
+		if limit is None:
+			keys = sorted(matches, key=self.resultKey)
+		else:
+			keys = heapq.nsmallest(limit, matches, key=self.resultKey)
+		return list(self.results(matches, keys))
+
+	def markerTermFrequencies(self, query: str):
+		# term -> marker -> (uses of the term, documents using it)
+		frequencies = dict()
+		for term in dict.fromkeys(TERM.findall(query.lower())):
+			uses = Counter()
+			documents = dict()
+			for text in self.termTexts.get(term, ()):
+				termCount = self.textTerms[text][term]
+				for (document, section), count in self.textPostings[text].items():
+					markerName = self.documents[document][1]
+					uses[markerName] += termCount * count
+					documents.setdefault(markerName, set()).add(document)
+			frequencies[term] = {markerName: (uses[markerName], len(documents[markerName]))
+				for markerName in sorted(uses)}
+		return frequencies
+
+	def searchDisplay(self, query: str, limit: int = 20):
+		matches = self.matchingSections(query)
+		heading = 'COMMENTS MATCHING \'{0}\''.format(query)
+		result = '{0}\n{1}\n'.format(heading, '=' * len(heading))
+		result += '{0} sections in {1} assignments\n'.format(len(matches),
+			len(set(document for document, section in matches)))
+		for studentNumber, markerName, section, comments in self.results(matches,
+				heapq.nsmallest(limit, matches, key=self.resultKey)):
+			for comment in comments:
+				result += '  {0} ({1}) {2}: {3}\n'.format(studentNumber, markerName, section, comment)
+		if len(matches) > limit:
+			result += '  ... {0} more\n'.format(len(matches) - limit)
+
+		result += '\nUse per marker (assignments using the term, % of assignments marked)\n'
+		for term, markers in self.markerTermFrequencies(query).items():
+			result += '  {0}: {1}\n'.format(term, ', '.join('{0} {1} ({2:.1f}%)'.format(markerName, documents,
+				100 * documents / self.markerDocuments[markerName])
+				for markerName, (uses, documents) in markers.items()) or 'no uses')
+		return result
+
+
+def commentTable(rowComments: list):
+	# Columnar form of the (section, comment) pairs of each row, for saving
+	# with np.savez: row and section code of each comment, and a code into
+	# a table of the distinct comment texts
+	rows = []
+	sections = []
+	textCodes = []
+	texts = dict()
+	for row, comments in enumerate(rowComments):
+		for section, comment in comments:
+			rows.append(row)
+			sections.append(section)
+			textCodes.append(texts.setdefault(comment, len(texts)))
+	return (np.array(rows, np.int32), np.array(sections, np.int16), np.array(textCodes, np.int32),
+		np.array(list(texts), dtype=str))
+
+
+def commentsFromTable(rowCount: int, rows, sections, textCodes, texts):
+	# Inverse of commentTable, giving (section code, comment) pairs per row
+	texts = [str(text) for text in texts]
+	rowComments = [[] for _ in range(rowCount)]
+	for row, section, textCode in zip(rows.tolist(), sections.tolist(), textCodes.tolist()):
+		rowComments[row].append((section, texts[textCode]))
+	return rowComments
+
+
+def matchingTextCodes(texts, query: str):
+	# Codes of the texts in a comment table which use every term of the query
+	terms = set(TERM.findall(query.lower()))
+	if not terms:
+		return np.zeros(0, np.int32)
+	return np.array([code for code, text in enumerate(texts)
+		if terms.issubset(TERM.findall(str(text).lower()))], np.int32)
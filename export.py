@@ -0,0 +1,216 @@
+import io
+import csv
+import json
+import struct
+import argparse
+import itertools
+
+import numpy as np
+
+import a3_analysis
+from a3_analysis import AssignmentParser, GradeStore, MARKING_RULES, RUBRIC
+
+COLUMNS_MAGIC = b'GRADECOL'
+COLUMNS_VERSION = 1
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def ruleColumnNames():
+	# One flag column per distinct rule name, e.g. error_testing_sum
+	return ['error_' + name.replace(' ', '_') for name in dict.fromkeys(MARKING_RULES.names())]
+
+
+def partColumnNames():
+	return [name for name, column, part in RUBRIC.partFields()]
+
+
+def exportColumns(studentNumbers, markerCodes, columns: dict):
+	# Columns of one chunk as exported: grades, parts, validity and a flag
+	# per marking rule, in export order
+	errors = MARKING_RULES.evaluate(columns, markerCodes)
+	exported = {'student': np.asarray(studentNumbers, dtype=str), 'marker': np.asarray(markerCodes, np.int32)}
+	for name in RUBRIC.components:
+		exported[name] = columns[name]
+	exported['total'] = sum(columns[name] for name in RUBRIC.components)
+	for name, column, part in RUBRIC.partFields():
+		exported[name] = columns[column][:, part]
+	exported['valid'] = ~errors.invalid
+
+	ruleNames = MARKING_RULES.names()
+	for name, columnName in zip(dict.fromkeys(ruleNames), ruleColumnNames()):
+		exported[columnName] = errors.failing[:, [i for i, rule in enumerate(ruleNames) if rule == name]].any(axis=1)
+	return exported
+
+
+def storeChunks(store: GradeStore, chunkSize: int = DEFAULT_CHUNK_SIZE):
+	# (marker names, exported columns) of each chunk of an in-memory store
+	columns = store.getColumns()
+	for start in range(0, len(store), chunkSize):
+		end = start + chunkSize
+		yield store.markerNames, exportColumns(store.studentNumbers[start:end], store.markerCodes[start:end],
+			{name: column[start:end] for name, column in columns.items()})
+
+
+def assignmentChunks(assignments, chunkSize: int = DEFAULT_CHUNK_SIZE):
+	# (marker names, exported columns) of each chunk of a stream of
+	# assignments, holding only one chunk of assignments at a time. Marker
+	# names are the markers seen so far, and codes stay the same across chunks.
+	markerNames = []
+	markerCodes = dict()
+
+	def markerCode(marker):
+		code = markerCodes.get(marker.getName())
+		if code is None:
+			code = markerCodes[marker.getName()] = len(markerNames)
+			markerNames.append(marker.getName())
+		return code
+
+	assignments = iter(assignments)
+	while True:
+		chunk = list(itertools.islice(assignments, chunkSize))
+		if not chunk:
+			return
+		studentNumbers, codes, testing, usability, quality, testingParts, qualityParts = \
+			GradeStore.assignmentColumns(chunk, markerCode)
+		yield markerNames, exportColumns(studentNumbers, codes, {'testing': testing, 'usability': usability,
+			'quality': quality, 'testingParts': testingParts, 'qualityParts': qualityParts})
+
+
+class CsvWriter:
+	# One CSV row per assignment, written a chunk at a time
+
+	def __init__(self, file):
+		self.writer = csv.writer(file)
+		self.header = None
+
+	def write(self, markerNames: list, columns: dict):
+		if self.header is None:
+			self.header = list(columns)
+			self.writer.writerow(self.header)
+		values = [columns[name].tolist() for name in self.header]
+		values[self.header.index('marker')] = [markerNames[code] for code in values[self.header.index('marker')]]
+		for flag, name in enumerate(self.header):
+			if columns[name].dtype == bool:
+				values[flag] = [int(value) for value in values[flag]]
+		self.writer.writerows(zip(*values))
+
+	def close(self):
+		pass
+
+
+class ColumnWriter:
+	# Chunked columnar file, in the spirit of Parquet row groups: each chunk
+	# is written as one .npy array per column straight after the previous
+	# one, and a JSON footer at the end records the offset of every array,
+	# the row count of each chunk and the marker names, which the marker
+	# column refers to by code. Memory use is bounded by the chunk size.
+	#
+	#   magic | arrays of chunk 0 | arrays of chunk 1 | ... | footer | footer length | magic
+
+	def __init__(self, file):
+		self.file = file
+		self.file.write(COLUMNS_MAGIC)
+		self.chunks = []
+		self.markerNames = []
+
+	def write(self, markerNames: list, columns: dict):
+		offsets = dict()
+		for name, column in columns.items():
+			offsets[name] = self.file.tell()
+			np.save(self.file, np.ascontiguousarray(column), allow_pickle=False)
+		self.chunks.append({'rows': len(columns['marker']), 'offsets': offsets})
+		self.markerNames = list(markerNames)
+
+	def close(self):
+		footer = json.dumps({'version': COLUMNS_VERSION, 'markerNames': self.markerNames,
+			'columns': list(self.chunks[0]['offsets']) if self.chunks else [], 'chunks': self.chunks}).encode()
+		self.file.write(footer)
+		self.file.write(struct.pack('<Q', len(footer)))
+		self.file.write(COLUMNS_MAGIC)
+
+
+class ColumnReader:
+	# Reads the columns of a file written by ColumnWriter, a chunk at a time
+
+	def __init__(self, path: str):
+		self.file = open(path, 'rb')
+		if self.file.read(len(COLUMNS_MAGIC)) != COLUMNS_MAGIC:
+			raise ValueError('{0} is not a grade column file'.format(path))
+		self.file.seek(-8 - len(COLUMNS_MAGIC), io.SEEK_END)
+		length = struct.unpack('<Q', self.file.read(8))[0]
+		if self.file.read(len(COLUMNS_MAGIC)) != COLUMNS_MAGIC:
+			raise ValueError('{0} is incomplete'.format(path))
+		self.file.seek(-8 - len(COLUMNS_MAGIC) - length, io.SEEK_END)
+		footer = json.loads(self.file.read(length).decode())
+		if footer['version'] != COLUMNS_VERSION:
+			raise ValueError('{0} has version {1}, expected {2}'.format(path, footer['version'], COLUMNS_VERSION))
+		self.markerNames = footer['markerNames']
+		self.columns = footer['columns']
+		self.chunks = footer['chunks']
+
+	def __len__(self):
+		return sum(chunk['rows'] for chunk in self.chunks)
+
+	def iterChunks(self, columns: list = None):
+		for chunk in self.chunks:
+			result = dict()
+			for name in columns or self.columns:
+				self.file.seek(chunk['offsets'][name])
+				result[name] = np.load(self.file, allow_pickle=False)
+			yield result
+
+	def readColumn(self, name: str):
+		return np.concatenate([chunk[name] for chunk in self.iterChunks([name])])
+
+	def close(self):
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+		return False
+
+
+def exportChunks(chunks, csvPath: str = None, columnsPath: str = None):
+	# Writes each chunk to the CSV and/or column file as it is produced.
+	# Gives the number of rows written.
+	files = []
+	writers = []
+	try:
+		if csvPath is not None:
+			files.append(open(csvPath, 'w', newline='', encoding='utf8'))
+			writers.append(CsvWriter(files[-1]))
+		if columnsPath is not None:
+			files.append(open(columnsPath, 'wb'))
+			writers.append(ColumnWriter(files[-1]))
+
+		rows = 0
+		for markerNames, columns in chunks:
+			for writer in writers:
+				writer.write(markerNames, columns)
+			rows += len(columns['marker'])
+		for writer in writers:
+			writer.close()
+		return rows
+	finally:
+		for file in files:
+			file.close()
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(
+		description='Export the grades, parts and marking errors of a marked folder, one assignment at a time.')
+	argParser.add_argument('dir', nargs='?', default=a3_analysis.directory, help='marked folder to export')
+	argParser.add_argument('--csv', help='CSV file to write')
+	argParser.add_argument('--columns', help='chunked column file to write')
+	argParser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+		help='assignments held in memory at a time (default: {0})'.format(DEFAULT_CHUNK_SIZE))
+	args = argParser.parse_args()
+	if args.csv is None and args.columns is None:
+		argParser.error('give --csv and/or --columns')
+
+	rows = exportChunks(assignmentChunks(AssignmentParser().iterAssignments(args.dir), args.chunk_size),
+		args.csv, args.columns)
+	print('Exported {0} assignments'.format(rows))
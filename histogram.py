@@ -0,0 +1,86 @@
+from lazy_import import lazyImport
+
+np = lazyImport('numpy')
+
+
+def halfMarkBins(maxMark: float):
+	return np.linspace(0, maxMark, int(round(maxMark * 2)) + 1)
+
+
+class GradeHistograms:
+	# Half-mark histograms for several grade columns of equal length. Every
+	# column is binned by a single np.bincount over offset bin indices, and
+	# values which do not fall exactly on a half mark in [0, max] are ignored.
+
+	def __init__(self, columns: dict, maxMarks: dict):
+		self.names = list(columns)
+		self.maxMarks = dict(maxMarks)
+
+		binCounts = np.array([int(round(maxMarks[name] * 2)) + 1 for name in self.names], np.intp)
+		offsets = np.concatenate(([0], np.cumsum(binCounts)[:-1]))
+
+		if self.names:
+			values = np.vstack([np.asarray(columns[name], np.float64) for name in self.names])
+		else:
+			values = np.empty((0, 0))
+		halves = values * 2
+		index = np.rint(halves)
+		onBin = (halves == index) & (index >= 0) & (index < binCounts[:, None])
+		binIndex = (index.astype(np.intp) + offsets[:, None])[onBin]
+		counts = np.bincount(binIndex, minlength=int(binCounts.sum()))
+
+		self.counts = dict()
+		for name, offset, binCount in zip(self.names, offsets, binCounts):
+			self.counts[name] = counts[offset:offset + binCount]
+
+	def getBins(self, name: str):
+		return halfMarkBins(self.maxMarks[name])
+
+	def getCounts(self, name: str):
+		return self.counts[name]
+
+	def getHistogram(self, name: str):
+		return self.getBins(name), self.getCounts(name)
+
+
+class StreamingHistogram:
+	# Half-mark histogram of a single grade which is filled one value at a time
+
+	def __init__(self, maxMark: float):
+		self.maxMark = maxMark
+		self.counts = [0] * (int(round(maxMark * 2)) + 1)
+
+	def add(self, value: float):
+		half = value * 2
+		index = int(half)
+		if index == half and 0 <= index < len(self.counts):
+			self.counts[index] += 1
+
+	def merge(self, other):
+		self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+	def getBins(self):
+		return halfMarkBins(self.maxMark)
+
+	def getCounts(self):
+		return np.array(self.counts)
+
+	def getHistogram(self):
+		return self.getBins(), self.getCounts()
+
+	def median(self):
+		# Median of the binned values, matching np.median when every value is on a bin
+		total = sum(self.counts)
+		if total == 0:
+			raise ValueError('median of an empty histogram')
+
+		lower = upper = None
+		seen = 0
+		for index, count in enumerate(self.counts):
+			seen += count
+			if lower is None and seen > (total - 1) // 2:
+				lower = index
+			if seen > total // 2:
+				upper = index
+				break
+		return (lower + upper) / 4.0
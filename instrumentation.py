@@ -0,0 +1,103 @@
+import os
+import time
+import cProfile
+
+PROFILE_ENV = 'GRADE_ANALYSIS_PROFILE'
+PROFILE_DUMP_ENV = 'GRADE_ANALYSIS_PROFILE_DUMP'
+
+
+class NullStage:
+	# Shared stand-in for a stage while instrumentation is off
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+
+class Stage:
+
+	def __init__(self, timings, name: str):
+		self.timings = timings
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc):
+		self.timings.addTime(self.name, time.perf_counter() - self.start)
+		return False
+
+
+class Timings:
+	# Seconds spent per stage and counters of work done. While disabled,
+	# stage() returns a shared no-op context manager and callers are expected
+	# to check `enabled` before counting, so the cost is one attribute lookup.
+
+	def __init__(self, enabled: bool = False):
+		self.enabled = enabled
+		self.nullStage = NullStage()
+		self.reset()
+
+	def reset(self):
+		self.seconds = dict()
+		self.calls = dict()
+		self.counters = dict()
+
+	def enable(self, enabled: bool = True):
+		self.enabled = enabled
+
+	def stage(self, name: str):
+		if not self.enabled:
+			return self.nullStage
+		return Stage(self, name)
+
+	def addTime(self, name: str, seconds: float):
+		self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+		self.calls[name] = self.calls.get(name, 0) + 1
+
+	def count(self, name: str, amount: int = 1):
+		self.counters[name] = self.counters.get(name, 0) + amount
+
+	def state(self):
+		# Everything recorded, to be sent from a worker process and merged
+		return self.seconds, self.calls, self.counters
+
+	def merge(self, state):
+		seconds, calls, counters = state
+		for name in seconds:
+			self.seconds[name] = self.seconds.get(name, 0.0) + seconds[name]
+			self.calls[name] = self.calls.get(name, 0) + calls[name]
+		for name, amount in counters.items():
+			self.count(name, amount)
+
+	def display(self):
+		result = 'TIMINGS\n{0}\n'.format('=' * len('TIMINGS'))
+		if not self.enabled:
+			return result + 'Instrumentation is off, start with --profile or {0}=1\n'.format(PROFILE_ENV)
+
+		for name in self.seconds:
+			result += '{0}: {1:.4f} s ({2} calls)\n'.format(name, self.seconds[name], self.calls[name])
+		if self.counters:
+			result += '\n'
+		for name in self.counters:
+			result += '{0}: {1}\n'.format(name, self.counters[name])
+		return result
+
+
+def runProfiled(dumpPath: str, function, *args, **kwargs):
+	# Runs function under cProfile and writes the stats to dumpPath, for
+	# reading with pstats or snakeviz. Without a path it is just called.
+	if not dumpPath:
+		return function(*args, **kwargs)
+
+	profiler = cProfile.Profile()
+	try:
+		return profiler.runcall(function, *args, **kwargs)
+	finally:
+		profiler.dump_stats(dumpPath)
+
+
+timings = Timings(os.environ.get(PROFILE_ENV, '') not in ('', '0'))
@@ -0,0 +1,30 @@
+import importlib
+
+
+class LazyModule:
+	# Stands in for a module, which is only imported when one of its
+	# attributes is first used. Keeps heavy imports such as numpy and
+	# matplotlib off the start up path of commands which never need them.
+	# Its own state is name mangled so that every public attribute, such as
+	# numpy.load, is the module's.
+
+	def __init__(self, name: str):
+		self.__dict__['_LazyModule__name'] = name
+		self.__dict__['_LazyModule__module'] = None
+
+	def __load(self):
+		module = self.__module
+		if module is None:
+			module = importlib.import_module(self.__name)
+			self.__dict__['_LazyModule__module'] = module
+		return module
+
+	def __getattr__(self, attribute: str):
+		return getattr(self.__load(), attribute)
+
+	def __repr__(self):
+		return '<LazyModule {0}>'.format(self.__name)
+
+
+def lazyImport(name: str):
+	return LazyModule(name)
@@ -0,0 +1,35 @@
+import re
+
+STOP = -1
+
+
+class LineClassifier:
+	# Maps a stripped line to the slot of the grade it holds with a single
+	# match against one precompiled alternation of every line prefix. Slots
+	# are positions in the list of prefixes given, and a line starting with
+	# the stop prefix classifies as STOP.
+
+	def __init__(self, prefixes: list, stopPrefix: str = None):
+		alternatives = [(prefix, slot) for slot, prefix in enumerate(prefixes)]
+		if stopPrefix is not None:
+			alternatives.append((stopPrefix, STOP))
+
+		# Longest first, so that no prefix can shadow a longer one
+		alternatives.sort(key=lambda alternative: -len(alternative[0]))
+		self.slots = [None] + [slot for prefix, slot in alternatives]
+		self.pattern = re.compile('|'.join('(?P<s{0}>{1})'.format(i, re.escape(prefix))
+			for i, (prefix, slot) in enumerate(alternatives)))
+		self.match = self.pattern.match
+
+	def classify(self, line: str):
+		match = self.match(line)
+		if match is None:
+			return None
+		return self.slots[match.lastindex]
+
+
+def parseGrade(line: str):
+	try:
+		return float(line.rpartition(':')[2])
+	except ValueError:
+		return -1.0
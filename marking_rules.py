@@ -0,0 +1,188 @@
+from lazy_import import lazyImport
+
+np = lazyImport('numpy')
+
+# Grade recorded for a part which was never marked
+MISSING = -1.0
+
+
+class Rule:
+	# A marking rule checked across a whole cohort at once. `failing` maps a
+	# dict of grade columns to a boolean array, true for each row which breaks
+	# the rule, and `detail` says what is wrong with one of those rows.
+
+	def __init__(self, name: str, failing, detail):
+		self.name = name
+		self.failing = failing
+		self.detail = detail
+
+	def __repr__(self):
+		return '<Rule {0}>'.format(self.name)
+
+
+def missingParts(column: str, partNames: list):
+	def failing(columns):
+		return (columns[column] == MISSING).any(axis=1)
+
+	def detail(columns, row: int):
+		return 'no grade for ' + ', '.join(name for name, part in zip(partNames, columns[column][row])
+			if part == MISSING)
+
+	return Rule('missing part', failing, detail)
+
+
+def partRange(column: str, partNames: list, caps: list):
+	# Missing parts are left to missingParts
+	def outOfRange(parts):
+		return ((parts < 0) | (parts > np.asarray(caps, np.float64))) & (parts != MISSING)
+
+	def failing(columns):
+		return outOfRange(columns[column]).any(axis=1)
+
+	def detail(columns, row: int):
+		parts = columns[column][row]
+		return ', '.join('{0} {1} not in [0, {2}]'.format(partNames[i], parts[i], caps[i])
+			for i in np.flatnonzero(outOfRange(parts)))
+
+	return Rule('part range', failing, detail)
+
+
+# Formulas giving an overall grade from a sequence of parts, which are
+# either the grades of one assignment or columns of a cohort's grades, so
+# that single assignments and marking rules share one definition
+
+
+def partTotal(parts):
+	return sum(parts)
+
+
+def roundedProduct(parts):
+	# Sum of every part but the last, scaled by the last and rounded up to
+	# the next half mark, -(-x // 1) rounding up numbers and arrays alike
+	return -(-2 * (sum(parts[:-1]) * parts[-1]) // 1) / 2.0
+
+
+FORMULAS = {'sum': partTotal, 'roundedProduct': roundedProduct}
+
+
+def partsAddUp(name: str, formula: str, partsColumn: str, overallColumn: str, description: str):
+	# Rows with missing parts are left to missingParts
+	calculate = FORMULAS[formula]
+
+	def failing(columns):
+		parts = columns[partsColumn]
+		return (calculate(parts.T) != columns[overallColumn]) & ~(parts == MISSING).any(axis=1)
+
+	def detail(columns, row: int):
+		return 'parts {0} {1}, overall {2}'.format(description, calculate(columns[partsColumn][row]),
+			columns[overallColumn][row])
+
+	return Rule(name, failing, detail)
+
+
+def partSum(name: str, partsColumn: str, overallColumn: str):
+	return partsAddUp(name, 'sum', partsColumn, overallColumn, 'sum to')
+
+
+def roundedQuality(name: str, partsColumn: str, overallColumn: str):
+	return partsAddUp(name, 'roundedProduct', partsColumn, overallColumn, 'give')
+
+
+def overallCaps(caps: dict):
+	# caps maps the name of an overall grade column to its maximum
+	def outOfRange(columns, column: str):
+		grades = columns[column]
+		return (grades < 0) | (grades > caps[column])
+
+	def failing(columns):
+		result = None
+		for column in caps:
+			mask = outOfRange(columns, column)
+			result = mask if result is None else result | mask
+		return result
+
+	def detail(columns, row: int):
+		return ', '.join('{0} {1} not in [0, {2}]'.format(column, columns[column][row], caps[column])
+			for column in caps if outOfRange(columns, column)[row])
+
+	return Rule('overall caps', failing, detail)
+
+
+class ErrorTable:
+	# One entry per (row, broken rule), ordered by marker code, then row,
+	# then rule. `invalid` marks every row breaking at least one rule.
+
+	def __init__(self, rules: list, columns: dict, failing, markerCodes):
+		self.rules = rules
+		self.columns = columns
+		self.failing = failing
+		self.invalid = failing.any(axis=1)
+		rows, ruleIndex = np.nonzero(failing)
+		order = np.lexsort((ruleIndex, rows, np.asarray(markerCodes)[rows]))
+		self.rows = rows[order]
+		self.ruleIndex = ruleIndex[order]
+		self.markerCodes = np.asarray(markerCodes)[self.rows]
+
+	def __len__(self):
+		return len(self.rows)
+
+	def ruleCounts(self):
+		# Entries for each rule name, several rules may share a name
+		counts = dict()
+		for rule, count in zip(self.rules, self.failing.sum(axis=0)):
+			counts[rule.name] = counts.get(rule.name, 0) + int(count)
+		return counts
+
+	def entries(self):
+		# (row, marker code, rule name, detail) for each entry in order
+		for row, markerCode, rule in zip(self.rows, self.markerCodes, self.ruleIndex):
+			rule = self.rules[rule]
+			yield int(row), int(markerCode), rule.name, rule.detail(self.columns, row)
+
+	def display(self, studentNumbers, markerNames: list):
+		return ErrorLog().add(self, studentNumbers).display(markerNames)
+
+
+class ErrorLog:
+	# Entries of the ErrorTables of successive chunks of rows, grouped by
+	# marker, so that a stream of assignments can be checked a chunk at a
+	# time holding only the errors found. Marker codes must mean the same in
+	# every chunk.
+
+	def __init__(self):
+		self.markerEntries = dict()
+		self.ruleCounts = dict()
+
+	def __len__(self):
+		return sum(len(entries) for entries in self.markerEntries.values())
+
+	def add(self, errors: ErrorTable, studentNumbers):
+		for row, markerCode, name, detail in errors.entries():
+			self.markerEntries.setdefault(markerCode, []).append((studentNumbers[row], name, detail))
+		for name, count in errors.ruleCounts().items():
+			self.ruleCounts[name] = self.ruleCounts.get(name, 0) + count
+		return self
+
+	def display(self, markerNames: list):
+		lines = []
+		for markerCode in sorted(self.markerEntries):
+			lines.append(markerNames[markerCode] if markerCode >= 0 else '(no marker)')
+			for studentNumber, name, detail in self.markerEntries[markerCode]:
+				lines.append('  {0}  {1}: {2}'.format(studentNumber, name, detail))
+		return ''.join(line + '\n' for line in lines)
+
+
+class RuleSet:
+
+	def __init__(self, rules: list):
+		self.rules = list(rules)
+
+	def names(self):
+		return [rule.name for rule in self.rules]
+
+	def evaluate(self, columns: dict, markerCodes):
+		n = len(markerCodes)
+		failing = np.zeros((n, len(self.rules)), bool)
+		for i, rule in enumerate(self.rules):
+			failing[:, i] = rule.failing(columns)
+		return ErrorTable(self.rules, columns, failing, markerCodes)
@@ -0,0 +1,164 @@
+import concurrent.futures
+
+from lazy_import import lazyImport
+
+np = lazyImport('numpy')
+
+COMPONENTS = ('testing', 'usability', 'quality', 'total')
+DEFAULT_RESAMPLES = 2000
+# Grades gathered per block of resamples, bounding the memory used
+RESAMPLE_BLOCK_SIZE = 2000000
+# Normal quantile for the outlier threshold, about 1 script in 1000 by chance
+OUTLIER_Z = 3.09
+
+
+class GroupedGrades:
+	# Valid rows of a GradeStore sorted by marker so that each marker's
+	# assignments are a contiguous run, with every component as a column of
+	# one (rows, components) array. Means of every marker are then one
+	# reduceat, for the actual grades or for thousands of resamples at once.
+
+	def __init__(self, store):
+		rows = np.flatnonzero(store.valid & (store.markerCodes >= 0))
+		self.rows = rows[np.argsort(store.markerCodes[rows], kind='stable')]
+		codes = store.markerCodes[self.rows]
+		counts = np.bincount(codes, minlength=len(store.markerNames))
+		present = np.flatnonzero(counts)
+		self.markerNames = [store.markerNames[code] for code in present]
+		self.counts = counts[present]
+		self.starts = np.cumsum(self.counts) - self.counts
+		self.grades = np.column_stack([getattr(store, name)[self.rows] for name in COMPONENTS])
+		self.parts = np.hstack((store.testingParts[self.rows], store.qualityParts[self.rows]))
+		self.markerCodes = np.repeat(np.arange(len(present)), self.counts)
+
+	def __len__(self):
+		return len(self.rows)
+
+	def markerMeans(self, grades):
+		# (..., rows, components) grades to (..., markers, components) means
+		return np.add.reduceat(grades, self.starts, axis=-2) / self.counts[:, None]
+
+	def deviations(self):
+		# Each marker's mean less the cohort mean, per component
+		return self.markerMeans(self.grades) - self.grades.mean(axis=0)
+
+	def blockSize(self):
+		return max(1, RESAMPLE_BLOCK_SIZE // max(1, len(self) * len(COMPONENTS)))
+
+
+def permutationExceedances(grouped: GroupedGrades, resamples: int, seed):
+	# Resamples in which shuffling grades between markers moved a marker's
+	# mean at least as far from the cohort mean as it actually is. The
+	# cohort mean is the same under every shuffle.
+	rng = np.random.default_rng(seed)
+	cohort = grouped.grades.mean(axis=0)
+	observed = np.abs(grouped.deviations())
+	# Leeway for rounding, as grades are often exactly tied
+	observed -= 1e-9 * np.maximum(1.0, observed)
+	exceed = np.zeros(observed.shape, np.int64)
+	order = np.tile(np.arange(len(grouped)), (min(resamples, grouped.blockSize()), 1))
+	done = 0
+	while done < resamples:
+		block = order[:min(len(order), resamples - done)]
+		rng.permuted(block, axis=1, out=block)
+		means = grouped.markerMeans(grouped.grades[block])
+		exceed += (np.abs(means - cohort) >= observed).sum(axis=0)
+		done += len(block)
+	return exceed
+
+
+def bootstrapDeviations(grouped: GroupedGrades, resamples: int, seed):
+	# (resamples, markers, components) deviations from the cohort mean with
+	# each marker's assignments resampled with replacement
+	rng = np.random.default_rng(seed)
+	starts = np.repeat(grouped.starts, grouped.counts)
+	counts = np.repeat(grouped.counts, grouped.counts)
+	deviations = []
+	done = 0
+	while done < resamples:
+		size = min(grouped.blockSize(), resamples - done)
+		index = starts + (rng.random((size, len(grouped))) * counts).astype(np.intp)
+		sums = np.add.reduceat(grouped.grades[index], grouped.starts, axis=1)
+		cohort = sums.sum(axis=1, keepdims=True) / len(grouped)
+		deviations.append(sums / grouped.counts[:, None] - cohort)
+		done += size
+	return np.concatenate(deviations) if deviations else np.zeros((0,) + grouped.deviations().shape)
+
+
+def splitResamples(resamples: int, seed, workers: int):
+	# Share of the resamples and an independent seed for each worker
+	seeds = np.random.SeedSequence(seed).spawn(workers)
+	return [(resamples // workers + (i < resamples % workers), seeds[i]) for i in range(workers)]
+
+
+def holm(pValues):
+	# Holm-Bonferroni adjusted p-values, over every marker and component tested
+	flat = pValues.ravel()
+	order = np.argsort(flat, kind='stable')
+	adjusted = np.maximum.accumulate(flat[order] * (len(flat) - np.arange(len(flat))))
+	result = np.empty_like(flat)
+	result[order] = np.minimum(adjusted, 1.0)
+	return result.reshape(pValues.shape)
+
+
+def markerBias(grouped: GroupedGrades, resamples: int = DEFAULT_RESAMPLES, level: float = 0.95,
+		seed=None, workers: int = 1):
+	# For every marker and component: deviation from the cohort mean, the same
+	# as a fraction of the cohort's standard deviation, a two-sided
+	# permutation test p-value for the marker's grades being drawn from the
+	# cohort, adjusted with Holm's method, and bootstrap bounds on the
+	# deviation at the given level. Resamples are split between worker
+	# processes, every marker being done in each.
+	# Gives marker name -> {component: (count, deviation, effect, p, adjusted p, lower, upper)}.
+	if not len(grouped):
+		return dict()
+	shares = splitResamples(resamples, seed, max(1, workers))
+	if workers > 1 and resamples > 1:
+		with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+			exceeds = pool.map(permutationExceedances, *zip(*[(grouped, share, shareSeed) for share, shareSeed in shares]))
+			samples = pool.map(bootstrapDeviations, *zip(*[(grouped, share, shareSeed) for share, shareSeed in shares]))
+			exceed = sum(exceeds)
+			bootstrap = np.concatenate(list(samples))
+	else:
+		exceed = permutationExceedances(grouped, resamples, shares[0][1])
+		bootstrap = bootstrapDeviations(grouped, resamples, shares[0][1])
+
+	deviations = grouped.deviations()
+	spread = grouped.grades.std(axis=0)
+	effects = deviations / np.where(spread > 0, spread, 1.0)
+	pValues = (exceed + 1) / (resamples + 1)
+	adjusted = holm(pValues)
+	lower, upper = np.quantile(bootstrap, [(1 - level) / 2, (1 + level) / 2], axis=0)
+
+	return {name: {component: (int(grouped.counts[m]), float(deviations[m, c]), float(effects[m, c]),
+			float(pValues[m, c]), float(adjusted[m, c]), float(lower[m, c]), float(upper[m, c]))
+		for c, component in enumerate(COMPONENTS)} for m, name in enumerate(grouped.markerNames)}
+
+
+def partOutliers(grouped: GroupedGrades, z: float = OUTLIER_Z):
+	# Assignments whose pattern of part grades is unusual for the cohort: the
+	# squared Mahalanobis distance of the parts from the cohort mean, with the
+	# pseudo-inverse covariance as parts are often constant or dependent, is
+	# over the chi-squared quantile for z (Wilson-Hilferty approximation).
+	# Gives (store row, distance, threshold, part index of the largest
+	# standardized deviation) for each outlier, furthest first, and the
+	# number of outliers per marker.
+	parts = grouped.parts
+	if len(parts) < 2:
+		return [], dict()
+	centred = parts - parts.mean(axis=0)
+	covariance = np.cov(parts, rowvar=False)
+	inverse = np.linalg.pinv(covariance, hermitian=True)
+	distances = np.einsum('ij,jk,ik->i', centred, inverse, centred)
+
+	degrees = max(1, int(np.linalg.matrix_rank(covariance, hermitian=True)))
+	threshold = degrees * (1 - 2 / (9 * degrees) + z * np.sqrt(2 / (9 * degrees))) ** 3
+	outliers = np.flatnonzero(distances > threshold)
+	outliers = outliers[np.argsort(-distances[outliers], kind='stable')]
+
+	spread = parts.std(axis=0)
+	standardized = np.abs(centred[outliers]) / np.where(spread > 0, spread, np.inf)
+	counts = np.bincount(grouped.markerCodes[outliers], minlength=len(grouped.markerNames))
+	return ([(int(grouped.rows[i]), float(distances[i]), float(threshold), int(part))
+			for i, part in zip(outliers, standardized.argmax(axis=1))],
+		{name: int(count) for name, count in zip(grouped.markerNames, counts)})
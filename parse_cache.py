@@ -0,0 +1,78 @@
+import os
+import json
+
+
+def asTuples(value):
+	# Records are made of tuples, which JSON reads back as lists
+	if isinstance(value, list):
+		return tuple(asTuples(item) for item in value)
+	return value
+
+
+class ParseCache:
+	# Persistent cache of parsed assignment records, keyed by file path and
+	# revalidated against each file's mtime and size. Kept as JSON rather than
+	# pickle, as the cache sits next to the marked folder on a shared drive
+	# and unpickling a file anyone could write there would run their code.
+
+	def __init__(self, path: str, version: int):
+		self.path = path
+		self.version = version
+		self.entries = dict()
+		self.seen = set()
+		self.dirty = False
+
+	@staticmethod
+	def pathForDirectory(dir: str, name: str) -> str:
+		dir = os.path.normpath(dir)
+		return os.path.join(os.path.dirname(dir), '.{0}.{1}.cache'.format(os.path.basename(dir), name))
+
+	@classmethod
+	def forDirectory(cls, dir: str, name: str, version: int):
+		cache = cls(cls.pathForDirectory(dir, name), version)
+		cache.load()
+		return cache
+
+	def load(self):
+		try:
+			with open(self.path, 'r', encoding='utf8') as file:
+				data = json.load(file)
+			version, entries = data['version'], data['entries']
+		except (OSError, ValueError, TypeError, KeyError):
+			# Missing or unreadable cache, start again from scratch
+			return
+
+		if version == self.version and isinstance(entries, dict):
+			self.entries = {filename: entry for filename, entry in entries.items()
+				if isinstance(entry, list) and len(entry) == 3}
+
+	def save(self):
+		if not self.dirty:
+			return
+
+		tmpPath = self.path + '.tmp'
+		with open(tmpPath, 'w', encoding='utf8') as file:
+			json.dump({'version': self.version, 'entries': self.entries}, file, separators=(',', ':'))
+		os.replace(tmpPath, self.path)
+		self.dirty = False
+
+	def get(self, filename: str, stat: os.stat_result):
+		self.seen.add(filename)
+		entry = self.entries.get(filename)
+		if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+			return asTuples(entry[2])
+		return None
+
+	def put(self, filename: str, stat: os.stat_result, record):
+		self.entries[filename] = [stat.st_mtime_ns, stat.st_size, record]
+		self.dirty = True
+
+	def prune(self, filenames=None):
+		# Drop entries for files which no longer exist in the directory,
+		# by default any file not looked up since the cache was loaded
+		keep = self.seen if filenames is None else set(filenames)
+		stale = [filename for filename in self.entries if filename not in keep]
+		for filename in stale:
+			del self.entries[filename]
+		if stale:
+			self.dirty = True
@@ -0,0 +1,224 @@
+import re
+import operator
+
+from lazy_import import lazyImport
+
+np = lazyImport('numpy')
+
+TOKEN = re.compile(r"""\s*(?:
+	(?P<number>-?(?:\d+(?:\.\d*)?|\.\d+))
+	|(?P<op><=|>=|!=|==|=|<|>)
+	|(?P<paren>[()])
+	|(?P<string>'[^']*'|"[^"]*")
+	|(?P<word>[A-Za-z_][\w.-]*)
+	)""", re.VERBOSE)
+
+OPERATORS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne,
+	'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+KEYWORDS = ('and', 'or', 'not')
+
+
+class QueryError(ValueError):
+	pass
+
+
+def tokenize(text: str):
+	tokens = []
+	position = 0
+	text = text.rstrip()
+	while position < len(text):
+		match = TOKEN.match(text, position)
+		if match is None or match.end() == position:
+			raise QueryError('Unexpected {0!r} in query'.format(text[position:].strip()[:20]))
+		kind = match.lastgroup
+		value = match.group(kind)
+		if kind == 'string':
+			kind, value = 'word', value[1:-1]
+		elif kind == 'word' and value.lower() in KEYWORDS:
+			kind, value = value.lower(), value.lower()
+		elif kind == 'number':
+			value = float(value)
+		tokens.append((kind, value))
+		position = match.end()
+	return tokens
+
+
+def gradeField(column: str, part: int = None):
+	def values(store):
+		grades = getattr(store, column)
+		return grades if part is None else grades[:, part]
+	return values
+
+
+def gradeFields():
+	# Numeric fields: overall grades and every part of the rubric, by name
+	from a3_analysis import RUBRIC
+	fields = {name: gradeField(name) for name in list(RUBRIC.components) + ['total']}
+	for name, column, part in RUBRIC.partFields():
+		fields[name] = gradeField(column, part)
+	return fields
+
+
+def rowMask(store, rows):
+	mask = np.zeros(len(store), bool)
+	mask[rows] = True
+	return mask
+
+
+def markerCondition(op: str, name: str):
+	# Uses the store's cached rows of each marker
+	def mask(store):
+		result = rowMask(store, store.markerRows(name)) if store.hasMarker(name) else np.zeros(len(store), bool)
+		return result if op in ('=', '==') else ~result
+	return mask
+
+
+def studentCondition(op: str, studentNumber: str):
+	def mask(store):
+		result = rowMask(store, store.studentRows(studentNumber))
+		return result if op in ('=', '==') else ~result
+	return mask
+
+
+def errorCondition(op: str, ruleName: str):
+	# Rows breaking the marking rule(s) of the given name
+	def mask(store):
+		ruleIndex = [i for i, rule in enumerate(store.errors.rules) if rule.name == ruleName]
+		if not ruleIndex:
+			raise QueryError('Unknown marking rule {0!r}, expected one of: {1}'.format(ruleName,
+				', '.join(dict.fromkeys(rule.name for rule in store.errors.rules))))
+		result = store.errors.failing[:, ruleIndex].any(axis=1)
+		return result if op in ('=', '==') else ~result
+	return mask
+
+
+def flagCondition(op: str, value: bool, flag):
+	def mask(store):
+		result = flag(store)
+		return result if (op in ('=', '==')) == value else ~result
+	return mask
+
+
+FLAGS = {'valid': lambda store: store.valid,
+	'duplicate': lambda store: rowMask(store, store.duplicateRows)}
+
+
+class Parser:
+	# Recursive descent over the tokens of a condition:
+	#   condition := conjunction ('or' conjunction)*
+	#   conjunction := negation ('and' negation)*
+	#   negation := 'not' negation | '(' condition ')' | field op value
+	# Each rule gives a function from a GradeStore to a boolean row mask.
+
+	def __init__(self, tokens: list, fields: dict):
+		self.tokens = tokens
+		self.position = 0
+		self.fields = fields
+
+	def peek(self):
+		return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+	def take(self, kind: str = None):
+		token = self.peek()
+		if token[0] is None or (kind is not None and token[0] != kind):
+			raise QueryError('Expected {0} but found {1}'.format(kind or 'more', token[1] or 'end of query'))
+		self.position += 1
+		return token[1]
+
+	def parse(self):
+		condition = self.condition()
+		if self.peek()[0] is not None:
+			raise QueryError('Unexpected {0!r} in query'.format(self.peek()[1]))
+		return condition
+
+	def condition(self):
+		parts = [self.conjunction()]
+		while self.peek()[0] == 'or':
+			self.take()
+			parts.append(self.conjunction())
+		if len(parts) == 1:
+			return parts[0]
+		return lambda store: np.logical_or.reduce([part(store) for part in parts])
+
+	def conjunction(self):
+		parts = [self.negation()]
+		while self.peek()[0] == 'and':
+			self.take()
+			parts.append(self.negation())
+		if len(parts) == 1:
+			return parts[0]
+		return lambda store: np.logical_and.reduce([part(store) for part in parts])
+
+	def negation(self):
+		kind = self.peek()[0]
+		if kind == 'not':
+			self.take()
+			inner = self.negation()
+			return lambda store: ~inner(store)
+		if kind == 'paren' and self.peek()[1] == '(':
+			self.take()
+			inner = self.condition()
+			if self.peek() != ('paren', ')'):
+				raise QueryError('Expected ) but found {0}'.format(self.peek()[1] or 'end of query'))
+			self.take()
+			return inner
+		return self.comparison()
+
+	def comparison(self):
+		field = self.take('word').lower()
+		op = self.take('op')
+		kind, value = self.peek()
+		if kind not in ('word', 'number'):
+			raise QueryError('Expected a value after {0} {1}'.format(field, op))
+		self.take()
+
+		if field in ('marker', 'student', 'error') or field in FLAGS:
+			if op not in ('=', '==', '!='):
+				raise QueryError('{0} can only be compared with = or !='.format(field))
+			value = str(value) if kind == 'word' else '{0:g}'.format(value)
+			if field == 'marker':
+				return markerCondition(op, value)
+			if field == 'student':
+				return studentCondition(op, value)
+			if field == 'error':
+				return errorCondition(op, value)
+			if value.lower() not in ('true', 'false', '1', '0'):
+				raise QueryError('{0} is true or false'.format(field))
+			return flagCondition(op, value.lower() in ('true', '1'), FLAGS[field])
+
+		if field not in self.fields:
+			raise QueryError('Unknown field {0!r}, expected one of: {1}'.format(field,
+				', '.join(list(self.fields) + ['marker', 'student', 'error'] + list(FLAGS))))
+		if kind != 'number':
+			raise QueryError('{0} is compared with a number'.format(field))
+		values = self.fields[field]
+		compare = OPERATORS[op]
+		return lambda store: compare(values(store), value)
+
+
+class Query:
+	# A compiled 'select where <condition>' query. An empty condition
+	# selects every row.
+
+	def __init__(self, text: str):
+		self.text = text
+		tokens = tokenize(text)
+		if tokens and tokens[0][0] == 'word' and tokens[0][1].lower() == 'select':
+			tokens = tokens[1:]
+		if tokens and tokens[0][0] == 'word' and tokens[0][1].lower() == 'where':
+			tokens = tokens[1:]
+		elif tokens:
+			raise QueryError('Expected \'select where <condition>\'')
+		self.condition = Parser(tokens, gradeFields()).parse() if tokens else None
+
+	def mask(self, store):
+		if self.condition is None:
+			return np.ones(len(store), bool)
+		return np.asarray(self.condition(store), bool)
+
+	def rows(self, store):
+		return np.flatnonzero(self.mask(store))
+
+
+def compileQuery(text: str):
+	return Query(text)
@@ -0,0 +1,74 @@
+import os
+import argparse
+import concurrent.futures
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plot
+
+import a3_analysis
+from a3_analysis import AssignmentParser, AssignmentAnalyser, CACHE_NAME, CACHE_VERSION
+from parse_cache import ParseCache
+
+# Analyser shared by the graphs rendered in a worker process
+workerAnalyser = None
+
+
+def initRenderWorker(analyser: AssignmentAnalyser):
+	global workerAnalyser
+	workerAnalyser = analyser
+
+
+def graphFilename(markerName: str, fmt: str):
+	if markerName is None:
+		return 'overall.' + fmt
+	return 'marker_{0}.{1}'.format(markerName, fmt)
+
+
+def renderGraph(markerName: str, outDir: str, fmt: str, analyser: AssignmentAnalyser = None):
+	analyser = analyser if analyser is not None else workerAnalyser
+	if markerName is None:
+		fig = analyser.overallDataGraph()
+	else:
+		fig = analyser.markerDataGraph(markerName)
+
+	path = os.path.join(outDir, graphFilename(markerName, fmt))
+	try:
+		fig.savefig(path, format=fmt)
+	finally:
+		# Figures are closed straight away to keep memory bounded
+		plot.close(fig)
+	return path
+
+
+def renderReport(analyser: AssignmentAnalyser, outDir: str, fmt: str = 'png', workers: int = 1):
+	os.makedirs(outDir, exist_ok=True)
+	graphs = [None] + analyser.getMarkerNames()
+
+	if workers > 1 and len(graphs) > 1:
+		with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+				initializer=initRenderWorker, initargs=(analyser,)) as pool:
+			return list(pool.map(renderGraph, graphs, [outDir] * len(graphs), [fmt] * len(graphs)))
+	else:
+		return [renderGraph(name, outDir, fmt, analyser) for name in graphs]
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Render the overall and per-marker graphs to files.')
+	argParser.add_argument('dir', nargs='?', default=a3_analysis.directory, help='marked folder to parse')
+	argParser.add_argument('--out', default='report', help='directory the graphs are written to')
+	argParser.add_argument('--format', choices=('png', 'svg'), default='png', help='image format')
+	argParser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+		help='number of processes used to parse and render (default: all cores)')
+	argParser.add_argument('--no-cache', action='store_true',
+		help='ignore the parse cache stored next to the marked folder')
+	args = argParser.parse_args()
+
+	parser = AssignmentParser()
+	cache = None if args.no_cache else ParseCache.forDirectory(args.dir, CACHE_NAME, CACHE_VERSION)
+	parser.parseDirectoryStructure(args.dir, workers=args.workers, cache=cache)
+
+	analyser = AssignmentAnalyser.fromParser(parser)
+
+	for path in renderReport(analyser, args.out, args.format, args.workers):
+		print(path)
@@ -0,0 +1,285 @@
+import os
+import re
+import sys
+import json
+import zlib
+
+from lazy_import import lazyImport
+from line_classifier import LineClassifier, parseGrade, STOP
+from bulk_reader import MarkedFileReader
+import marking_rules
+from marking_rules import MISSING
+
+np = lazyImport('numpy')
+
+ST_NUM = re.compile('s[0-9]{7}')
+# Marking rule checking the parts of each formula add up
+AGGREGATE_RULES = {'sum': marking_rules.partSum, 'roundedProduct': marking_rules.roundedQuality}
+
+
+def studentNumberForFile(filename: str):
+	# Marked files are named <something><student number>.txt. Other names
+	# give a string which ST_NUM does not match.
+	return filename[-12:-4]
+
+
+def markerForFile(filename: str):
+	# ... and kept in <marker>/<something>/
+	try:
+		return filename.split('/')[-3]
+	except IndexError:
+		raise ValueError('File path did not contain a valid marker name')
+
+
+def isAssignmentFile(filename: str):
+	return ST_NUM.match(studentNumberForFile(filename)) is not None
+
+
+def iterAssignmentFiles(dir: str):
+	for root, directories, filenames in os.walk(dir):
+		for filename in filenames:
+			if isAssignmentFile(filename):
+				yield os.path.join(root, filename).replace('\\', '/')
+
+
+def aggregate(formula: str, parts):
+	# Overall grade of one assignment's parts, with the marking rules' formula
+	return marking_rules.FORMULAS[formula](parts)
+
+
+class Rubric:
+	# Shape of the grades of one assignment, declared as a schema dict (or a
+	# JSON or TOML file holding one):
+	#
+	#   name        rubric name
+	#   stop        prefix of the line after which a file holds no more grades
+	#   components  overall grades, each {name, line, max, section}: the name of
+	#               its column, the prefix of the line giving it, its maximum
+	#               mark and, optionally, the section comments after it go under
+	#   parts       groups of part grades, each {column, names, lines, caps,
+	#               sections, aggregate}: one name, line prefix and cap per
+	#               part, whether comments after a part go under its name, and
+	#               optionally {formula, into, rule} giving the component the
+	#               parts add up to, with 'sum' or 'roundedProduct'
+	#   firstSection  section of comments before any grade line, none if absent
+	#   checkMaxMarks whether components over their maximum are marking errors
+	#
+	# Grades are parsed into a list with one slot per grade line, components
+	# then parts, and a file missing a line keeps 0 for a component and
+	# MISSING for a part. The total of an assignment is the sum of its components.
+
+	def __init__(self, schema: dict):
+		self.schema = schema
+		self.name = schema['name']
+		self.components = {component['name']: component['max'] for component in schema['components']}
+		self.parts = {group['column']: (list(group['names']), list(group['caps'])) for group in schema['parts']}
+
+		self.lines = [component.get('line') for component in schema['components']]
+		self.defaults = [0.0] * len(self.lines)
+		self.slotSections = [component.get('section') for component in schema['components']]
+		self.componentSlots = {component['name']: slot for slot, component in enumerate(schema['components'])}
+		self.partSlots = dict()
+		self.formulas = {group['column']: group['aggregate']['formula'] for group in schema['parts']
+			if 'aggregate' in group}
+		for group in schema['parts']:
+			start = len(self.lines)
+			self.lines += group.get('lines', [None] * len(group['names']))
+			self.defaults += [MISSING] * len(group['names'])
+			self.slotSections += group['names'] if group.get('sections', True) else [None] * len(group['names'])
+			self.partSlots[group['column']] = slice(start, len(self.lines))
+
+		self.sections = list(dict.fromkeys(section for section in
+			[schema.get('firstSection')] + self.slotSections if section is not None))
+		sectionCodes = {section: code for code, section in enumerate(self.sections)}
+		self.slotSectionCodes = [sectionCodes.get(section) for section in self.slotSections]
+		self.firstSectionCode = sectionCodes.get(schema.get('firstSection'))
+		self.classifier = None
+		self.parse = None
+		self.rules = None
+
+	def hasComponent(self, component: str):
+		return component == 'total' or component in self.components
+
+	def maxMark(self, component: str):
+		if component == 'total':
+			return sum(self.components.values())
+		return self.components[component]
+
+	def overallGrade(self, column: str, parts):
+		# Overall grade the parts of one assignment in column add up to
+		return aggregate(self.formulas[column], parts)
+
+	def isValid(self, grades: dict):
+		# Whether one assignment breaks none of markingRules(), grades mapping
+		# each component to its grade and each parts column to its parts
+		for column, (names, caps) in self.parts.items():
+			if not all(0 <= part <= cap for part, cap in zip(grades[column], caps)):
+				return False
+		for group in self.schema['parts']:
+			if 'aggregate' in group:
+				total = group['aggregate']
+				if aggregate(total['formula'], grades[group['column']]) != grades[total['into']]:
+					return False
+		if self.schema.get('checkMaxMarks', True):
+			return all(0 <= grades[name] <= mark for name, mark in self.components.items())
+		return True
+
+	def partFields(self):
+		# (field name, column, index) of every part, the field name being the
+		# part's name in lower case without spaces or a trailing dot, e.g.
+		# scenario1 or iv, as used by queries and exports
+		return [(name.replace(' ', '').rstrip('.').lower(), column, i)
+			for column, (names, caps) in self.parts.items() for i, name in enumerate(names)]
+
+	def canParse(self):
+		return None not in self.lines
+
+	def getClassifier(self):
+		if self.classifier is None:
+			if not self.canParse():
+				raise ValueError('Rubric {0} does not give the grade lines to parse'.format(self.name))
+			self.classifier = LineClassifier(self.lines, self.schema.get('stop'))
+		return self.classifier
+
+	def parseLines(self, lines):
+		# (grades, comments, lines read) of the lines of a marked file: the
+		# grade in each slot and (section code, comment) pairs, a comment being
+		# any other line, filed under the section of the grade line before it
+		if self.parse is None:
+			self.parse = self.makeParser()
+		return self.parse(lines)
+
+	def makeParser(self):
+		# Parse loop specialised to the rubric, with everything it looks up
+		# bound once. Where every grade line starts a section, as in most
+		# rubrics, the section is simply the last slot's.
+		classify = self.getClassifier().classify
+		slotSectionCodes = self.slotSectionCodes
+		defaults = self.defaults
+		firstSectionCode = self.firstSectionCode
+		everySlot = None not in slotSectionCodes
+
+		def parse(lines):
+			grades = list(defaults)
+			comments = []
+			section = firstSectionCode
+			read = 0
+
+			for read, line in enumerate(lines, 1):
+				line = line.strip()
+				slot = classify(line)
+
+				if slot is None:
+					if line and section is not None:
+						comments.append((section, line))
+				elif slot == STOP:
+					break
+				else:
+					grades[slot] = parseGrade(line)
+					if everySlot:
+						section = slotSectionCodes[slot]
+					elif slotSectionCodes[slot] is not None:
+						section = slotSectionCodes[slot]
+
+			return grades, comments, read
+
+		return parse
+
+	def parseFile(self, filename: str, reader: MarkedFileReader = None):
+		# (grades, comments) of one marked file, comments interned
+		if reader is None:
+			with open(filename, 'r', encoding='utf8') as file:
+				grades, comments, read = self.parseLines(file)
+		else:
+			grades, comments, read = self.parseLines(reader.readHeader(filename).splitlines())
+		return grades, tuple((section, sys.intern(comment)) for section, comment in comments)
+
+	def parseDirectory(self, dir: str, cache=None):
+		# Every marked file below dir, with no parse loop of its own: student
+		# numbers, marker names, the marker code of each row, an (assignments,
+		# slots) array of grades and the (section code, comment) pairs of each
+		# row. With a ParseCache made with cacheVersion, only new or changed
+		# files are parsed.
+		reader = MarkedFileReader(self.schema['stop']) if self.schema.get('stop') else None
+		studentNumbers = []
+		markerCodes = dict()
+		markerColumn = []
+		grades = []
+		comments = []
+		for filename in iterAssignmentFiles(dir):
+			record = None
+			if cache is not None:
+				stat = os.stat(filename)
+				record = cache.get(filename, stat)
+			if record is None:
+				record = self.parseFile(filename, reader)
+				if cache is not None:
+					cache.put(filename, stat, record)
+			studentNumbers.append(studentNumberForFile(filename))
+			markerColumn.append(markerCodes.setdefault(markerForFile(filename), len(markerCodes)))
+			grades.append(record[0])
+			comments.append(record[1])
+
+		return (np.array(studentNumbers, dtype=str), list(markerCodes), np.array(markerColumn, np.int32),
+			np.array(grades, np.float64).reshape(len(grades), len(self.lines)), comments)
+
+	def cacheVersion(self):
+		# Changes with the schema, so that files parsed under another schema
+		# are parsed again
+		return zlib.crc32(json.dumps(self.schema, sort_keys=True).encode())
+
+	def columns(self, grades):
+		# Columns checked by the marking rules from an (assignments, slots)
+		# array of parsed grades
+		columns = {name: grades[:, slot] for name, slot in self.componentSlots.items()}
+		for column, slots in self.partSlots.items():
+			columns[column] = grades[:, slots]
+		return columns
+
+	def markingRules(self):
+		# Vectorized checks of the rubric: parts all given and within their
+		# caps, parts adding up to their component and components within
+		# their maximum marks
+		if self.rules is None:
+			rules = [marking_rules.missingParts(column, names) for column, (names, caps) in self.parts.items()]
+			rules += [marking_rules.partRange(column, names, caps) for column, (names, caps) in self.parts.items()]
+			for group in self.schema['parts']:
+				if 'aggregate' in group:
+					total = group['aggregate']
+					rules.append(AGGREGATE_RULES[total['formula']](total.get('rule', total['into']),
+						group['column'], total['into']))
+			if self.schema.get('checkMaxMarks', True):
+				rules.append(marking_rules.overallCaps(self.components))
+			self.rules = marking_rules.RuleSet(rules)
+		return self.rules
+
+	def toJson(self):
+		return self.schema
+
+	@classmethod
+	def fromJson(cls, data: dict):
+		if isinstance(data['components'], dict):
+			# Written before rubrics were schemas: maximum marks by component
+			# and (names, caps) by parts column, without grade lines
+			sections = data.get('sections', ())
+			data = {'name': data['name'], 'checkMaxMarks': False,
+				'components': [{'name': name, 'max': mark} for name, mark in data['components'].items()],
+				'parts': [{'column': column, 'names': part['names'], 'caps': part['caps'], 'sections': False}
+					for column, part in data['parts'].items()]}
+			rubric = cls(data)
+			rubric.sections = list(sections)
+			return rubric
+		return cls(data)
+
+	@classmethod
+	def load(cls, path: str):
+		# Schema from a .toml file, or JSON otherwise
+		if path.endswith('.toml'):
+			import tomllib
+			with open(path, 'rb') as file:
+				return cls(tomllib.load(file))
+		with open(path, 'r', encoding='utf8') as file:
+			return cls(json.load(file))
+
+	def __repr__(self):
+		return '<Rubric {0}>'.format(self.name)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from a3_analysis import AssignmentAnalyser, GradeStore
+
+SNAPSHOT_FORMAT = 'grade-analysis-a3'
+SNAPSHOT_VERSION = 2
+
+
+def saveSnapshot(analyser: AssignmentAnalyser, path: str):
+	# Columnar snapshot of a parsed cohort: one array per grade column, and
+	# string tables of student numbers and marker names. Marker names are
+	# stored once and referenced by integer code, as are comment texts.
+	store = analyser.getStore()
+	commentRows, commentSections, commentCodes, commentTexts = analyser.getCommentTable()
+	with open(path, 'wb') as file:
+		np.savez(file,
+			format=np.array(SNAPSHOT_FORMAT),
+			version=np.array(SNAPSHOT_VERSION),
+			studentNumbers=store.studentNumbers,
+			markerNames=np.array(store.markerNames, dtype=str),
+			markerCodes=store.markerCodes,
+			testing=store.testing,
+			usability=store.usability,
+			quality=store.quality,
+			testingParts=store.testingParts,
+			qualityParts=store.qualityParts,
+			commentRows=commentRows,
+			commentSections=commentSections,
+			commentCodes=commentCodes,
+			commentTexts=commentTexts)
+
+
+def loadSnapshot(path: str):
+	# Analyser over a snapshot. Assignment objects are only built if a
+	# command needs them, so loading costs little more than reading the arrays.
+	with np.load(path, allow_pickle=False) as data:
+		if 'format' not in data or str(data['format']) != SNAPSHOT_FORMAT:
+			raise ValueError('{0} is not a grade analysis snapshot'.format(path))
+		version = int(data['version'])
+		if version != SNAPSHOT_VERSION:
+			raise ValueError('Snapshot {0} has version {1}, expected {2}'.format(
+				path, version, SNAPSHOT_VERSION))
+
+		store = GradeStore(data['studentNumbers'], [str(name) for name in data['markerNames']],
+			data['markerCodes'], data['testing'], data['usability'], data['quality'],
+			data['testingParts'], data['qualityParts'])
+		comments = (data['commentRows'], data['commentSections'], data['commentCodes'], data['commentTexts'])
+
+	return AssignmentAnalyser.fromStore(store, comments)
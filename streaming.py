@@ -0,0 +1,118 @@
+import math
+import argparse
+
+import a3_analysis
+from a3_analysis import AssignmentParser, dispHeadingUnderline, roundValue, maxMarks
+from histogram import StreamingHistogram
+
+
+class RunningStatistics:
+	# Count, min, max, mean and population variance of a stream of values,
+	# using Welford's algorithm so that memory stays constant
+
+	def __init__(self):
+		self.count = 0
+		self.min = math.inf
+		self.max = -math.inf
+		self.mean = 0.0
+		self.m2 = 0.0
+
+	def add(self, value: float):
+		self.count += 1
+		self.min = min(self.min, value)
+		self.max = max(self.max, value)
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self.m2 += delta * (value - self.mean)
+
+	def merge(self, other):
+		# Combines two partial results (Chan et al.)
+		if other.count == 0:
+			return
+		count = self.count + other.count
+		delta = other.mean - self.mean
+		self.mean += delta * other.count / count
+		self.m2 += other.m2 + delta * delta * self.count * other.count / count
+		self.count = count
+		self.min = min(self.min, other.min)
+		self.max = max(self.max, other.max)
+
+	def variance(self):
+		if self.count == 0:
+			raise ValueError('variance of an empty stream')
+		return self.m2 / self.count
+
+
+class AssignmentSummary:
+	# One pass summary of a stream of assignments. Like AssignmentAnalyser,
+	# statistics only include assignments without marking errors.
+
+	components = ('testing', 'usability', 'quality', 'total')
+
+	def __init__(self):
+		self.count = 0
+		self.errors = 0
+		caps = (maxMarks[0], maxMarks[1], maxMarks[2], sum(maxMarks))
+		self.statistics = {name: RunningStatistics() for name in self.components}
+		self.histograms = {name: StreamingHistogram(cap) for name, cap in zip(self.components, caps)}
+
+	def add(self, assignment):
+		self.count += 1
+		if not assignment.isAssignmentValid():
+			self.errors += 1
+			return
+
+		grades = (assignment.getOverallTesting(), assignment.getOverallUsability(),
+			assignment.getOverallQuality(), assignment.calcTotalGrade())
+		for name, grade in zip(self.components, grades):
+			self.statistics[name].add(grade)
+			self.histograms[name].add(grade)
+
+	def addAll(self, assignments):
+		for assignment in assignments:
+			self.add(assignment)
+		return self
+
+	def merge(self, other):
+		self.count += other.count
+		self.errors += other.errors
+		for name in self.components:
+			self.statistics[name].merge(other.statistics[name])
+			self.histograms[name].merge(other.histograms[name])
+
+	def display(self):
+		total = self.statistics['total']
+
+		result = 'OVERALL ASSIGNMENT STATISTICS\n{0}\n'.format(
+			dispHeadingUnderline('OVERALL ASSIGNMENT STATISTICS'))
+		result += 'Total Assignments Marked: {0}\n'.format(self.count)
+		result += 'Total Assignments With Marking Errors: {0}\n'.format(self.errors)
+		if total.count == 0:
+			# Nothing to take the min, mean or max of
+			return result + 'No assignments without marking errors\n'
+		result += 'Min/Mean/Max Grade: {0}/{1}/{2}\n'.format(total.min,
+			roundValue(total.mean, 0.01), total.max)
+		result += 'Variance: {0}\n'.format(roundValue(total.variance(), 0.01))
+		result += 'Median: {0}\n'.format(roundValue(self.histograms['total'].median(), 0.01))
+		result += '\n'
+		for name in self.components[:3]:
+			stats = self.statistics[name]
+			result += '{0} Min/Mean/Max: {1}/{2}/{3}\tVariance: {4}\n'.format(name.capitalize(),
+				stats.min, roundValue(stats.mean, 0.01), stats.max, roundValue(stats.variance(), 0.01))
+
+		return result
+
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(
+		description='Compute overall statistics over one or more marked folders in a single pass.')
+	argParser.add_argument('dirs', nargs='*', default=[a3_analysis.directory],
+		help='marked folders to summarise')
+	args = argParser.parse_args()
+
+	summary = AssignmentSummary()
+	parser = AssignmentParser()
+	for dir in args.dirs:
+		summary.addAll(parser.iterAssignments(dir))
+
+	print(summary.display())
@@ -0,0 +1,35 @@
+import pytest
+
+from benchmarks.generate import generateTree
+from a3_analysis import AssignmentParser, AssignmentAnalyser, GradeStore
+
+
+@pytest.fixture
+def markedFolder(tmp_path):
+	# Small a3 marked folder: 30 assignments over 3 markers, a few with marking errors
+	return generateTree(str(tmp_path / 'marked'), 30, markers=3, errorRate=0.2).replace('\\', '/')
+
+
+@pytest.fixture
+def parseFolder(markedFolder):
+	# Parses markedFolder, or another folder, with a new parser each call
+	def parse(dir: str = markedFolder, **options):
+		parser = AssignmentParser()
+		parser.parseDirectoryStructure(dir, **options)
+		return parser
+	return parse
+
+
+@pytest.fixture
+def parsedFolder(parseFolder):
+	return parseFolder()
+
+
+@pytest.fixture
+def analyser(parsedFolder):
+	return AssignmentAnalyser.fromParser(parsedFolder)
+
+
+@pytest.fixture
+def store(parsedFolder):
+	return GradeStore.fromAssignments(parsedFolder.getAssignments(), parsedFolder.getMarkers())
@@ -0,0 +1,73 @@
+import pytest
+
+from a3_analysis import Assignment, AssignmentParser, AssignmentAnalyser
+
+
+def test_store_is_kept_until_its_assignments_change(parsedFolder, analyser):
+	store = analyser.getStore()
+	assert analyser.getStore() is store
+
+	assignment = parsedFolder.getAssignments()[0]
+	assignment.setOverallGrade(0.0, 0.0, 0.0)
+	rebuilt = analyser.getStore()
+	assert rebuilt is not store
+	assert rebuilt.total[rebuilt.rowIndex[id(assignment)]] == 0.0
+
+
+def test_other_assignments_do_not_invalidate_the_store(analyser, parseFolder):
+	other = parseFolder()
+	otherAnalyser = AssignmentAnalyser.fromParser(other)
+	store = analyser.getStore()
+
+	Assignment('s9999999').setOverallGrade(1.0, 1.0, 1.0)
+	other.getAssignments()[0].setOverallGrade(0.0, 0.0, 0.0)
+	assert analyser.getStore() is store
+
+
+def test_untracked_assignments_are_followed(markedFolder):
+	parser = AssignmentParser()
+	assignments = list(parser.iterAssignments(markedFolder))
+	markers = list(dict.fromkeys(assignment.getMarker() for assignment in assignments))
+	for assignment in assignments:
+		assignment.getMarker().addAssignment(assignment)
+	analyser = AssignmentAnalyser(assignments, markers)
+	store = analyser.getStore()
+	assignments[0].setComments([(0, 'Changed')])
+	assert analyser.getStore() is not store
+
+
+def test_marker_statistics_are_cached_by_name(analyser):
+	computed = []
+	gradeStatistics = analyser.gradeStatistics
+	analyser.gradeStatistics = lambda grades: computed.append(grades) or gradeStatistics(grades)
+	for i in range(3):
+		# A new string each time, as the REPL splits it from the command
+		analyser.poolStatistics(''.join(['marker', '00']))
+	assert len(computed) == 1
+
+
+def test_marker_without_valid_assignments_is_displayed(parsedFolder, analyser):
+	for assignment in parsedFolder.getMarkerIndex()['marker01'].markedAssignments:
+		assignment.setOverallGrade(-1.0, 0.0, 0.0)
+	display = analyser.markerStatDisplay('marker01')
+	assert 'No assignments without marking errors' in display
+	assert 'Min/Mean/Max' not in display
+
+
+def test_marker_statistics_match_each_pool(parsedFolder, analyser):
+	for assignment in parsedFolder.getMarkerIndex()['marker02'].markedAssignments:
+		assignment.setOverallGrade(-1.0, 0.0, 0.0)
+	store = analyser.getStore()
+	statistics = store.markerStatistics()
+	assert list(statistics) == store.markerNames
+
+	for name, (marked, errors, *grades) in statistics.items():
+		rows = store.markerRows(name)
+		assert marked == len(rows)
+		assert errors == int((~store.valid[rows]).sum())
+		if name == 'marker02':
+			assert errors == marked and grades == [None] * 8
+			continue
+		expected = list(analyser.poolStatistics(name))
+		expected += [analyser.poolStatistics(name, component)[1] for component in ('testing', 'usability', 'quality')]
+		assert grades == pytest.approx(expected)
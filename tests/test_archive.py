@@ -0,0 +1,90 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+import archive
+from a3_analysis import RUBRIC
+from benchmarks.generate import generateTree
+
+
+def test_ingest_round_trip(markedFolder, store, tmp_path):
+	root = str(tmp_path / 'archive')
+	archive.Archive(root).ingest('2016S2', 'a3', markedFolder, useCache=False)
+
+	# Read back through a fresh index
+	partitions = archive.Archive(root).partitions()
+	assert [(partition.offering, partition.assignment, partition.rows) for partition in partitions] == \
+		[('2016S2', 'a3', 30)]
+	partition = partitions[0]
+	assert partition.markerNames == store.markerNames
+	assert partition.rubric.toJson() == RUBRIC.toJson()
+	data = partition.read(['studentNumbers', 'markerCodes', 'valid', 'testing', 'usability', 'quality',
+		'testingParts', 'qualityParts'])
+	for name in data:
+		assert np.array_equal(data[name], getattr(store, name)), name
+
+	grades, markerCodes, valid = partition.grades('total')
+	assert np.array_equal(grades, store.total)
+
+
+def test_ingest_replaces_partition(markedFolder, tmp_path):
+	root = str(tmp_path / 'archive')
+	scriptFolder = generateTree(str(tmp_path / 'script' / 'marked'), 12, markers=2, format='script')
+	archive.Archive(root).ingest('2016S2', 'a3', markedFolder, useCache=False)
+	archive.Archive(root).ingest('2016S2', 'a1', scriptFolder, format='script', useCache=False)
+	archive.Archive(root).ingest('2016S2', 'a1', scriptFolder, format='script', useCache=False)
+
+	loaded = archive.Archive(root)
+	assert [(partition.assignment, partition.rows) for partition in loaded.partitions()] == [('a1', 12), ('a3', 30)]
+	assert loaded.components() == ['testing', 'usability', 'quality', 'total']
+	assert [partition.assignment for partition in loaded.partitions(component='usability')] == ['a3']
+
+
+def test_unknown_component(markedFolder, tmp_path):
+	loaded = archive.Archive(str(tmp_path / 'archive'))
+	loaded.ingest('2016S2', 'a3', markedFolder, useCache=False)
+	with pytest.raises(ValueError, match='Unknown component'):
+		loaded.markerDrift('qualty')
+	with pytest.raises(ValueError, match='Unknown component'):
+		loaded.distributionShift('Total')
+	assert loaded.markerDrift('quality')
+
+
+def makeLegacy(root: str, partition):
+	# As written before comments were kept: no comment columns, version 1 index
+	with np.load(partition.path, allow_pickle=False) as data:
+		columns = {name: data[name] for name in data.files if not name.startswith('comment')}
+	with open(partition.path, 'wb') as file:
+		np.savez(file, **columns)
+	index = os.path.join(root, archive.INDEX_NAME)
+	with open(index) as file:
+		entries = json.load(file)['partitions']
+	with open(index, 'w') as file:
+		json.dump({'version': 1, 'partitions': entries}, file)
+
+
+def test_search_skips_partitions_without_comments(markedFolder, tmp_path):
+	root = str(tmp_path / 'archive')
+	makeLegacy(root, archive.Archive(root).ingest('2016S1', 'a3', markedFolder, useCache=False))
+	loaded = archive.Archive(root)
+	loaded.ingest('2016S2', 'a3', markedFolder, useCache=False)
+
+	count, matches, markerCounts, unsearched = loaded.searchComments('magic numbers')
+	assert count > 0
+	assert {partition.offering for partition, *match in matches} == {'2016S2'}
+	assert [(partition.offering, partition.assignment) for partition in unsearched] == [('2016S1', 'a3')]
+	assert 'ingest them again' in archive.searchDisplay('magic numbers', count, matches, markerCounts, unsearched)
+
+	# Saved with the current version once ingested into
+	with open(os.path.join(root, archive.INDEX_NAME)) as file:
+		assert json.load(file)['version'] == archive.ARCHIVE_VERSION
+
+
+def test_unknown_version(tmp_path):
+	root = tmp_path / 'archive'
+	root.mkdir()
+	(root / archive.INDEX_NAME).write_text(json.dumps({'version': 99, 'partitions': []}))
+	with pytest.raises(ValueError, match='version 99'):
+		archive.Archive(str(root))
@@ -0,0 +1,65 @@
+import os
+import threading
+
+import async_scanner
+from a3_analysis import AssignmentParser
+
+
+def records(parser: AssignmentParser):
+	return [(assignment.getMarker().getName(), assignment.getRecord()) for assignment in parser.getAssignments()]
+
+
+def countingOpener(opener):
+	# Opener recording the most reads in flight at once
+	lock = threading.Lock()
+	state = {'inFlight': 0, 'most': 0, 'reads': 0}
+
+	def open(filename: str):
+		with lock:
+			state['inFlight'] += 1
+			state['reads'] += 1
+			state['most'] = max(state['most'], state['inFlight'])
+		try:
+			return opener(filename)
+		finally:
+			with lock:
+				state['inFlight'] -= 1
+	return open, state
+
+
+def test_scan_matches_sequential_parse(markedFolder, parsedFolder):
+	expected = parsedFolder
+	parser = AssignmentParser()
+	opener, state = countingOpener(async_scanner.latencyOpener(0.02))
+	files = async_scanner.scanDirectory(parser, markedFolder, concurrency=4, opener=opener)
+
+	# Attached in os.walk order whatever order the reads finished in
+	assert files == list(expected.getFileIndex())
+	assert len(files) == state['reads'] == 30
+	assert records(parser) == records(expected)
+	assert [marker.getName() for marker in parser.getMarkers()] == \
+		[marker.getName() for marker in expected.getMarkers()]
+
+
+def test_linked_directories_are_not_followed(markedFolder, parseFolder):
+	os.symlink(os.path.join(markedFolder, 'marker00'), os.path.join(markedFolder, 'marker01', 'linked'))
+	expected = parseFolder()
+	parser = AssignmentParser()
+	files = async_scanner.scanDirectory(parser, markedFolder, concurrency=4)
+	assert files == list(expected.getFileIndex())
+	assert len(files) == 30
+
+
+def test_reads_in_flight_are_bounded(markedFolder):
+	opener, state = countingOpener(async_scanner.latencyOpener(0.02))
+	async_scanner.scanDirectory(AssignmentParser(), markedFolder, concurrency=3, opener=opener)
+	# Latency keeps the pool saturated, but never over the bound
+	assert state['most'] == 3
+
+
+def test_serial_scan_with_latency(markedFolder):
+	opener, state = countingOpener(async_scanner.latencyOpener(0.001))
+	parser = AssignmentParser()
+	async_scanner.scanDirectory(parser, markedFolder, concurrency=1, opener=opener)
+	assert state['most'] == 1
+	assert len(parser.getAssignments()) == 30
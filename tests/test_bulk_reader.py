@@ -0,0 +1,59 @@
+import types
+
+import bulk_reader
+from bulk_reader import MarkedFileReader
+
+HEADER = 'Testing: 4\nScenario 1 [0,1]: 1\nThe Code Quality Mark is given below\nQuality: 3\n'
+TEXT = HEADER + '   Code Quality Mark\nQuality: 6\n' + 'Code listing\n' * 50
+
+
+def write(tmp_path, text: str, name: str = 's0000000.txt'):
+	path = tmp_path / name
+	path.write_bytes(text.encode('utf8'))
+	return str(path)
+
+
+def test_header_ends_at_the_stop_line(tmp_path):
+	# The stop prefix only ends the header at the start of a line, after any whitespace
+	reader = MarkedFileReader()
+	assert reader.readHeader(write(tmp_path, TEXT)) == HEADER
+	assert reader.lastSize == len(TEXT)
+	assert reader.decodeHeader(TEXT.encode('utf8')) == HEADER
+
+
+def test_without_a_stop_line(tmp_path):
+	reader = MarkedFileReader('Not There')
+	assert reader.readHeader(write(tmp_path, TEXT)) == TEXT
+	assert reader.readHeader(write(tmp_path, '')) == ''
+
+
+def test_buffer_grows_and_is_reused(tmp_path):
+	reader = MarkedFileReader(bufferSize=16)
+	assert reader.readHeader(write(tmp_path, TEXT)) == HEADER
+	assert len(reader.buffer) > len(TEXT)
+	buffer = reader.buffer
+	shorter = 'Testing: 1\nCode Quality Mark\n'
+	assert reader.readHeader(write(tmp_path, shorter, 's0000001.txt')) == 'Testing: 1\n'
+	assert reader.buffer is buffer
+
+
+def test_buffer_grows_past_the_first_read(tmp_path, monkeypatch):
+	# A file which grew after fstat fills the buffer, which is doubled until it fits
+	monkeypatch.setattr(bulk_reader.os, 'fstat', lambda fd: types.SimpleNamespace(st_size=4))
+	reader = MarkedFileReader(bufferSize=16)
+	assert reader.readHeader(write(tmp_path, TEXT)) == HEADER
+	assert len(reader.buffer) >= len(TEXT)
+
+
+def test_large_files_are_memory_mapped(tmp_path):
+	reader = MarkedFileReader(bufferSize=16, mmapThreshold=64)
+	assert reader.readHeader(write(tmp_path, TEXT)) == HEADER
+	# Read from the map, not into the buffer
+	assert len(reader.buffer) == 16
+	assert reader.readHeader(write(tmp_path, 'Testing: 1\n' * 10, 's0000001.txt')) == 'Testing: 1\n' * 10
+
+
+def test_multibyte_text(tmp_path):
+	text = 'Testing: 4\nNice naming – très bien\nCode Quality Mark\n'
+	assert MarkedFileReader(bufferSize=8).readHeader(write(tmp_path, text)) == \
+		'Testing: 4\nNice naming – très bien\n'
@@ -0,0 +1,68 @@
+from comment_index import CommentIndex, commentTable, commentsFromTable, matchingTextCodes
+
+
+def indexed():
+	index = CommentIndex()
+	index.add('a', 's0000001', 'alice', [('Quality', 'Avoid magic numbers'), ('Testing', 'Good tests')])
+	index.add('b', 's0000002', 'bob', [('Quality', 'Avoid magic numbers'), ('Quality', 'Magic strings too')])
+	index.add('c', 's0000003', 'alice', [('Usability', 'Clear layout')])
+	return index
+
+
+def test_search_matches_every_term():
+	index = indexed()
+	assert index.search('magic numbers') == [
+		('s0000001', 'alice', 'Quality', ['Avoid magic numbers']),
+		('s0000002', 'bob', 'Quality', ['Avoid magic numbers'])]
+	assert index.search('MAGIC') == [
+		('s0000001', 'alice', 'Quality', ['Avoid magic numbers']),
+		('s0000002', 'bob', 'Quality', ['Avoid magic numbers', 'Magic strings too'])]
+	assert index.search('magic layout') == []
+	assert index.search('magic', limit=1) == [('s0000001', 'alice', 'Quality', ['Avoid magic numbers'])]
+	assert index.markerTermFrequencies('magic') == {'magic': {'alice': (1, 1), 'bob': (2, 1)}}
+
+
+def test_remove_drops_unused_terms():
+	index = indexed()
+	index.remove('a')
+	assert len(index) == 2
+	assert 'good' not in index.termTexts and 'Good tests' not in index.textPostings
+	assert index.search('magic numbers') == [('s0000002', 'bob', 'Quality', ['Avoid magic numbers'])]
+	index.remove('b')
+	assert 'magic' not in index.termTexts
+	assert index.search('magic') == []
+	assert index.markerDocuments['alice'] == 1
+
+
+def test_adding_again_reindexes():
+	index = indexed()
+	index.add('b', 's0000002', 'bob', [('Testing', 'Missing tests')])
+	assert len(index) == 3
+	assert index.search('magic') == [('s0000001', 'alice', 'Quality', ['Avoid magic numbers'])]
+	assert index.search('tests') == [('s0000001', 'alice', 'Testing', ['Good tests']),
+		('s0000002', 'bob', 'Testing', ['Missing tests'])]
+	assert 'strings' not in index.termTexts
+	assert index.markerDocuments['bob'] == 1
+
+
+def test_matches_analyser_index_after_changes(parsedFolder, analyser):
+	index = analyser.getCommentIndex()
+	assignment = parsedFolder.getAssignments()[0]
+	assignment.setComments([(0, 'Entirely new feedback')])
+	analyser.applyChanges(changed=[assignment])
+	assert analyser.getCommentIndex() is index
+	fresh = CommentIndex()
+	for a in parsedFolder.getAssignments():
+		fresh.add(a, a.getStudentNumber(), a.getMarker().getName(), a.getComments())
+	for query in ('entirely new', 'magic numbers', 'test'):
+		assert index.search(query) == fresh.search(query)
+	assert index.termTexts == fresh.termTexts
+
+
+def test_comment_table_round_trip():
+	rowComments = [[(0, 'Avoid magic numbers'), (1, 'Good tests')], [], [(0, 'Avoid magic numbers')]]
+	table = commentTable(rowComments)
+	assert len(table[3]) == 2
+	assert commentsFromTable(3, *table) == rowComments
+	assert matchingTextCodes(table[3], 'magic').tolist() == [0]
+	assert len(matchingTextCodes(table[3], '')) == 0
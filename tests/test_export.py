@@ -0,0 +1,92 @@
+import struct
+
+import numpy as np
+import pytest
+
+import export
+from a3_analysis import AssignmentParser
+
+
+def concatenated(chunks):
+	# Marker names and every column of the chunks joined together
+	markerNames, columns = None, dict()
+	for markerNames, chunk in chunks:
+		for name, column in chunk.items():
+			columns.setdefault(name, []).append(column)
+	return markerNames, {name: np.concatenate(parts) for name, parts in columns.items()}
+
+
+def assertSameColumns(expected: dict, actual: dict):
+	assert list(actual) == list(expected)
+	for name in expected:
+		assert np.array_equal(actual[name], expected[name]), name
+
+
+def test_store_and_stream_give_the_same_columns(markedFolder, store):
+	storeNames, fromStore = concatenated(export.storeChunks(store, 7))
+	streamNames, fromStream = concatenated(export.assignmentChunks(
+		AssignmentParser().iterAssignments(markedFolder), 7))
+	assert streamNames == storeNames
+	assertSameColumns(fromStore, fromStream)
+	assert 'error_testing_sum' in fromStore and not fromStore['valid'].all()
+
+
+def test_column_file_round_trip(store, tmp_path):
+	path = str(tmp_path / 'grades.cols')
+	assert export.exportChunks(export.storeChunks(store, 8), columnsPath=path) == len(store)
+	markerNames, expected = concatenated(export.storeChunks(store, 8))
+
+	with export.ColumnReader(path) as reader:
+		assert len(reader) == len(store)
+		assert len(reader.chunks) == 4
+		assert reader.markerNames == markerNames
+		assert reader.columns == list(expected)
+		for name in expected:
+			assert np.array_equal(reader.readColumn(name), expected[name]), name
+		assert [len(chunk['total']) for chunk in reader.iterChunks(['total'])] == [8, 8, 8, 6]
+
+
+def test_csv_matches_column_file(store, tmp_path):
+	csvPath, columnsPath = str(tmp_path / 'grades.csv'), str(tmp_path / 'grades.cols')
+	export.exportChunks(export.storeChunks(store, 8), csvPath, columnsPath)
+	with open(csvPath, 'r', encoding='utf8') as file:
+		header, *rows = [line.rstrip('\n').split(',') for line in file]
+	with export.ColumnReader(columnsPath) as reader:
+		assert header == reader.columns
+		assert [row[header.index('marker')] for row in rows] == [reader.markerNames[code]
+			for code in reader.readColumn('marker')]
+		assert [float(row[header.index('total')]) for row in rows] == reader.readColumn('total').tolist()
+
+
+def writeColumns(path: str, store):
+	export.exportChunks(export.storeChunks(store, 8), columnsPath=path)
+	with open(path, 'rb') as file:
+		return file.read()
+
+
+def test_bad_magic(store, tmp_path):
+	path = tmp_path / 'grades.cols'
+	data = writeColumns(str(path), store)
+	path.write_bytes(b'NOTGRADE' + data[len(export.COLUMNS_MAGIC):])
+	with pytest.raises(ValueError, match='not a grade column file'):
+		export.ColumnReader(str(path))
+
+
+def test_truncated_footer(store, tmp_path):
+	path = tmp_path / 'grades.cols'
+	data = writeColumns(str(path), store)
+	path.write_bytes(data[:-4])
+	with pytest.raises(ValueError, match='incomplete'):
+		export.ColumnReader(str(path))
+
+
+def test_version_mismatch(store, tmp_path):
+	path = tmp_path / 'grades.cols'
+	data = writeColumns(str(path), store)
+	length = struct.unpack('<Q', data[-8 - len(export.COLUMNS_MAGIC):-len(export.COLUMNS_MAGIC)])[0]
+	footerStart = len(data) - 8 - len(export.COLUMNS_MAGIC) - length
+	footer = data[footerStart:footerStart + length].replace(
+		'"version": {0}'.format(export.COLUMNS_VERSION).encode(), b'"version": 9')
+	path.write_bytes(data[:footerStart] + footer + data[footerStart + length:])
+	with pytest.raises(ValueError, match='has version 9'):
+		export.ColumnReader(str(path))
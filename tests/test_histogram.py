@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from histogram import GradeHistograms, StreamingHistogram, halfMarkBins
+
+
+def test_grade_histograms_count_half_marks():
+	histograms = GradeHistograms({'testing': [0, 0.5, 0.5, 6, 2.25, -1, 7], 'usability': [3, 3, 1.5, 0, 0, 0, 0.5]},
+		{'testing': 6, 'usability': 3})
+	# Off bin and out of range values are ignored
+	assert histograms.getCounts('testing').tolist() == [1, 2] + [0] * 10 + [1]
+	assert histograms.getCounts('usability').tolist() == [3, 1, 0, 1, 0, 0, 2]
+	bins, counts = histograms.getHistogram('usability')
+	assert bins.tolist() == [0, 0.5, 1, 1.5, 2, 2.5, 3]
+
+
+def test_grade_histograms_match_streaming():
+	rng = np.random.default_rng(6)
+	grades = rng.integers(0, 13, 500) / 2
+	histograms = GradeHistograms({'quality': grades}, {'quality': 6})
+	streaming = StreamingHistogram(6)
+	for grade in grades:
+		streaming.add(grade)
+	assert histograms.getCounts('quality').tolist() == streaming.getCounts().tolist()
+	assert np.array_equal(histograms.getBins('quality'), halfMarkBins(6))
+
+
+def test_empty_columns():
+	histograms = GradeHistograms({'total': []}, {'total': 15})
+	assert histograms.getCounts('total').tolist() == [0] * 31
+	assert GradeHistograms({}, {}).names == []
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 10, 101])
+def test_streaming_median_matches_numpy(count):
+	rng = np.random.default_rng(count)
+	grades = rng.integers(0, 21, count) / 2
+	histogram = StreamingHistogram(10)
+	for grade in grades:
+		histogram.add(grade)
+	assert histogram.median() == np.median(grades)
+
+
+def test_streaming_merge_and_empty_median():
+	first, second = StreamingHistogram(5), StreamingHistogram(5)
+	first.add(1)
+	second.add(4)
+	second.add(4.5)
+	first.merge(second)
+	assert first.getCounts().sum() == 3
+	assert first.median() == 4
+	with pytest.raises(ValueError):
+		StreamingHistogram(5).median()
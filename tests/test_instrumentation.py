@@ -0,0 +1,24 @@
+import pytest
+
+from instrumentation import timings
+
+
+@pytest.fixture
+def profiled():
+	timings.reset()
+	timings.enable()
+	yield timings
+	timings.enable(False)
+	timings.reset()
+
+
+def test_worker_counters_are_merged(parseFolder, profiled):
+	parseFolder()
+	serial = dict(profiled.counters)
+	assert serial['files scanned'] == 30 and serial['lines read'] > 0
+
+	profiled.reset()
+	parseFolder(workers=2)
+	assert profiled.counters == serial
+	assert profiled.calls['parse'] == 30
+	assert 'read and parse (worker processes)' in profiled.seconds
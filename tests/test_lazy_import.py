@@ -0,0 +1,20 @@
+import os
+import sys
+import subprocess
+
+import numpy
+
+from lazy_import import lazyImport
+
+
+def test_attributes_are_the_modules():
+	np = lazyImport('numpy')
+	assert np.load is numpy.load
+	assert np.array([1, 2]).sum() == 3
+
+
+def test_script_import_does_not_load_numpy_or_matplotlib():
+	code = 'import sys, assignment_script; print(sorted({"numpy", "matplotlib"} & set(sys.modules)))'
+	result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+		check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	assert result.stdout.strip() == '[]'
@@ -0,0 +1,52 @@
+import pytest
+
+from line_classifier import LineClassifier, parseGrade, STOP
+from a3_analysis import RUBRIC
+
+PREFIXES = ['Testing:', 'i. ', 'ii. ', 'iii. ', 'Scenario 1 [0,1]', 'Scenario 10 [0,1]']
+
+
+@pytest.mark.parametrize('line, slot', [
+	('Testing: 4', 0),
+	('i. Naming [0,1]: 1', 1),
+	('ii. Comments [0,1]: 0.5', 2),
+	# The longest prefix wins, not the first given
+	('iii. Layout [0,1]: 1', 3),
+	('Scenario 1 [0,1]: 1', 4),
+	('Scenario 10 [0,1]: 0', 5),
+	('Code Quality Mark', STOP),
+	('Code Quality Mark: 5', STOP),
+	('Good testing', None),
+	('', None),
+	# Only prefixes are matched
+	('  Testing: 4', None),
+	('Overall Testing: 4', None),
+	('iv. Other [0,1]: 1', None),
+])
+def test_classify(line, slot):
+	assert LineClassifier(PREFIXES, 'Code Quality Mark').classify(line) == slot
+
+
+def test_without_stop_prefix():
+	assert LineClassifier(PREFIXES).classify('Code Quality Mark') is None
+
+
+def test_rubric_lines_classify_to_their_slots():
+	classifier = RUBRIC.getClassifier()
+	for slot, line in enumerate(RUBRIC.lines):
+		assert classifier.classify(line + ' 1') == slot
+
+
+@pytest.mark.parametrize('line, grade', [
+	('Testing: 4', 4.0),
+	('Usability: 1.5', 1.5),
+	('Scenario 1 [0,1]: 0.5 ', 0.5),
+	('vi. Scale [0,1]:1', 1.0),
+	# Malformed or missing grades
+	('Testing: ', -1.0),
+	('Testing: four', -1.0),
+	('Testing: 4/6', -1.0),
+	('Testing 4', -1.0),
+])
+def test_parse_grade(line, grade):
+	assert parseGrade(line) == grade
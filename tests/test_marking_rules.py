@@ -0,0 +1,18 @@
+import numpy as np
+
+from a3_analysis import MARKING_RULES
+from marking_rules import ErrorLog
+
+
+def test_error_log_over_chunks_matches_one_table(store):
+	columns = store.getColumns()
+
+	errors = ErrorLog()
+	for start in range(0, len(store), 7):
+		rows = np.arange(start, min(start + 7, len(store)))
+		errors.add(MARKING_RULES.evaluate({name: column[rows] for name, column in columns.items()},
+			store.markerCodes[rows]), store.studentNumbers[rows])
+
+	assert len(errors) == len(store.errors) > 0
+	assert errors.ruleCounts == store.errors.ruleCounts()
+	assert errors.display(store.markerNames) == store.errors.display(store.studentNumbers, store.markerNames)
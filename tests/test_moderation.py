@@ -0,0 +1,32 @@
+import numpy as np
+
+import moderation
+
+
+def test_holm_known_values():
+	# As given by R's p.adjust(p, 'holm')
+	assert np.allclose(moderation.holm(np.array([0.01, 0.04, 0.03, 0.005])), [0.03, 0.06, 0.06, 0.02])
+	assert np.allclose(moderation.holm(np.array([0.01, 0.04, 0.03, 0.5])), [0.04, 0.09, 0.09, 0.5])
+	assert np.allclose(moderation.holm(np.array([0.3, 0.2, 0.6])), [0.6, 0.6, 0.6])
+
+
+def test_holm_keeps_shape_and_caps_at_one():
+	pValues = np.array([[0.5, 0.01], [0.9, 0.02]])
+	adjusted = moderation.holm(pValues)
+	assert adjusted.shape == (2, 2)
+	assert np.allclose(adjusted, [[1.0, 0.04], [1.0, 0.06]])
+	assert (adjusted >= pValues).all()
+
+
+def test_marker_bias_finds_a_generous_marker(store):
+	generous = store.markerCodes == store.markerNames.index('marker02')
+	store.usability[generous] = 3.0
+	store.refresh()
+
+	grouped = moderation.GroupedGrades(store)
+	bias = moderation.markerBias(grouped, resamples=500, seed=1)
+	count, deviation, effect, p, adjusted, lower, upper = bias['marker02']['usability']
+	assert count == int(np.count_nonzero(generous & store.valid))
+	assert deviation > 0 and lower > 0
+	assert adjusted < 0.05 <= bias['marker00']['testing'][4]
+	assert moderation.markerBias(grouped, resamples=500, seed=1) == bias
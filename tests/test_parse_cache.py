@@ -0,0 +1,75 @@
+import os
+import pickle
+
+from a3_analysis import AssignmentParser, CACHE_NAME, CACHE_VERSION
+from parse_cache import ParseCache
+
+
+def parseWithCache(dir: str, version: int = CACHE_VERSION):
+	cache = ParseCache.forDirectory(dir, CACHE_NAME, version)
+	parser = AssignmentParser()
+	parser.parseDirectoryStructure(dir, cache=cache)
+	return {assignment.getStudentNumber(): assignment.getRecord() for assignment in parser.getAssignments()}, cache
+
+
+def rewrite(filename: str, old: str, new: str):
+	with open(filename, 'r', encoding='utf8') as file:
+		text = file.read()
+	stat = os.stat(filename)
+	with open(filename, 'w', encoding='utf8') as file:
+		file.write(text.replace(old, new, 1))
+	os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_cached_records_match_a_fresh_parse(markedFolder):
+	fresh, cache = parseWithCache(markedFolder)
+	assert os.path.exists(cache.path)
+	cached, cache = parseWithCache(markedFolder)
+	assert cached == fresh
+	assert len(cache.entries) == 30
+
+
+def test_changed_file_is_parsed_again(markedFolder, parseFolder):
+	parseWithCache(markedFolder)
+	filename = os.path.join(markedFolder, 'marker00', 'group0000', 's0000000.txt')
+	# Same size as before, so only the mtime tells the cache the file changed
+	rewrite(filename, 'Usability: ', 'Usability: 9')
+	rewrite(filename, '\n\nCode Quality Mark', '\nCode Quality Mark')
+
+	records, cache = parseWithCache(markedFolder)
+	assert records['s0000000'][2] >= 9
+	assert records == {assignment.getStudentNumber(): assignment.getRecord()
+		for assignment in parseFolder().getAssignments()}
+
+
+def test_removed_files_are_pruned(markedFolder):
+	parseWithCache(markedFolder)
+	filename = os.path.join(markedFolder, 'marker01', 'group0000', 's0000001.txt').replace('\\', '/')
+	os.remove(filename)
+	records, cache = parseWithCache(markedFolder)
+	assert 's0000001' not in records
+	assert filename not in ParseCache.forDirectory(markedFolder, CACHE_NAME, CACHE_VERSION).entries
+
+
+def test_other_version_is_ignored(markedFolder):
+	parseWithCache(markedFolder)
+	cache = ParseCache.forDirectory(markedFolder, CACHE_NAME, CACHE_VERSION + 1)
+	assert cache.entries == dict()
+
+
+class Payload:
+	def __reduce__(self):
+		return (os.mkdir, (self.path,))
+
+
+def test_pickled_cache_is_not_run(markedFolder, tmp_path):
+	# A cache written by anyone else with write access to the share
+	payload = Payload()
+	payload.path = str(tmp_path / 'ran')
+	path = ParseCache.pathForDirectory(markedFolder, CACHE_NAME)
+	with open(path, 'wb') as file:
+		pickle.dump((CACHE_VERSION, payload), file)
+
+	cache = ParseCache.forDirectory(markedFolder, CACHE_NAME, CACHE_VERSION)
+	assert cache.entries == dict()
+	assert not os.path.exists(payload.path)
@@ -0,0 +1,25 @@
+from a3_analysis import CACHE_NAME, CACHE_VERSION
+from parse_cache import ParseCache
+
+
+def parsed(parser):
+	return ([(filename, assignment.getMarker().getName(), assignment.getRecord())
+			for filename, assignment in parser.getFileIndex().items()],
+		[marker.getName() for marker in parser.getMarkers()],
+		[assignment.getStudentNumber() for assignment in parser.getDuplicates()])
+
+
+def test_parallel_parse_matches_serial(parsedFolder, parseFolder):
+	expected = parsed(parsedFolder)
+	assert len(expected[0]) == 30
+	for workers in (2, 3):
+		assert parsed(parseFolder(workers=workers)) == expected
+
+
+def test_parallel_parse_with_cache(markedFolder, parsedFolder, parseFolder):
+	expected = parsed(parsedFolder)
+	cache = ParseCache.forDirectory(markedFolder, CACHE_NAME, CACHE_VERSION)
+	assert parsed(parseFolder(workers=2, cache=cache)) == expected
+	assert len(cache.entries) == 30
+	cache = ParseCache.forDirectory(markedFolder, CACHE_NAME, CACHE_VERSION)
+	assert parsed(parseFolder(workers=2, cache=cache)) == expected
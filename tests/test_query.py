@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import query
+
+
+@pytest.mark.parametrize('text, message', [
+	('select quality < 2', "Expected 'select where <condition>'"),
+	('select where', None),
+	('select where quality <', 'Expected a value after quality <'),
+	('select where quality 2', 'Expected op but found 2.0'),
+	('select where (quality < 2', 'Expected \\) but found end of query'),
+	('select where quality < 2)', "Unexpected '\\)' in query"),
+	('select where quality < 2 and', 'Expected word but found end of query'),
+	('select where quality < 2 $', "Unexpected '\\$' in query"),
+	('select where quality < "two"', 'quality is compared with a number'),
+	('select where grade < 2', "Unknown field 'grade', expected one of: testing, usability"),
+	('select where marker > alice', 'marker can only be compared with = or !='),
+	('select where valid = maybe', 'valid is true or false'),
+	('select where not', 'Expected word but found end of query'),
+])
+def test_parse_errors(text, message):
+	if message is None:
+		# A bare 'select where' selects everything
+		assert query.compileQuery(text).condition is None
+		return
+	with pytest.raises(query.QueryError, match=message):
+		query.compileQuery(text)
+
+
+def test_query_error_is_a_value_error():
+	assert issubclass(query.QueryError, ValueError)
+
+
+def test_unknown_rule_is_reported_on_evaluation(store):
+	compiled = query.compileQuery('select where error = nope')
+	with pytest.raises(query.QueryError, match="Unknown marking rule 'nope', expected one of: missing part"):
+		compiled.rows(store)
+
+
+def test_conditions(store):
+	rows = lambda text: list(query.compileQuery(text).rows(store))
+	everything = list(range(len(store)))
+
+	assert rows('select where') == everything
+	assert rows('select where quality < 2') == list(np.flatnonzero(store.quality < 2))
+	assert rows('SELECT WHERE Quality >= 2 or quality < 2') == everything
+	assert rows('select where not (marker = marker00) and valid = true') == \
+		list(np.flatnonzero((store.markerCodes != store.markerNames.index('marker00')) & store.valid))
+	assert rows('select where marker = nobody') == []
+	assert rows("select where student = 's0000003'") == [int(store.studentRows('s0000003')[0])]
+	assert rows('select where scenario1 = 1 and vi >= 0.5') == \
+		list(np.flatnonzero((store.testingParts[:, 0] == 1) & (store.qualityParts[:, 5] >= 0.5)))
+	testingSum = [rule.name == 'testing sum' for rule in store.errors.rules]
+	assert rows("select where error = 'testing sum'") == \
+		list(np.flatnonzero(store.errors.failing[:, testingSum].any(axis=1)))
@@ -0,0 +1,103 @@
+import json
+from array import array
+
+import numpy as np
+import pytest
+
+import rubric
+import a3_analysis
+import assignment_script
+from rubric import Rubric
+
+# Rubric of an a3 partition as archives stored it before rubrics were schemas
+LEGACY_A3 = {'name': 'a3', 'components': {'testing': 6, 'usability': 3, 'quality': 6},
+	'parts': {'testingParts': {'names': ['Scenario {0}'.format(i) for i in range(1, 7)], 'caps': [1] * 6},
+		'qualityParts': {'names': ['i.', 'ii.', 'iii.', 'iv.', 'v.', 'vi.'], 'caps': [1] * 6}},
+	'sections': ['Testing', 'Scenario 1', 'Usability', 'Quality', 'i.']}
+
+
+def test_legacy_json():
+	loaded = Rubric.fromJson(json.loads(json.dumps(LEGACY_A3)))
+	assert loaded.name == 'a3'
+	assert loaded.components == {'testing': 6, 'usability': 3, 'quality': 6}
+	assert loaded.parts == a3_analysis.RUBRIC.parts
+	assert loaded.sections == LEGACY_A3['sections']
+	assert loaded.maxMark('total') == 15
+	assert loaded.hasComponent('usability') and not loaded.hasComponent('style')
+	assert loaded.partSlots == a3_analysis.RUBRIC.partSlots
+	# Without grade lines it describes grades but cannot parse them
+	assert not loaded.canParse()
+	with pytest.raises(ValueError, match='does not give the grade lines'):
+		loaded.parseLines([])
+	assert loaded.markingRules().names() == ['missing part', 'missing part', 'part range', 'part range']
+
+
+def test_legacy_json_without_sections():
+	data = dict(LEGACY_A3)
+	del data['sections']
+	assert Rubric.fromJson(data).sections == []
+
+
+def test_schema_json_round_trip():
+	for schema in (a3_analysis.RUBRIC, assignment_script.RUBRIC):
+		loaded = Rubric.fromJson(json.loads(json.dumps(schema.toJson())))
+		assert loaded.toJson() == json.loads(json.dumps(schema.toJson()))
+		assert loaded.sections == schema.sections
+		assert loaded.cacheVersion() == schema.cacheVersion()
+		assert loaded.markingRules().names() == schema.markingRules().names()
+
+
+def test_load_json_and_toml(tmp_path):
+	jsonPath = tmp_path / 'script.json'
+	jsonPath.write_text(json.dumps(assignment_script.RUBRIC.toJson()))
+	tomlPath = tmp_path / 'script.toml'
+	tomlPath.write_text('\n'.join([
+		'name = "script"', 'stop = "Code Quality Mark"', 'firstSection = "i"', 'checkMaxMarks = false',
+		'[[components]]', 'name = "testing"', 'line = "Testing:"', 'max = 5',
+		'[[components]]', 'name = "quality"', 'line = "Quality:"', 'max = 5',
+		'[[parts]]', 'column = "partGrades"', 'names = ["i", "ii", "iii", "iv", "v", "vi", "vii"]',
+		'lines = ["i. ", "ii. ", "iii. ", "iv. ", "v. ", "vi. ", "vii. "]', 'caps = [1, 1, 1, 1, 0.5, 0.5, 1]',
+		'aggregate = {formula = "roundedProduct", into = "quality", rule = "grade summation"}']))
+	for path in (jsonPath, tomlPath):
+		assert Rubric.load(str(path)).toJson() == assignment_script.RUBRIC.toJson()
+
+
+def test_parse_lines_fills_slots():
+	lines = ['Testing: 2', 'Scenario 1 [0,1]: 1', 'Scenario 2 [0,1]: 1', '  well tested',
+		'Usability: 1.5', 'Quality: 1', 'vi. Part [0,1]: 0.5', 'Code Quality Mark', 'Quality: 6']
+	grades, comments, read = a3_analysis.RUBRIC.parseLines(lines)
+	slots = a3_analysis.RUBRIC.componentSlots
+	assert [grades[slots[name]] for name in ('testing', 'usability', 'quality')] == [2.0, 1.5, 1.0]
+	assert grades[a3_analysis.TESTING_PART_SLOTS] == [1.0, 1.0] + [rubric.MISSING] * 4
+	assert grades[a3_analysis.QUALITY_PART_SLOTS] == [rubric.MISSING] * 5 + [0.5]
+	assert comments == [(a3_analysis.RUBRIC.sections.index('Scenario 2'), 'well tested')]
+	assert read == 8
+
+
+def test_scalar_formulas_match_marking_rules():
+	rng = np.random.default_rng(1)
+	parts = rng.choice([0, 0.5, 1], size=(200, 6))
+	for formula, overall in (('sum', parts.sum(axis=1)), ('roundedProduct', np.ceil(2 * parts[:, :5].sum(axis=1)
+			* parts[:, 5]) / 2)):
+		rule = rubric.AGGREGATE_RULES[formula]('check', 'parts', 'overall')
+		assert not rule.failing({'parts': parts, 'overall': overall}).any()
+		assert [rubric.aggregate(formula, array('d', row)) for row in parts] == list(overall)
+
+
+def test_scalar_validity_matches_marking_rules(parsedFolder):
+	assignments = parsedFolder.getAssignments()
+	# Out of range and missing parts, and overall grades over their maximum
+	assignments[0].setTestingPart(0, 2.0)
+	assignments[1].setQualityPart(5, rubric.MISSING)
+	assignments[2].setOverallGrade(7.0, 1.0, 1.0)
+	store = a3_analysis.GradeStore.fromAssignments(assignments, parsedFolder.getMarkers())
+	assert [a.isAssignmentValid() for a in assignments] == store.valid.tolist()
+	assert not store.valid.all()
+
+
+def test_file_names():
+	assert rubric.studentNumberForFile('marked/alice/group/s1234567.txt') == 's1234567'
+	assert not rubric.isAssignmentFile('notes.txt')
+	assert rubric.markerForFile('marked/alice/group/s1234567.txt') == 'alice'
+	with pytest.raises(ValueError, match='marker name'):
+		rubric.markerForFile('s1234567.txt')
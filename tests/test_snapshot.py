@@ -0,0 +1,37 @@
+import pytest
+
+import snapshot
+
+
+@pytest.fixture
+def loaded(analyser, tmp_path):
+	# The analyser written to a snapshot and loaded again
+	path = str(tmp_path / 'snapshot.npz')
+	snapshot.saveSnapshot(analyser, path)
+	return snapshot.loadSnapshot(path)
+
+
+def test_snapshot_statistics_match(analyser, loaded):
+	assert loaded.overallStatDisplay() == analyser.overallStatDisplay()
+	assert loaded.allMarkerStatDisplay() == analyser.allMarkerStatDisplay()
+	assert loaded.markingErrorDisplay() == analyser.markingErrorDisplay()
+
+
+def test_erroneous_assignments_of_a_snapshot(analyser, loaded):
+	expected = [assignment.getRecord() for assignment in analyser.getErroneousAssignments(None)]
+	assert expected
+	assert [assignment.getRecord() for assignment in loaded.getErroneousAssignments(None)] == expected
+
+
+def test_pools_of_a_snapshot(analyser, loaded):
+	pool = loaded.getMarker('marker01').markedAssignments
+	expectedPool = analyser.getMarker('marker01').markedAssignments
+	assert list(loaded.totalGrades(pool)) == list(analyser.totalGrades(expectedPool))
+	assert loaded.gradeTestQualityDict(pool) == analyser.gradeTestQualityDict(expectedPool)
+	assert [a.getRecord() for a in loaded.getErroneousAssignments(pool)] == \
+		[a.getRecord() for a in analyser.getErroneousAssignments(expectedPool)]
+
+
+def test_list_pool_before_materializing(analyser, loaded):
+	assert len(loaded.testingGrades([])) == 0
+	assert 'assignments' in loaded.__dict__
@@ -0,0 +1,19 @@
+from a3_analysis import Assignment, AssignmentParser, AssignmentAnalyser
+from streaming import AssignmentSummary
+
+
+def test_summary_matches_analyser(markedFolder, analyser):
+	summary = AssignmentSummary().addAll(AssignmentParser().iterAssignments(markedFolder))
+	assert summary.display().split() == analyser.overallStatDisplay().split()
+
+
+def test_no_valid_assignments():
+	# Parts never given, so every assignment has marking errors
+	assignments = [Assignment('s000000{0}'.format(i)) for i in range(3)]
+	summary = AssignmentSummary().addAll(assignments)
+	assert summary.count == summary.errors == 3
+	assert summary.display().endswith('No assignments without marking errors\n')
+	assert AssignmentSummary().display().endswith('No assignments without marking errors\n')
+
+	analyser = AssignmentAnalyser(assignments)
+	assert analyser.overallStatDisplay().endswith('No assignments without marking errors\n')
@@ -0,0 +1,73 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+import watcher
+from a3_analysis import AssignmentAnalyser
+from benchmarks.synthetic import a3FileText
+
+COLUMNS = ('studentNumbers', 'markerCodes', 'testing', 'usability', 'quality', 'testingParts', 'qualityParts',
+	'valid', 'total')
+
+
+def write(filename: str, rng: random.Random):
+	old = os.stat(filename).st_mtime_ns if os.path.exists(filename) else 0
+	os.makedirs(os.path.dirname(filename), exist_ok=True)
+	with open(filename, 'w', encoding='utf8') as file:
+		file.write(a3FileText(os.path.basename(filename)[:-4], rng, 0.5))
+	# A change within the filesystem's timestamp resolution would go unseen
+	os.utime(filename, ns=(old + 10 ** 9, old + 10 ** 9))
+
+
+def storeRows(analyser: AssignmentAnalyser):
+	# Rows of the store by student and marker, as their order differs
+	store = analyser.getStore()
+	rows = sorted(range(len(store)), key=lambda row: (store.studentNumbers[row],
+		store.markerNames[store.markerCodes[row]]))
+	return {name: getattr(store, name)[rows] for name in COLUMNS if name != 'markerCodes'}, \
+		[store.markerNames[store.markerCodes[row]] for row in rows]
+
+
+@pytest.mark.parametrize('useInotify', [False, True])
+def test_apply_matches_fresh_parse(markedFolder, parseFolder, useInotify):
+	if useInotify and watcher.inotify_simple is None:
+		pytest.skip('inotify_simple is not installed')
+	parser = parseFolder()
+	analyser = AssignmentAnalyser.fromParser(parser)
+	analyser.getStore()
+	analyser.getCommentIndex()
+	folderWatcher = watcher.createWatcher(parser, markedFolder, useInotify)
+
+	rng = random.Random(5)
+	files = sorted(parser.getFileIndex())
+	for filename in rng.sample(files, 6):
+		write(filename, rng)
+	for filename in rng.sample(files, 3):
+		os.remove(filename)
+	for i in range(3):
+		write(os.path.join(markedFolder, 'newmarker', 'group0000', 's90000{0:02d}.txt'.format(i)), rng)
+	# Second marking of a student already in the folder
+	write(os.path.join(markedFolder, 'marker01', 'group0000', 's0000000.txt'), rng)
+
+	added, changed, removed = folderWatcher.apply(*folderWatcher.poll(0.1))
+	analyser.applyChanges(added, changed, removed)
+	assert (len(added), len(removed)) == (4, 3)
+	assert folderWatcher.poll(0.1) == ([], [], [])
+
+	freshParser = parseFolder()
+	fresh = AssignmentAnalyser.fromParser(freshParser)
+	assert analyser.overallStatDisplay() == fresh.overallStatDisplay()
+	assert sorted(analyser.markingErrorDisplay().splitlines()) == sorted(fresh.markingErrorDisplay().splitlines())
+	columns, markers = storeRows(analyser)
+	freshColumns, freshMarkers = storeRows(fresh)
+	assert markers == freshMarkers
+	for name in columns:
+		assert np.array_equal(columns[name], freshColumns[name]), name
+	assert sorted(parser.getStudentIndex()) == sorted(freshParser.getStudentIndex())
+	assert len(parser.getDuplicates()) == len(freshParser.getDuplicates()) == 1
+
+	search = lambda index: sorted((row[0], row[1], row[2], tuple(row[3])) for row in index.search('magic numbers'))
+	assert search(analyser.getCommentIndex()) == search(fresh.getCommentIndex())
+	folderWatcher.close()
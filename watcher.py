@@ -0,0 +1,187 @@
+import os
+import time
+
+from a3_analysis import ST_NUM, AssignmentParser, AssignmentAnalyser
+
+try:
+	import inotify_simple
+except ImportError:
+	inotify_simple = None
+
+
+def statKey(stat: os.stat_result):
+	return stat.st_mtime_ns, stat.st_size
+
+
+class DirectoryWatcher:
+	# Keeps a parser in step with a marked folder which is still being
+	# written to. Each poll stats the files already parsed, and lists again
+	# only the directories whose mtime changed, which is where files can have
+	# been added or removed. Only added and changed files are parsed.
+
+	def __init__(self, parser: AssignmentParser, dir: str):
+		self.parser = parser
+		self.dir = dir
+		self.files = dict()
+		self.directories = dict()
+		# Files which could not be parsed, e.g. while being written, are tried again
+		self.retry = set()
+		self.addDirectory(dir, self.files)
+		for filename in parser.getFileIndex():
+			self.files.setdefault(filename, None)
+		for filename in self.files:
+			self.files[filename] = self.stat(filename)
+		# Files added since the parser read the folder
+		self.retry.update(filename for filename in self.files if filename not in parser.getFileIndex())
+
+	def stat(self, filename: str):
+		try:
+			return statKey(os.stat(filename))
+		except FileNotFoundError:
+			return None
+
+	def addDirectory(self, dir: str, found: dict):
+		# Records dir and the directories below it, adding the assignment
+		# files in them to found
+		try:
+			self.directories[dir] = os.stat(dir).st_mtime_ns
+			entries = list(os.scandir(dir))
+		except FileNotFoundError:
+			self.directories.pop(dir, None)
+			return
+		for entry in entries:
+			if entry.is_dir():
+				if entry.path not in self.directories:
+					self.addDirectory(entry.path, found)
+			elif ST_NUM.match(self.parser.getStudentNumberForFile(entry.name)):
+				found.setdefault(entry.path.replace('\\', '/'), None)
+
+	def changedDirectories(self):
+		changed = []
+		for dir, mtime in list(self.directories.items()):
+			try:
+				if os.stat(dir).st_mtime_ns != mtime:
+					changed.append(dir)
+			except FileNotFoundError:
+				del self.directories[dir]
+		return changed
+
+	def candidates(self, timeout: float):
+		# Files which may have been added, changed or removed
+		time.sleep(timeout)
+		found = dict(self.files)
+		for dir in self.changedDirectories():
+			self.addDirectory(dir, found)
+		return found
+
+	def poll(self, timeout: float = 0.5):
+		# Waits up to timeout and gives the (added, changed, removed) files
+		added, changed, removed = [], [], []
+		candidates = self.candidates(timeout)
+		candidates.update((filename, None) for filename in self.retry)
+		for filename in candidates:
+			key = self.stat(filename)
+			if key is None:
+				if filename in self.parser.getFileIndex():
+					removed.append(filename)
+				else:
+					self.files.pop(filename, None)
+			elif filename not in self.parser.getFileIndex():
+				added.append(filename)
+			elif key != self.files.get(filename) or filename in self.retry:
+				changed.append(filename)
+		return added, changed, removed
+
+	def apply(self, added: list, changed: list, removed: list):
+		# Parses added and changed files into the parser, and drops removed
+		# ones, giving the assignments which were added, changed and removed
+		addedAssignments, changedAssignments, removedAssignments = [], [], []
+		for filename in removed:
+			removedAssignments.append(self.parser.removeAssignment(filename))
+			self.files.pop(filename, None)
+
+		for filename in added + changed:
+			key = self.stat(filename)
+			try:
+				parsed = self.parser.parseAssignment(filename)
+			except FileNotFoundError:
+				continue
+			except ValueError:
+				self.retry.add(filename)
+				continue
+			self.retry.discard(filename)
+			self.files[filename] = key
+			if filename in self.parser.getFileIndex():
+				changedAssignments.append(self.parser.updateAssignment(filename, parsed))
+			else:
+				self.parser.addAssignment(parsed, filename)
+				addedAssignments.append(parsed)
+
+		return addedAssignments, changedAssignments, removedAssignments
+
+	def close(self):
+		pass
+
+
+class InotifyWatcher(DirectoryWatcher):
+	# Learns which files to look at from inotify events instead of stat calls,
+	# so that the cost of a poll does not grow with the size of the folder
+
+	def __init__(self, parser: AssignmentParser, dir: str):
+		flags = inotify_simple.flags
+		self.flags = (flags.CLOSE_WRITE | flags.MODIFY | flags.CREATE | flags.DELETE
+			| flags.MOVED_FROM | flags.MOVED_TO | flags.DELETE_SELF)
+		self.inotify = inotify_simple.INotify()
+		self.watches = dict()
+		super().__init__(parser, dir)
+
+	def addDirectory(self, dir: str, found: dict):
+		try:
+			self.watches[self.inotify.add_watch(dir, self.flags)] = dir
+		except FileNotFoundError:
+			return
+		super().addDirectory(dir, found)
+
+	def candidates(self, timeout: float):
+		found = dict()
+		# Short read delay so that a burst of saves is handled as one change
+		for event in self.inotify.read(timeout=int(timeout * 1000), read_delay=50):
+			dir = self.watches.get(event.wd)
+			if dir is None or not event.name:
+				continue
+			path = os.path.join(dir, event.name)
+			if event.mask & inotify_simple.flags.ISDIR:
+				if event.mask & (inotify_simple.flags.CREATE | inotify_simple.flags.MOVED_TO):
+					self.addDirectory(path, found)
+			elif ST_NUM.match(self.parser.getStudentNumberForFile(event.name)):
+				found.setdefault(path.replace('\\', '/'), None)
+		return found
+
+	def close(self):
+		self.inotify.close()
+
+
+def createWatcher(parser: AssignmentParser, dir: str, useInotify: bool = True):
+	# inotify where the optional inotify_simple package is installed, polling otherwise
+	if useInotify and inotify_simple is not None:
+		try:
+			return InotifyWatcher(parser, dir)
+		except OSError:
+			# e.g. the limit on inotify watches was reached
+			pass
+	return DirectoryWatcher(parser, dir)
+
+
+def watch(watcher: DirectoryWatcher, analyser: AssignmentAnalyser, interval: float = 0.5, output=print):
+	# Applies changes to the folder as they happen and shows the refreshed
+	# statistics, until interrupted with Ctrl-C
+	try:
+		while True:
+			added, changed, removed = watcher.apply(*watcher.poll(interval))
+			if added or changed or removed:
+				analyser.applyChanges(added, changed, removed)
+				output('[{0}] {1} added, {2} changed, {3} removed\n'.format(time.strftime('%H:%M:%S'),
+					len(added), len(changed), len(removed)))
+				output(analyser.overallStatDisplay())
+	except KeyboardInterrupt:
+		pass